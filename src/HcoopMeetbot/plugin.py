@@ -10,7 +10,6 @@
 # of supybot-test, fully type-checked with MyPy, etc.
 
 import importlib
-from uuid import uuid4
 
 from supybot import callbacks, conf, ircmsgs, world
 from supybot.commands import optional, wrap
@@ -42,6 +41,16 @@ def get_topic(irc, channel):
     )
 
 
+class _ChannelNicks:
+    """The nicks of the users in a channel, which are only converted to strings if they are actually used."""
+
+    def __init__(self, users):
+        self._users = users
+
+    def __iter__(self):
+        return (str(user) for user in self._users)
+
+
 class HcoopMeetbot(callbacks.Plugin):
     """Helps run IRC meetings."""
 
@@ -50,31 +59,37 @@ def __init__(self, irc):
         super().__init__(irc)
         handler.configure(self.log, f"{conf.supybot.directories.conf}")
 
+    def die(self):
+        """Flush pending work when the plugin is unloaded or reloaded."""
+        handler.shutdown()
+        super().die()
+
     def doPrivmsg(self, irc, msg):
         """Capture all messages from supybot."""
-        channel = msg.args[0]
-        topic = irc.state.channels[channel].topic if channel in irc.state.channels else ""
-        users = irc.state.channels[channel].users if channel in irc.state.channels else []
-        context = _context(self, irc, msg)
+        channel, payload = msg.args[0], msg.args[1]
+        network = irc.msg.tags["receivedOn"]
+        if not handler.is_tracked(channel, network, payload):
+            return  # the bot sits in many busy channels, so ignore traffic as cheaply as possible
+        state = irc.state.channels.get(channel)
         message = interface.Message(
-            id=uuid4().hex,
+            id=None,
             timestamp=now(),
             nick=msg.nick,
             channel=channel,
-            network=irc.msg.tags["receivedOn"],
-            payload=msg.args[1],
-            topic=topic,
-            channel_nicks=[str(n) for n in users],
+            network=network,
+            payload=payload,
+            topic=state.topic if state else "",
+            channel_nicks=_ChannelNicks(state.users if state else ()),
         )
-        handler.irc_message(context=context, message=message)
+        handler.irc_message(context=_context(self, irc, msg), message=message)
 
     def outFilter(self, irc, msg):
         """Log outgoing messages from supybot."""
         try:
-            if msg.command == "PRIVMSG":
+            if msg.command == "PRIVMSG" and handler.is_tracked(msg.args[0], irc.network):
                 context = _context(self, irc, msg)
                 message = interface.Message(
-                    id=uuid4().hex,
+                    id=None,
                     timestamp=now(),
                     nick=irc.nick,
                     channel=msg.args[0],
@@ -101,6 +116,13 @@ def listmeetings(self, irc, msg, args):
 
     listmeetings = wrap(listmeetings, ["admin"])
 
+    def queuestats(self, irc, msg, args):
+        """Get statistics for the message queue."""
+        context = _context(self, irc, msg)
+        handler.queuestats(context=context)
+
+    queuestats = wrap(queuestats, ["admin"])
+
     def savemeetings(self, irc, msg, args):
         """Save all currently active meetings"""
         context = _context(self, irc, msg)
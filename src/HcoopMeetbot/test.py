@@ -14,7 +14,6 @@
 from hcoopmeetbotlogic.interface import Message
 
 # These are values used by the plugin test case
-ID = "id"
 NICK = "test"
 CHANNEL = "#test"
 NETWORK = "test"
@@ -28,24 +27,19 @@ def _stub(context, **kwargs):  # noqa: ARG001
 
 
 def _inbound(payload: str):
-    """Generate an expected inbound message generated via doPrivmsg()."""
+    """Generate an expected inbound message generated via doPrivmsg(); channel nicks are checked separately."""
     return Message(
-        id=ID,
+        id=None,  # assigned by the meeting when the message is tracked
         timestamp=TIMESTAMP,
         nick=NICK,
         channel=CHANNEL,
         network=NETWORK,
-        payload=f"{PREFIX}{payload}",
+        payload=payload,
         topic="",
-        channel_nicks=[NICK],
+        channel_nicks=ANY,
     )
 
 
-def _outbound():
-    """Generate an expected outbound message returned to the caller based on the _stub() call"""
-    return Message(id=ID, timestamp=TIMESTAMP, nick=NICK, channel=CHANNEL, network=NETWORK, payload=f"{NICK}: Hello")
-
-
 class HcoopMeetbotTestCase(ChannelPluginTestCase):
     plugins = ("HcoopMeetbot",)
 
@@ -80,122 +74,150 @@ def test_context(self, privmsg, topic):
         privmsg.assert_called_once_with("channel", "provided-message")
         irc.sendMsg.assert_has_calls([call("generated-topic"), call("generated-message")])
 
+    @patch("HcoopMeetbot.plugin.handler.irc_message")
+    def test_privmsg_no_meeting(self, irc_message) -> None:
+        """Ordinary traffic on a channel with no meeting takes the fast path, without building a message"""
+        self.feedMsg("hello, everyone")
+        self.feedMsg("#info this doesn't start a meeting")
+        irc_message.assert_not_called()
+
+    @patch("HcoopMeetbot.plugin.handler.irc_message")
+    @patch("HcoopMeetbot.plugin.now")
+    def test_privmsg_startmeeting(self, now, irc_message) -> None:
+        """A message that starts a meeting is handled even though there is no meeting yet"""
+        now.return_value = TIMESTAMP
+        self.feedMsg("#startmeeting")
+        irc_message.assert_called_once_with(context=ANY, message=_inbound("#startmeeting"))
+        assert list(irc_message.call_args.kwargs["message"].channel_nicks) == [NICK]
+
+    @patch("HcoopMeetbot.plugin.handler.meetversion")
+    @patch("HcoopMeetbot.plugin.handler.outbound_message")
+    @patch("HcoopMeetbot.plugin.handler.irc_message")
+    @patch("HcoopMeetbot.plugin.handler.is_tracked")
+    def test_privmsg_meeting(self, is_tracked, irc_message, outbound_message, meetversion) -> None:
+        """Messages in both directions are handled on a channel with a meeting"""
+        is_tracked.return_value = True
+        meetversion.side_effect = _stub
+        self.assertNotError("meetversion")
+        is_tracked.assert_has_calls([call(CHANNEL, NETWORK, f"{PREFIX}meetversion"), call(CHANNEL, NETWORK)])
+        irc_message.assert_called_once()
+        assert irc_message.call_args.kwargs["message"].payload == f"{PREFIX}meetversion"
+        outbound_message.assert_called_once()
+        assert outbound_message.call_args.kwargs["message"].payload == f"{NICK}: Hello"
+
     @patch("HcoopMeetbot.plugin.handler.meetversion")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_meetversion(self, uuid4, now, irc_message, outbound_message, meetversion) -> None:
+    def test_meetversion(self, now, irc_message, outbound_message, meetversion) -> None:
         """Test the meetversion command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         meetversion.side_effect = _stub
         self.assertNotError("meetversion")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("meetversion"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         meetversion.assert_called_once_with(context=ANY)
 
     @patch("HcoopMeetbot.plugin.handler.listmeetings")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_listmeetings(self, uuid4, now, irc_message, outbound_message, listmeetings) -> None:
+    def test_listmeetings(self, now, irc_message, outbound_message, listmeetings) -> None:
         """Test the listmeetings command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         listmeetings.side_effect = _stub
         self.assertNotError("listmeetings")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("listmeetings"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         listmeetings.assert_called_once_with(context=ANY)
 
+    @patch("HcoopMeetbot.plugin.handler.queuestats")
+    @patch("HcoopMeetbot.plugin.handler.outbound_message")
+    @patch("HcoopMeetbot.plugin.handler.irc_message")
+    @patch("HcoopMeetbot.plugin.now")
+    def test_queuestats(self, now, irc_message, outbound_message, queuestats) -> None:
+        """Test the queuestats command"""
+        now.return_value = TIMESTAMP
+        queuestats.side_effect = _stub
+        self.assertNotError("queuestats")
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
+        queuestats.assert_called_once_with(context=ANY)
+
     @patch("HcoopMeetbot.plugin.handler.savemeetings")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_savemeetings(self, uuid4, now, irc_message, outbound_message, savemeetings) -> None:
+    def test_savemeetings(self, now, irc_message, outbound_message, savemeetings) -> None:
         """Test the savemeetings command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         savemeetings.side_effect = _stub
         self.assertNotError("savemeetings")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("savemeetings"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         savemeetings.assert_called_once_with(context=ANY)
 
     @patch("HcoopMeetbot.plugin.handler.addchair")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_addchair(self, uuid4, now, irc_message, outbound_message, addchair) -> None:
+    def test_addchair(self, now, irc_message, outbound_message, addchair) -> None:
         """Test the addchair command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         addchair.side_effect = _stub
         self.assertNotError("addchair nick")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("addchair nick"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         addchair.assert_called_once_with(context=ANY, channel=CHANNEL, network=NETWORK, nick="nick")
 
     @patch("HcoopMeetbot.plugin.handler.deletemeeting")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_deletemeeting_save(self, uuid4, now, irc_message, outbound_message, deletemeeting) -> None:
+    def test_deletemeeting_save(self, now, irc_message, outbound_message, deletemeeting) -> None:
         """Test the deletemeeting command,.save=True"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         deletemeeting.side_effect = _stub
         self.assertNotError("deletemeeting true")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("deletemeeting true"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         deletemeeting.assert_called_once_with(context=ANY, channel=CHANNEL, network=NETWORK, save=True)
 
     @patch("HcoopMeetbot.plugin.handler.deletemeeting")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_deletemeeting_nosave(self, uuid4, now, irc_message, outbound_message, deletemeeting) -> None:
+    def test_deletemeeting_nosave(self, now, irc_message, outbound_message, deletemeeting) -> None:
         """Test the deletemeeting command,.save=False"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         deletemeeting.side_effect = _stub
         self.assertNotError("deletemeeting false")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("deletemeeting false"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         deletemeeting.assert_called_once_with(context=ANY, channel=CHANNEL, network=NETWORK, save=False)
 
     @patch("HcoopMeetbot.plugin.handler.recent")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_recent(self, uuid4, now, irc_message, outbound_message, recent) -> None:
+    def test_recent(self, now, irc_message, outbound_message, recent) -> None:
         """Test the recent command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         recent.side_effect = _stub
         self.assertNotError("recent")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("recent"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         recent.assert_called_once_with(context=ANY)
 
     @patch("HcoopMeetbot.plugin.handler.commands")
     @patch("HcoopMeetbot.plugin.handler.outbound_message")
     @patch("HcoopMeetbot.plugin.handler.irc_message")
     @patch("HcoopMeetbot.plugin.now")
-    @patch("HcoopMeetbot.plugin.uuid4")
-    def test_commands(self, uuid4, now, irc_message, outbound_message, commands) -> None:
+    def test_commands(self, now, irc_message, outbound_message, commands) -> None:
         """Test the commands command"""
-        uuid4.return_value = MagicMock(hex=ID)
         now.return_value = TIMESTAMP
         commands.side_effect = _stub
         self.assertNotError("commands")
-        irc_message.assert_called_once_with(context=ANY, message=_inbound("commands"))
-        outbound_message.assert_called_once_with(context=ANY, message=_outbound())
+        irc_message.assert_not_called()  # there is no meeting in the channel
+        outbound_message.assert_not_called()
         commands.assert_called_once_with(context=ANY)
@@ -0,0 +1,151 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Periodic autosave for active meetings.
+"""
+
+import math
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from logging import Logger
+from typing import Any
+
+from attrs import define
+
+from hcoopmeetbotlogic.meeting import Meeting
+
+# Name of the worker thread
+_THREAD_NAME = "meetbot-autosave"
+
+# Saves for different meetings are spread over this fraction of the interval
+_SPREAD = 0.25
+
+
+@define
+class _Dirty:
+    """A meeting that has changed since it was last saved."""
+
+    meeting: Meeting
+    due: float  # monotonic time when the meeting should be saved
+    changes: int  # number of changes since the meeting was last saved
+
+
+class AutosaveScheduler:
+    """
+    Saves changed meetings in the background, some time after they change.
+
+    The caller marks a meeting as dirty every time it changes.  A dirty meeting is saved
+    once the interval has passed since its first unsaved change, so a burst of changes
+    results in a single save.  Each meeting's deadline is pushed back by a fixed fraction
+    of the interval, derived from the meeting id, so meetings that change at the same time
+    aren't all saved at once.  If there is a limit on messages, a meeting that accumulates
+    that many changes is saved right away instead of waiting out the interval.
+
+    Saves run one at a time on the scheduler's own thread, never on the caller's thread.
+    A meeting that changes while it's being saved is just marked dirty again.
+    """
+
+    def __init__(self, logger: Logger, seconds: float, messages: int, save: Callable[[Meeting], Any]) -> None:
+        if seconds <= 0 and messages <= 0:
+            raise ValueError("Autosave requires an interval in seconds or messages")
+        self._logger = logger
+        self._seconds = seconds
+        self._messages = messages
+        self._save = save
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._dirty: dict[str, _Dirty] = {}
+        self._saving = False
+        self._closed = False
+        self._saved = 0
+        self._thread = threading.Thread(target=self._run, name=_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Number of dirty meetings that have not been saved yet."""
+        with self._lock:
+            return len(self._dirty) + (1 if self._saving else 0)
+
+    @property
+    def saved(self) -> int:
+        """Number of saves that have completed, successfully or not."""
+        with self._lock:
+            return self._saved
+
+    def touch(self, meeting: Meeting, changes: int = 1) -> None:
+        """Mark a meeting as dirty, scheduling it to be saved."""
+        with self._changed:
+            if self._closed:
+                return
+            dirty = self._dirty.get(meeting.id)
+            if dirty is None:
+                dirty = self._dirty[meeting.id] = _Dirty(meeting, self._deadline(meeting), 0)
+                wake = True  # the worker may need to wake up sooner than planned
+            else:
+                wake = False
+            dirty.changes += changes
+            if self._messages and dirty.changes >= self._messages and dirty.due > 0:
+                dirty.due, wake = 0, True  # overdue, so it's saved as soon as possible
+            if wake:
+                self._changed.notify_all()
+
+    def forget(self, meeting: Meeting) -> None:
+        """Forget about a meeting, so it's not saved even if it's dirty."""
+        with self._changed:
+            self._dirty.pop(meeting.id, None)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Save all dirty meetings right away, returning False if the timeout expires first."""
+        with self._changed:
+            for dirty in self._dirty.values():
+                dirty.due = 0
+            self._changed.notify_all()
+            return self._changed.wait_for(lambda: not self._dirty and not self._saving, timeout=timeout)
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        """Save all dirty meetings and then stop the worker thread, returning False if the saves timed out."""
+        flushed = self.flush(timeout=timeout)
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        if flushed:
+            self._thread.join()
+        return flushed
+
+    def _deadline(self, meeting: Meeting) -> float:
+        """Monotonic time when a meeting that just became dirty should be saved."""
+        if self._seconds <= 0:
+            return math.inf  # only saved once there are enough messages
+        offset = zlib.crc32(meeting.id.encode("utf-8")) / 0xFFFFFFFF * _SPREAD  # stable for each meeting
+        return time.monotonic() + self._seconds * (1 + offset)
+
+    def _next(self) -> _Dirty | None:
+        """Wait for the next meeting that is due to be saved, returning None once the scheduler is closed."""
+        with self._changed:
+            while True:
+                if self._closed and not self._dirty:
+                    return None
+                now = time.monotonic()
+                dirty = min(self._dirty.values(), key=lambda dirty: dirty.due, default=None)
+                if dirty and (dirty.due <= now or self._closed):
+                    del self._dirty[dirty.meeting.id]
+                    self._saving = True
+                    return dirty
+                timeout = dirty.due - now if dirty and dirty.due != math.inf else None
+                self._changed.wait(timeout)
+
+    def _run(self) -> None:
+        """Save meetings as they become due, until the scheduler is shut down."""
+        while dirty := self._next():
+            try:
+                self._save(dirty.meeting)
+            except Exception:
+                self._logger.exception("Autosave failed for %s", dirty.meeting.display_name())
+            finally:
+                with self._changed:
+                    self._saving = False
+                    self._saved += 1
+                    self._changed.notify_all()
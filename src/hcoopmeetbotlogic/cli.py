@@ -4,15 +4,126 @@
 CLI for the meetbot tool.
 """
 
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from enum import StrEnum
 from pathlib import Path
 
 import click
+from attrs import frozen
 
-from hcoopmeetbotlogic.config import load_config
-from hcoopmeetbotlogic.location import derive_locations, derive_prefix
+from hcoopmeetbotlogic.config import Config, load_config
+from hcoopmeetbotlogic.location import RAW_LOG_EXTENSION, Locations, derive_locations, derive_prefix
 from hcoopmeetbotlogic.meeting import Meeting
 from hcoopmeetbotlogic.writer import write_formatted_log, write_formatted_minutes
 
+# Characters that mark a raw log path as a glob pattern rather than a file or directory
+_GLOB_CHARACTERS = "*?["
+
+
+class _Outcome(StrEnum):
+    """Outcome of regenerating formatted output for one raw log."""
+
+    REGENERATED = "regenerated"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+@frozen
+class _Result:
+    """Result of regenerating formatted output for one raw log."""
+
+    raw_log: str
+    outcome: _Outcome
+    error: str | None = None
+
+
+def _find_raw_logs(raw_log: str) -> list[tuple[Path, Path]]:
+    """
+    Find raw logs to regenerate, given a file, a directory, or a glob pattern.
+
+    Each raw log is returned along with the root it was found under, which is used to
+    mirror the directory structure into the output directory.  A directory is searched
+    recursively for raw logs.  A glob pattern may use ** to match any number of directories.
+    """
+    path = Path(raw_log)
+    if path.is_file():
+        return [(path, path.parent)]
+    if path.is_dir():
+        return [(found, path) for found in sorted(path.rglob(f"*{RAW_LOG_EXTENSION}")) if found.is_file()]
+    if any(character in raw_log for character in _GLOB_CHARACTERS):
+        depth = _glob_depth(path)
+        root, pattern = Path(*path.parts[:depth]), Path(*path.parts[depth:])
+        return [(found, root) for found in sorted(root.glob(str(pattern))) if found.is_file()]
+    return []
+
+
+def _glob_depth(path: Path) -> int:
+    """Number of leading parts of a glob pattern that contain no glob characters."""
+    for depth, part in enumerate(path.parts):
+        if any(character in part for character in _GLOB_CHARACTERS):
+            return depth
+    return len(path.parts)
+
+
+def _up_to_date(raw_log: Path, locations: Locations) -> bool:
+    """Whether all of the formatted output exists and is newer than the raw log."""
+    try:
+        modified = raw_log.stat().st_mtime_ns
+        return all(
+            Path(location.path).stat().st_mtime_ns > modified for location in (locations.formatted_log, locations.formatted_minutes)
+        )
+    except FileNotFoundError:
+        return False
+
+
+def _regenerate(config: Config, raw_log: Path, locations: Locations) -> _Result:
+    """Regenerate formatted output for one raw log, reporting failures rather than raising them."""
+    try:
+        meeting = Meeting.from_json(raw_log.read_text(encoding="utf-8"))
+        Path(locations.formatted_log.path).parent.mkdir(parents=True, exist_ok=True)
+        write_formatted_log(config, locations, meeting)
+        write_formatted_minutes(config, locations, meeting)
+        return _Result(str(raw_log), _Outcome.REGENERATED)
+    except Exception as e:  # noqa: BLE001
+        return _Result(str(raw_log), _Outcome.FAILED, f"{type(e).__name__}: {e}")
+
+
+def _regenerate_all(
+    config: Config, raw_logs: list[tuple[Path, Path]], output_dir: Path, workers: int, *, force: bool
+) -> list[_Result]:
+    """
+    Regenerate formatted output for many raw logs, skipping output that is up to date unless forced.
+
+    Checking whether output is up to date is cheap, so it's done up front.  The remaining raw
+    logs are regenerated across a pool of processes if there's more than one worker, so each
+    process loads the templates just once no matter how many raw logs it handles.
+    """
+    results, pending = [], []
+    for raw_log, root in raw_logs:
+        try:
+            locations = derive_locations(
+                config, None, derive_prefix(str(raw_log)), str(output_dir / raw_log.parent.relative_to(root))
+            )
+        except Exception as e:  # noqa: BLE001
+            results.append(_Result(str(raw_log), _Outcome.FAILED, f"{type(e).__name__}: {e}"))
+            continue
+        if not force and _up_to_date(raw_log, locations):
+            results.append(_Result(str(raw_log), _Outcome.SKIPPED))
+        else:
+            pending.append((raw_log, locations))
+    if workers < 2 or len(pending) < 2:
+        return results + [_regenerate(config, raw_log, locations) for raw_log, locations in pending]
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+        futures = {executor.submit(_regenerate, config, raw_log, locations): raw_log for raw_log, locations in pending}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # noqa: BLE001 # for instance, if a worker process dies
+                results.append(_Result(str(futures[future]), _Outcome.FAILED, f"{type(e).__name__}: {e}"))
+    return results
+
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
 @click.version_option(package_name="hcoop-meetbot", prog_name="hcoop-meetbot")
@@ -34,7 +145,7 @@ def meetbot() -> None:
     "-r",
     "raw_log",
     metavar="<raw-log>",
-    help="Path to the raw JSON log",
+    help="Path to a raw JSON log, a directory, or a glob",
     required=True,
 )
 @click.option(
@@ -45,15 +156,46 @@ def meetbot() -> None:
     help="Where to write output, defaults to .",
     default=".",
 )
-def regenerate(config_path: str, raw_log: str, output_dir: str) -> None:
+@click.option(
+    "--workers",
+    "-w",
+    "workers",
+    metavar="<workers>",
+    type=click.IntRange(min=1),
+    help="Number of worker processes, defaults to the CPU count",
+    default=lambda: os.cpu_count() or 1,
+)
+@click.option(
+    "--force",
+    "-f",
+    "force",
+    is_flag=True,
+    help="Regenerate output even if it is up to date",
+    default=False,
+)
+def regenerate(config_path: str, raw_log: str, output_dir: str, workers: int, *, force: bool) -> None:
     """
-    Regenerate formatted output based on a raw log file.
+    Regenerate formatted output based on raw log files.
 
-    This parses a raw meeting log and regenerates formatted output into
+    This parses raw meeting logs and regenerates formatted output into
     the specified output directory.  By default, the output directory is
     the current working directory, but you can adjust that using the
     --output-dir switch.
 
+    The raw log may be a single file, a directory, or a glob pattern (quoted,
+    so the shell doesn't expand it).  A directory is searched recursively for
+    raw logs, and ** in a glob matches any number of directories.  The directory
+    structure underneath the directory (or the leading part of the glob) is
+    mirrored into the output directory.  Use the same directory for the raw logs
+    and the output to regenerate an entire archive in place.
+
+    Raw logs are regenerated in parallel by a pool of worker processes.  For a
+    directory or a glob, output that is already up to date (newer than its raw
+    log) is skipped.  Use --force after a template or configuration change,
+    since the raw logs themselves won't have changed.  A single raw log is
+    always regenerated.  A summary is printed at the end, and the exit status
+    is non-zero if any raw log could not be regenerated.
+
     The formatted output will be generated based on the rules in the meetbot
     configuration file, which controls the output format, date format, time
     zone, etc.  Configuration for the file prefix is ignored and the new files
@@ -61,14 +203,24 @@ def regenerate(config_path: str, raw_log: str, output_dir: str) -> None:
     """
     if not Path(config_path).is_file():
         raise click.UsageError(f"Could not find config: {config_path}")
-    if not Path(raw_log).is_file():
+    raw_logs = _find_raw_logs(raw_log)
+    if not raw_logs:
         raise click.UsageError(f"Could not find raw log: {raw_log}")
     if not Path(output_dir).is_dir():
         raise click.UsageError(f"Could not find output dir: {output_dir}")
     config = load_config(None, config_path)
-    prefix = derive_prefix(raw_log)
-    json_text = Path(raw_log).read_text(encoding="utf-8")
-    meeting = Meeting.from_json(json_text)
-    locations = derive_locations(config, meeting, prefix, output_dir)
-    write_formatted_log(config, locations, meeting)
-    write_formatted_minutes(config, locations, meeting)
+    start = time.perf_counter()
+    force = force or Path(raw_log).is_file()  # only a batch skips output that is up to date
+    results = _regenerate_all(config, raw_logs, Path(output_dir), workers, force=force)
+    elapsed = time.perf_counter() - start
+    failed = sorted((result for result in results if result.outcome == _Outcome.FAILED), key=lambda result: result.raw_log)
+    for result in failed:
+        click.echo(f"Failed: {result.raw_log}: {result.error}", err=True)
+    regenerated = sum(1 for result in results if result.outcome == _Outcome.REGENERATED)
+    skipped = sum(1 for result in results if result.outcome == _Outcome.SKIPPED)
+    click.echo(
+        f"Regenerated {regenerated}, skipped {skipped}, failed {len(failed)} of {len(results)} raw log(s) "
+        f"in {elapsed:.2f} seconds ({len(results) / elapsed if elapsed else 0.0:.1f} per second)"
+    )
+    if failed:
+        raise click.ClickException(f"Could not regenerate {len(failed)} raw log(s)")
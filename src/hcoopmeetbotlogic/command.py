@@ -6,6 +6,7 @@
 """
 
 import re
+from collections.abc import Callable
 from datetime import datetime
 
 from attrs import define
@@ -14,8 +15,8 @@
 from hcoopmeetbotlogic.interface import Context, Message
 from hcoopmeetbotlogic.meeting import EventType, Meeting, TrackedMessage, VotingAction
 from hcoopmeetbotlogic.release import DOCS
-from hcoopmeetbotlogic.state import config, deactivate_meeting
-from hcoopmeetbotlogic.writer import write_meeting
+from hcoopmeetbotlogic.state import config, deactivate_meeting, write_pipeline
+from hcoopmeetbotlogic.writer import submit_meeting
 
 # Regular expression to identify the startmeeting command
 _STARTMEETING_REGEX = re.compile(r"(^\s*)(#)(startmeeting)(\s*)(.*$)", re.IGNORECASE)
@@ -28,6 +29,7 @@
 # Regular expression to identify a message that starts with a URL
 _URL_REGEX = re.compile(r"(^\s*)((http|https|irc|ftp|mailto|ssh)(://)([^\s]*))(.*$)")
 _URL_GROUP = 2
+_URL_PREFIXES = ("http://", "https://", "irc://", "ftp://", "mailto://", "ssh://")
 
 # Prefix of a method on CommandDispatcher that implements a command
 _METHOD_PREFIX = "do_"
@@ -68,7 +70,7 @@ def do_endmeeting(self, meeting: Meeting, context: Context, operation: str, oper
             meeting.end_time = now()
             meeting.active = False
             self._set_channel_topic(meeting, context)
-            locations = write_meeting(config=config(), meeting=meeting)
+            locations = submit_meeting(config=config(), meeting=meeting, pipeline=write_pipeline(), final=True)
             context.send_reply(f"Meeting ended at {self._formatdate(meeting.end_time)}")
             context.send_reply(f"Raw log: {locations.raw_log.url}")
             context.send_reply(f"Formatted log: {locations.formatted_log.url}")
@@ -79,7 +81,7 @@ def do_save(self, meeting: Meeting, context: Context, operation: str, operand: s
         """Save the meeting to disk in its current state."""
         if meeting.is_chair(message.sender):
             meeting.track_event(EventType.SAVE_MEETING, message)
-            locations = write_meeting(config=config(), meeting=meeting)
+            locations = submit_meeting(config=config(), meeting=meeting, pipeline=write_pipeline())
             context.send_reply("Meeting saved")
             context.send_reply(f"Raw log: {locations.raw_log.url}")
             context.send_reply(f"Formatted log: {locations.formatted_log.url}")
@@ -154,6 +156,7 @@ def do_vote(self, meeting: Meeting, context: Context, operation: str, operand: s
         """Record a vote."""
         if meeting.vote_in_progress:
             action = VotingAction.IN_FAVOR if operand.startswith("+") else VotingAction.OPPOSED
+            meeting.vote_tally()  # make sure the tally is up to date, so tracking the vote updates it
             meeting.track_event(EventType.VOTE, message, operand=action)
         else:
             context.send_reply("No vote is in progress")
@@ -161,28 +164,27 @@ def do_vote(self, meeting: Meeting, context: Context, operation: str, operand: s
     def do_close(self, meeting: Meeting, context: Context, operation: str, operand: str, message: TrackedMessage) -> None:
         """Close a motion."""
         if meeting.is_chair(message.sender) and meeting.vote_in_progress:
-            votes = meeting.events[meeting.motion_index + 1 :]  # type: ignore[operator]  # index is safe if vote is in progress
-            in_favor = [event.message.sender for event in votes if event.operand == VotingAction.IN_FAVOR]
-            opposed = [event.message.sender for event in votes if event.operand == VotingAction.OPPOSED]
+            tally = meeting.vote_tally()
+            in_favor, opposed = tally.count(VotingAction.IN_FAVOR), tally.count(VotingAction.OPPOSED)
             if not in_favor and not opposed:
                 context.send_reply("Motion cannot be closed: no votes found (maybe use #inconclusive?)")
             else:
                 meeting.vote_in_progress = False
                 meeting.motion_index = None
-                if len(in_favor) > len(opposed):
-                    result = f"Motion accepted: {len(in_favor)} in favor to {len(opposed)} opposed"
+                if in_favor > opposed:
+                    result = f"Motion accepted: {in_favor} in favor to {opposed} opposed"
                     meeting.track_event(EventType.ACCEPTED, message, operand=result)
                     context.send_reply(result)
-                elif len(in_favor) < len(opposed):
-                    result = f"Motion failed: {len(in_favor)} in favor to {len(opposed)} opposed"
+                elif in_favor < opposed:
+                    result = f"Motion failed: {in_favor} in favor to {opposed} opposed"
                     meeting.track_event(EventType.FAILED, message, operand=result)
                     context.send_reply(result)
-                elif len(in_favor) == len(opposed):
-                    result = f"Motion inconclusive: {len(in_favor)} in favor to {len(opposed)} opposed"
+                elif in_favor == opposed:
+                    result = f"Motion inconclusive: {in_favor} in favor to {opposed} opposed"
                     meeting.track_event(EventType.INCONCLUSIVE, message, operand=result)
                     context.send_reply(result)
-                context.send_reply(f"In favor: {', '.join(in_favor)}")
-                context.send_reply(f"Opposed: {', '.join(opposed)}")
+                context.send_reply(f"In favor: {', '.join(tally.nicks(VotingAction.IN_FAVOR))}")
+                context.send_reply(f"Opposed: {', '.join(tally.nicks(VotingAction.OPPOSED))}")
 
     def do_accepted(self, meeting: Meeting, context: Context, operation: str, operand: str, message: TrackedMessage) -> None:
         """Indicate that a motion has been accepted."""
@@ -263,6 +265,11 @@ def _set_channel_topic(self, meeting: Meeting, context: Context) -> None:
 # Singleton command dispatcher
 _DISPATCHER = CommandDispatcher()
 
+# Command handlers on the singleton dispatcher, keyed by operation
+_HANDLERS: dict[str, Callable[[Meeting, Context, str, str, TrackedMessage], None]] = {
+    name[len(_METHOD_PREFIX) :]: getattr(_DISPATCHER, name) for name in dir(_DISPATCHER) if name.startswith(_METHOD_PREFIX)
+}
+
 
 def list_commands() -> list[str]:
     """List available commands."""
@@ -271,24 +278,33 @@ def list_commands() -> list[str]:
 
 def dispatch(meeting: Meeting, context: Context, message: TrackedMessage) -> None:
     """Dispatch any command contained in the message to the dispatcher method with the matching name."""
-    if message.payload.lower().strip().startswith(meeting.channel.lower()):
-        return
-    operation_match = _OPERATION_REGEX.match(message.payload)
-    url_match = _URL_REGEX.match(message.payload)
-    if operation_match:
-        operation = operation_match.group(_OPERATION_GROUP).lower().strip()
-        operand = operation_match.group(_OPERAND_GROUP).strip()
-        if hasattr(_DISPATCHER, f"{_METHOD_PREFIX}{operation}"):
-            getattr(_DISPATCHER, f"{_METHOD_PREFIX}{operation}")(meeting, context, operation, operand, message)
-        else:
-            context.send_reply(f"Unknown command: #{operation}")
-    elif url_match:
+    # Almost all messages are ordinary chat, which can't be a command or a link.  Checking
+    # the first character lets us skip regular expression matching entirely for those.
+    payload = message.payload.lstrip()
+    if payload[:1] == "#":
+        if payload.lower().startswith(meeting.channel.lower()):
+            return
+        operation_match = _OPERATION_REGEX.match(payload)
+        if operation_match:
+            operation = operation_match.group(_OPERATION_GROUP).lower()
+            operand = operation_match.group(_OPERAND_GROUP).strip()
+            handler = _HANDLERS.get(operation)
+            if handler:
+                handler(meeting, context, operation, operand, message)
+            else:
+                context.send_reply(f"Unknown command: #{operation}")
+    elif payload.startswith(_URL_PREFIXES):
         # as a special case, turns messages that start with a URL into a link operation
-        operation = "link"
-        operand = url_match.group(_URL_GROUP)
-        _DISPATCHER.do_link(meeting, context, operation, operand, message)
+        url_match = _URL_REGEX.match(payload)
+        if url_match:
+            _HANDLERS["link"](meeting, context, "link", url_match.group(_URL_GROUP), message)
 
 
 def is_startmeeting(message: Message) -> bool:
     """Whether the message contains a start-of-meeting indicator."""
-    return bool(message.payload and _STARTMEETING_REGEX.match(message.payload))
+    return is_startmeeting_payload(message.payload)
+
+
+def is_startmeeting_payload(payload: str | None) -> bool:
+    """Whether a message payload contains a start-of-meeting indicator, checking the first character before matching."""
+    return bool(payload and payload.lstrip()[:1] == "#" and _STARTMEETING_REGEX.match(payload))
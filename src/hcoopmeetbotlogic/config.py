@@ -20,12 +20,29 @@
 TIMEZONE_KEY = "timezone"
 USE_CHANNEL_TOPIC_KEY = "useChannelTopic"
 OUTPUT_FORMAT_KEY = "outputFormat"
+WRITE_THREADS_KEY = "writeThreads"
+RENDER_ENGINE_KEY = "renderEngine"
+JOURNAL_DIR_KEY = "journalDir"
+MESSAGE_STORAGE_KEY = "messageStorage"
+MESSAGE_IDS_KEY = "messageIds"
+MESSAGE_QUEUE_SIZE_KEY = "messageQueueSize"
+AUTOSAVE_SECONDS_KEY = "autosaveSeconds"
+AUTOSAVE_MESSAGES_KEY = "autosaveMessages"
+RENDER_WORKERS_KEY = "renderWorkers"
+RENDER_TIMEOUT_KEY = "renderTimeout"
 
 LOG_DIR_DEFAULT = str(Path.home() / "hcoop-meetbot")
 URL_PREFIX_DEFAULT = "/"
 PATTERN_DEFAULT = "%Y/{name}.%Y%m%d.%H%M"
 TIMEZONE_DEFAULT = "UTC"
 USE_CHANNEL_TOPIC_DEFAULT = False
+WRITE_THREADS_DEFAULT = 2
+MESSAGE_QUEUE_SIZE_DEFAULT = 0
+AUTOSAVE_SECONDS_DEFAULT = 0
+AUTOSAVE_MESSAGES_DEFAULT = 0
+RENDER_WORKERS_DEFAULT = 0
+RENDER_TIMEOUT_DEFAULT = 60
+JOURNAL_DIR_DEFAULT = ""  # journaling is opt-in, since the journal must never be kept where it's published
 
 
 class OutputFormat(StrEnum):
@@ -37,6 +54,36 @@ class OutputFormat(StrEnum):
 OUTPUT_FORMAT_DEFAULT = OutputFormat.HTML
 
 
+class RenderEngine(StrEnum):
+    """Legal rendering engines, which all generate identical output."""
+
+    GENSHI = "GENSHI"
+    STRING = "STRING"
+
+
+RENDER_ENGINE_DEFAULT = RenderEngine.GENSHI
+
+
+class MessageStorage(StrEnum):
+    """Legal ways to store the messages tracked in a meeting."""
+
+    LIST = "LIST"
+    COLUMNAR = "COLUMNAR"
+
+
+MESSAGE_STORAGE_DEFAULT = MessageStorage.LIST
+
+
+class MessageIds(StrEnum):
+    """Legal ways to generate identifiers for the messages tracked in a meeting."""
+
+    SEQUENCE = "SEQUENCE"
+    UUID = "UUID"
+
+
+MESSAGE_IDS_DEFAULT = MessageIds.SEQUENCE
+
+
 @frozen
 class Config:
     # noinspection PyUnresolvedReferences
@@ -51,6 +98,16 @@ class Config:
         timezone(str): Timezone string, any value valid for pytz
         use_channel_topic(bool): Whether the bot should attempt to use the channel topic
         output_format(OutputFormat): The output format to use
+        write_threads(int): Number of background threads used to write meetings to disk, or 0 to write inline
+        render_engine(RenderEngine): The engine used to render formatted output
+        journal_dir(str): Absolute path where journals for active meetings will be written, or empty to disable journaling
+        message_storage(MessageStorage): How the messages tracked in an active meeting are stored in memory
+        message_ids(MessageIds): How identifiers are generated for the messages tracked in a meeting
+        message_queue_size(int): Number of messages that may be queued for each meeting, or 0 to handle messages inline
+        autosave_seconds(int): Seconds after a meeting changes before it's saved automatically, or 0 to disable
+        autosave_messages(int): Number of messages after which a changed meeting is saved automatically, or 0 to disable
+        render_workers(int): Number of separate processes used to render formatted output, or 0 to render in the bot process
+        render_timeout(int): Seconds to wait for a render worker process before it's considered hung and restarted
     """
 
     conf_file: str | None
@@ -60,6 +117,23 @@ class Config:
     timezone: str = TIMEZONE_DEFAULT
     use_channel_topic: bool = USE_CHANNEL_TOPIC_DEFAULT
     output_format: OutputFormat = OUTPUT_FORMAT_DEFAULT
+    write_threads: int = WRITE_THREADS_DEFAULT
+    render_engine: RenderEngine = RENDER_ENGINE_DEFAULT
+    journal_dir: str = JOURNAL_DIR_DEFAULT
+    message_storage: MessageStorage = MESSAGE_STORAGE_DEFAULT
+    message_ids: MessageIds = MESSAGE_IDS_DEFAULT
+    message_queue_size: int = MESSAGE_QUEUE_SIZE_DEFAULT
+    autosave_seconds: int = AUTOSAVE_SECONDS_DEFAULT
+    autosave_messages: int = AUTOSAVE_MESSAGES_DEFAULT
+    render_workers: int = RENDER_WORKERS_DEFAULT
+    render_timeout: int = RENDER_TIMEOUT_DEFAULT
+
+
+def _parse_int(key: str, value: int, minimum: int) -> int:
+    """Validate an integer setting against its lower bound."""
+    if value < minimum:
+        raise ValueError(f"Invalid {key}: {value} (must be at least {minimum})")
+    return value
 
 
 def load_config(logger: Logger | None, conf_path: str) -> Config:
@@ -97,6 +171,40 @@ def parse_config(source: str) -> Config:
                 output_format=OutputFormat[
                     parser.get(CONF_SECTION, OUTPUT_FORMAT_KEY, fallback=OUTPUT_FORMAT_DEFAULT.name).upper()
                 ],
+                write_threads=_parse_int(
+                    WRITE_THREADS_KEY, parser.getint(CONF_SECTION, WRITE_THREADS_KEY, fallback=WRITE_THREADS_DEFAULT), minimum=0
+                ),
+                render_engine=RenderEngine[
+                    parser.get(CONF_SECTION, RENDER_ENGINE_KEY, fallback=RENDER_ENGINE_DEFAULT.name).upper()
+                ],
+                journal_dir=parser.get(CONF_SECTION, JOURNAL_DIR_KEY, fallback=JOURNAL_DIR_DEFAULT),
+                message_storage=MessageStorage[
+                    parser.get(CONF_SECTION, MESSAGE_STORAGE_KEY, fallback=MESSAGE_STORAGE_DEFAULT.name).upper()
+                ],
+                message_ids=MessageIds[parser.get(CONF_SECTION, MESSAGE_IDS_KEY, fallback=MESSAGE_IDS_DEFAULT.name).upper()],
+                message_queue_size=_parse_int(
+                    MESSAGE_QUEUE_SIZE_KEY,
+                    parser.getint(CONF_SECTION, MESSAGE_QUEUE_SIZE_KEY, fallback=MESSAGE_QUEUE_SIZE_DEFAULT),
+                    minimum=0,
+                ),
+                autosave_seconds=_parse_int(
+                    AUTOSAVE_SECONDS_KEY,
+                    parser.getint(CONF_SECTION, AUTOSAVE_SECONDS_KEY, fallback=AUTOSAVE_SECONDS_DEFAULT),
+                    minimum=0,
+                ),
+                autosave_messages=_parse_int(
+                    AUTOSAVE_MESSAGES_KEY,
+                    parser.getint(CONF_SECTION, AUTOSAVE_MESSAGES_KEY, fallback=AUTOSAVE_MESSAGES_DEFAULT),
+                    minimum=0,
+                ),
+                render_workers=_parse_int(
+                    RENDER_WORKERS_KEY, parser.getint(CONF_SECTION, RENDER_WORKERS_KEY, fallback=RENDER_WORKERS_DEFAULT), minimum=0
+                ),
+                render_timeout=_parse_int(  # a timeout of 0 would restart every worker on every render
+                    RENDER_TIMEOUT_KEY,
+                    parser.getint(CONF_SECTION, RENDER_TIMEOUT_KEY, fallback=RENDER_TIMEOUT_DEFAULT),
+                    minimum=1,
+                ),
             )
         except Exception:
             if logger:
@@ -4,16 +4,70 @@
 Date utilities.
 """
 
-from datetime import datetime
+import math
+from datetime import datetime, timedelta, tzinfo
+from functools import cache, lru_cache
 
 from pytz import timezone, utc
 
+DEFAULT_FORMAT = "%Y-%m-%dT%H:%M%z"
+
+# Maximum number of formatted dates retained by formatdate_cached()
+_CACHE_SIZE = 65536
+
+# Reference point for timestamps stored as microseconds since the epoch
+_EPOCH = datetime(1970, 1, 1, tzinfo=utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@cache
+def _timezone(zone: str) -> tzinfo:
+    """Get the time zone object for a zone, which is relatively expensive to look up."""
+    return timezone(zone)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _formatsecond(second: int, zone: str, fmt: str) -> str:
+    """Format a timestamp expressed in whole seconds since the epoch."""
+    return datetime.fromtimestamp(second, _timezone(zone)).strftime(fmt)
+
 
 def now() -> datetime:
     """Get the current time in UTC"""
     return datetime.now(utc)
 
 
-def formatdate(timestamp: datetime | None, zone: str = "UTC", fmt: str = "%Y-%m-%dT%H:%M%z") -> str:
+def to_epoch(timestamp: datetime) -> int:
+    """Convert a timezone-aware timestamp to whole microseconds since the epoch, a compact and exact representation."""
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def from_epoch(epoch: int) -> datetime:
+    """
+    Convert whole microseconds since the epoch back to a timestamp in UTC, the inverse of to_epoch().
+
+    The epoch doesn't record a time zone, so the result is always in pytz's UTC zone.  It's equal
+    to the original timestamp, but a timestamp in any other zone doesn't get its tzinfo back.
+    """
+    return _EPOCH + timedelta(microseconds=epoch)
+
+
+def formatdate(timestamp: datetime | None, zone: str = "UTC", fmt: str = DEFAULT_FORMAT) -> str:
     """Format a datetime for display in a specific time zone."""
-    return timestamp.astimezone(timezone(zone)).strftime(fmt) if timestamp else "None"
+    return timestamp.astimezone(_timezone(zone)).strftime(fmt) if timestamp else "None"
+
+
+def formatdate_cached(timestamp: datetime | None, zone: str = "UTC", fmt: str = DEFAULT_FORMAT) -> str:
+    """
+    Format a datetime for display in a specific time zone, memoizing the result.
+
+    The result is identical to formatdate().  Results are cached by the whole second,
+    so this is most useful when formatting many timestamps that share the same second,
+    or when the same timestamps are formatted repeatedly, like when a meeting log is
+    rendered on every save.  Formats that include microseconds are never cached.
+    """
+    if not timestamp:
+        return "None"
+    if "%f" in fmt:
+        return formatdate(timestamp, zone, fmt)
+    return _formatsecond(math.floor(timestamp.timestamp()), zone, fmt)
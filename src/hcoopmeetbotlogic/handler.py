@@ -4,23 +4,69 @@
 IRC request and message handlers.
 """
 
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from enum import StrEnum
+from functools import partial
 from logging import Logger
 
-from hcoopmeetbotlogic.command import dispatch, is_startmeeting, list_commands
-from hcoopmeetbotlogic.config import load_config
+from attrs import frozen
+
+from hcoopmeetbotlogic.autosave import AutosaveScheduler
+from hcoopmeetbotlogic.command import dispatch, is_startmeeting, is_startmeeting_payload, list_commands
+from hcoopmeetbotlogic.config import Config, load_config
 from hcoopmeetbotlogic.interface import Context, Message
+from hcoopmeetbotlogic.journal import Journal, journal_path
+from hcoopmeetbotlogic.meeting import Meeting
+from hcoopmeetbotlogic.messagequeue import MessageQueue
+from hcoopmeetbotlogic.pipeline import WritePipeline
+from hcoopmeetbotlogic.recovery import recover_meetings
 from hcoopmeetbotlogic.release import DOCS, VERSION
+from hcoopmeetbotlogic.renderer import RenderWorkers
 from hcoopmeetbotlogic.state import (
     add_meeting,
+    autosave,
     config,
     deactivate_meeting,
     get_meeting,
     get_meetings,
     logger,
+    message_queue,
+    render_workers,
+    restore_meeting,
+    set_autosave,
     set_config,
     set_logger,
+    set_message_queue,
+    set_render_workers,
+    set_write_pipeline,
+    write_pipeline,
 )
-from hcoopmeetbotlogic.writer import write_meeting
+from hcoopmeetbotlogic.writer import save_meeting, submit_meeting, write_meeting
+
+# Serializes starting new meetings, so two threads can't both start a meeting on the same channel
+_STARTING = threading.Lock()
+
+# Number of #startmeeting messages waiting on the message queue, by meeting key
+_QUEUED_STARTS: dict[str, int] = {}
+_QUEUED_STARTS_LOCK = threading.Lock()
+
+
+@contextmanager
+def _locked_meeting(channel: str, network: str) -> Iterator[Meeting | None]:
+    """Hold the lock for the active meeting on a channel, yielding None if there is no active meeting."""
+    meeting = get_meeting(channel, network)
+    while meeting:
+        with meeting.lock:
+            current = get_meeting(channel, network)
+            if current is meeting:  # otherwise, the meeting ended while we were waiting for the lock
+                yield meeting
+                return
+        meeting = current
+    yield None
 
 
 def _send_reply(context: Context, reply: str) -> None:
@@ -29,6 +75,39 @@ def _send_reply(context: Context, reply: str) -> None:
     context.send_reply(reply)
 
 
+# noinspection PyShadowingNames
+def _recover_meetings(logger: Logger, config: Config) -> None:
+    """Recover meetings from any journals left on disk when the bot last stopped."""
+    active = get_meetings(active=True, completed=False)
+    recovery = recover_meetings(config, logger, skip={meeting.id for meeting in active})
+    for meeting in recovery.recovered:
+        if not restore_meeting(meeting):
+            logger.warning("Not recovering %s, since another meeting is already active", meeting.display_name())
+            journal = meeting.detach_journal()
+            if journal:
+                journal.close()
+    for meeting in recovery.completed:
+        restore_meeting(meeting)
+        submit_meeting(config=config, meeting=meeting, pipeline=write_pipeline(), final=True)
+    if recovery.recovered or recovery.completed or recovery.failed:
+        logger.info(
+            "Recovered %d active and %d completed meeting(s) in %.3f seconds, with %d failure(s)",
+            len(recovery.recovered),
+            len(recovery.completed),
+            recovery.elapsed,
+            len(recovery.failed),
+        )
+
+
+def _attach_journal(meeting: Meeting) -> None:
+    """Attach a write-ahead journal to a new meeting, if journaling is enabled."""
+    if config().journal_dir:
+        try:
+            meeting.attach_journal(Journal(journal_path(config(), meeting.id), logger()))
+        except OSError:
+            logger().exception("Failed to create journal for %s; continuing without it", meeting.display_name())
+
+
 # noinspection PyShadowingNames
 def configure(logger: Logger, conf_path: str) -> None:
     """
@@ -42,40 +121,266 @@ def configure(logger: Logger, conf_path: str) -> None:
     config = load_config(logger, conf_path)
     set_logger(logger)
     set_config(config)
+    previous = write_pipeline()
+    if previous:
+        previous.shutdown()  # make sure nothing queued by a prior configuration is lost
+    previous_workers = render_workers()
+    if previous_workers:
+        previous_workers.shutdown()  # only once the pipeline is done with them
+    workers = RenderWorkers(logger, config.render_workers, config.render_timeout) if config.render_workers > 0 else None
+    set_render_workers(workers)
+    set_write_pipeline(WritePipeline(logger, config.write_threads) if config.write_threads > 0 else None)
+    previous_queue = message_queue()
+    if previous_queue:
+        previous_queue.shutdown()  # make sure nothing queued by a prior configuration is lost
+    set_message_queue(MessageQueue(logger, config.message_queue_size) if config.message_queue_size > 0 else None)
+    previous_autosave = autosave()
+    if previous_autosave:
+        previous_autosave.shutdown()  # make sure nothing changed under a prior configuration goes unsaved
+    enabled = config.autosave_seconds > 0 or config.autosave_messages > 0
+    set_autosave(AutosaveScheduler(logger, config.autosave_seconds, config.autosave_messages, _autosave) if enabled else None)
+    _recover_meetings(logger, config)
+
+
+def shutdown() -> None:
+    """
+    Shut down the plugin, flushing any queued messages, autosaves, and meeting writes that are still pending.
+
+    Render worker processes are stopped once all of the writes are done.
+
+    Journals for active meetings are synced to disk but left open, since the
+    plugin may be reloaded rather than stopped.
+    """
+    queue = message_queue()
+    if queue:
+        logger().debug("Flushing %d queued message(s)", queue.pending)
+        queue.shutdown()  # handling these messages might submit more writes, so flush them first
+        set_message_queue(None)
+    scheduler = autosave()
+    if scheduler:
+        logger().debug("Flushing %d pending autosave(s)", scheduler.pending)
+        scheduler.shutdown()  # autosaves might submit more writes, so flush them before the pipeline
+        set_autosave(None)
+    pipeline = write_pipeline()
+    if pipeline:
+        logger().debug("Flushing %d pending write(s)", pipeline.pending)
+        pipeline.shutdown()
+        set_write_pipeline(None)
+    workers = render_workers()
+    if workers:
+        logger().debug("Stopping %d render worker process(es)", len(workers.pids()))
+        workers.shutdown()  # pending writes might still need them, so stop them after the pipeline
+        set_render_workers(None)
+    for meeting in get_meetings(active=True, completed=False):
+        if meeting.journal:
+            meeting.journal.sync()
+
+
+def _autosave(meeting: Meeting) -> None:
+    """Save a meeting on behalf of the autosave scheduler, if it's still active."""
+    with _locked_meeting(meeting.channel, meeting.network) as current:
+        if current is not meeting:
+            return  # the meeting ended (and was saved) or was deleted after it changed
+        pipeline = write_pipeline()
+        if pipeline:
+            submit_meeting(config=config(), meeting=meeting, pipeline=pipeline)  # in order with the meeting's other writes
+        else:
+            write_meeting(config=config(), meeting=meeting)  # under the lock, so inline writes never overlap
+        logger().debug("Autosaved %s", meeting.display_name())
+
+
+class _SaveOutcome(StrEnum):
+    """Outcome of saving one meeting for savemeetings."""
+
+    SAVED = "saved"
+    UNCHANGED = "unchanged"
+    FAILED = "failed"
+
+
+@frozen
+class _SaveResult:
+    """Result of saving one meeting for savemeetings."""
+
+    name: str
+    outcome: _SaveOutcome
+    elapsed: float  # seconds spent writing the meeting's files
+    error: str | None = None
+
+    def __str__(self) -> str:
+        result = f"{self.name} {self.outcome} in {self.elapsed * 1000:.0f} ms"
+        return f"{result} ({self.error})" if self.error else result
+
+
+def _timed_save(config: Config, meeting: Meeting) -> _SaveResult:
+    """Save a meeting for savemeetings, reporting failures rather than raising them."""
+    start = time.perf_counter()
+    try:
+        result = save_meeting(config=config, meeting=meeting)
+    except Exception as e:  # noqa: BLE001
+        logger().exception("Failed to save %s", meeting.display_name())
+        return _SaveResult(meeting.display_name(), _SaveOutcome.FAILED, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+    if not result.written:
+        logger().info("Skipped unchanged files for %s: %s", meeting.display_name(), ", ".join(result.skipped))
+        return _SaveResult(meeting.display_name(), _SaveOutcome.UNCHANGED, time.perf_counter() - start)
+    return _SaveResult(meeting.display_name(), _SaveOutcome.SAVED, time.perf_counter() - start)
+
+
+def _report_saves(context: Context, results: list[_SaveResult]) -> None:
+    """Reply with the outcome of savemeetings, once every meeting has been saved."""
+    saved = [result for result in results if result.outcome != _SaveOutcome.FAILED]
+    unchanged = sum(1 for result in results if result.outcome == _SaveOutcome.UNCHANGED)
+    failed = len(results) - len(saved)
+    reply = f"Saved {len(saved)} meeting{'s' if len(saved) != 1 else ''}"
+    if unchanged or failed:
+        details = [f"{unchanged} unchanged, not rewritten"] if unchanged else []
+        details += [f"{failed} failed"] if failed else []
+        reply += f" ({'; '.join(details)})"
+    _send_reply(context, reply)
+    _send_reply(context, ", ".join(str(result) for result in results))
+
+
+def _when_saved(futures: list[Future[_SaveResult]], report: Callable[[list[_SaveResult]], None]) -> None:
+    """Report the results of all futures once the last of them completes, without waiting for it here."""
+    remaining = len(futures)
+    lock = threading.Lock()
+
+    def done(_: Future[_SaveResult]) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining:
+                return
+        report([future.result() for future in futures])  # in the order submitted, no matter which finished first
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def _mark_dirty(meeting: Meeting) -> None:
+    """Tell the autosave scheduler that a meeting has changed, if autosave is enabled."""
+    scheduler = autosave()
+    if scheduler and meeting.active:
+        scheduler.touch(meeting)
+
+
+def is_tracked(channel: str, network: str, payload: str | None = None) -> bool:
+    """
+    Whether a message needs to be handled, because there is a meeting on its channel or its payload starts one.
+
+    This is cheap, so the plugin checks it before doing any of the work to build a message
+    and context.  Almost all traffic is on channels with no meeting, so it's never handled.
+
+    Args:
+        channel(str): Channel the message was sent to
+        network(str): Network the message was sent on
+        payload(Optional[str]): Message payload, or None if the message can't start a meeting
+    """
+    # A queued start is checked before the meeting, because the meeting exists by the time the start is no longer queued
+    queued = bool(_QUEUED_STARTS) and Meeting.meeting_key(channel, network) in _QUEUED_STARTS
+    return queued or get_meeting(channel, network) is not None or is_startmeeting_payload(payload)
+
+
+def _count_start(key: str, delta: int) -> None:
+    """Adjust the number of #startmeeting messages waiting on the message queue for a meeting key."""
+    with _QUEUED_STARTS_LOCK:
+        count = _QUEUED_STARTS.get(key, 0) + delta
+        if count > 0:
+            _QUEUED_STARTS[key] = count
+        else:
+            _QUEUED_STARTS.pop(key, None)
+
+
+def _handle_start(handle: Callable[[Context, Message], None], key: str, context: Context, message: Message) -> None:
+    """Handle a queued #startmeeting message, which is no longer waiting once it has been handled."""
+    try:
+        handle(context, message)
+    finally:
+        _count_start(key, -1)
+
+
+def _enqueue(handle: Callable[[Context, Message], None], context: Context, message: Message, *, starts: bool = False) -> None:
+    """
+    Handle a message via the message queue if there is one, otherwise inline.
+
+    Until a queued #startmeeting is handled, there's no meeting on its channel yet.  The start
+    is counted while it waits, so is_tracked() doesn't drop the traffic that follows it.
+    """
+    queue = message_queue()
+    if not queue:
+        handle(context, message)
+        return
+    key = Meeting.meeting_key(message.channel, message.network)
+    if not starts:
+        queue.put(key, partial(handle, context, message))
+        return
+    _count_start(key, 1)
+    try:
+        queued = queue.put(key, partial(_handle_start, handle, key, context, message))
+    except Exception:
+        _count_start(key, -1)
+        raise
+    if not queued:
+        _count_start(key, -1)
 
 
 def irc_message(context: Context, message: Message) -> None:
     """
-    Handle an IRC message from the bot.
+    Handle an IRC message from the bot, via the message queue if there is one.
 
     Args:
         context(Context): Context for the message
         message(Message): Message to handle
     """
-    logger().debug("Handled IRC message: %s", message)
-    meeting = get_meeting(message.channel, message.network)
-    if meeting:
-        tracked = meeting.track_message(message)
-        dispatch(meeting, context, tracked)
-    elif is_startmeeting(message):
-        meeting = add_meeting(nick=message.nick, channel=message.channel, network=message.network)
-        tracked = meeting.track_message(message)
-        dispatch(meeting, context, tracked)
+    _enqueue(_irc_message, context, message, starts=is_startmeeting_payload(message.payload))
 
 
-def outbound_message(context: Context, message: Message) -> None:  # noqa: ARG001
+def _irc_message(context: Context, message: Message) -> None:
+    logger().debug("Handled IRC message: %s", message)
+    with _locked_meeting(message.channel, message.network) as meeting:
+        if meeting:
+            tracked = meeting.track_message(message)
+            dispatch(meeting, context, tracked)
+            _mark_dirty(meeting)
+            return
+    if is_startmeeting(message):
+        with _STARTING:
+            meeting = get_meeting(message.channel, message.network)  # someone else may have started it first
+            if not meeting:
+                meeting = add_meeting(
+                    nick=message.nick,
+                    channel=message.channel,
+                    network=message.network,
+                    storage=config().message_storage,
+                    ids=config().message_ids,
+                )
+                _attach_journal(meeting)
+            with meeting.lock:
+                tracked = meeting.track_message(message)
+                dispatch(meeting, context, tracked)
+                _mark_dirty(meeting)
+
+
+def outbound_message(context: Context, message: Message) -> None:
     """
-    Handle an outbound message from the bot.
+    Handle an outbound message from the bot, via the message queue if there is one.
+
+    The message queue keeps outbound messages in order with the inbound messages that
+    they reply to, so the meeting tracks them in the same order as if handled inline.
 
     Args:
         context(Context): Context for the message
         message(Message): Message to handle
     """
+    _enqueue(_outbound_message, context, message)
+
+
+def _outbound_message(context: Context, message: Message) -> None:  # noqa: ARG001
     logger().debug("Handled outbound message: %s", message)
-    meeting = get_meeting(message.channel, message.network)
-    if meeting:
-        # note that outbound messages are never dispatched, even if they contain a command
-        meeting.track_message(message)
+    with _locked_meeting(message.channel, message.network) as meeting:
+        if meeting:
+            # note that outbound messages are never dispatched, even if they contain a command
+            meeting.track_message(message)
+            _mark_dirty(meeting)
 
 
 def meetversion(context: Context) -> None:
@@ -96,22 +401,52 @@ def listmeetings(context: Context) -> None:
     _send_reply(context, "No active meetings" if not meetings else ", ".join([m.display_name() for m in meetings]))
 
 
+def queuestats(context: Context) -> None:
+    """
+    Reply with statistics for the message queue.
+
+    Args:
+        context(Context): Context for a message or command
+    """
+    logger().debug("Handled 'queuestats'")
+    queue = message_queue()
+    if not queue:
+        reply = "Message queue is not enabled"
+    else:
+        stats = queue.stats()
+        reply = (
+            f"Message queue: depth {stats.depth}, enqueued {stats.enqueued}, processed {stats.processed}, "
+            f"blocked {stats.blocked}, dropped {stats.dropped}, "
+            f"latency {stats.average_latency * 1000:.1f} ms average, {stats.max_latency * 1000:.1f} ms max"
+        )
+    _send_reply(context, reply)
+
+
 def savemeetings(context: Context) -> None:
     """
-    Save all currently active meetings.
+    Save all currently active meetings, reporting the outcome for each one.
+
+    Each meeting is written from a snapshot, so the meetings can keep changing while they're written.
+    If there is a write pipeline, the meetings are written concurrently on its workers, in order with
+    any other writes already pending for the same meeting, and the reply is sent from the worker that
+    finishes last, so the IRC thread never waits.  Otherwise, they're written one at a time.
+    A failure to save one meeting doesn't prevent the others from being saved.  Meetings that haven't
+    changed since they were last written are skipped, and the skipped files are logged.
 
     Args:
         context(Context): Context for a message or command
     """
     logger().debug("Handled 'savemeetings'")
-    meetings = get_meetings(active=True, completed=False)
+    meetings = get_meetings(active=True, completed=False, snapshot=True)
     if not meetings:
-        reply = "No meetings to save"
+        _send_reply(context, "No meetings to save")
+        return
+    pipeline = write_pipeline()
+    if pipeline:
+        futures = [pipeline.submit(meeting.key(), partial(_timed_save, config(), meeting)) for meeting in meetings]
+        _when_saved(futures, partial(_report_saves, context))
     else:
-        for meeting in meetings:
-            write_meeting(config=config(), meeting=meeting)
-        reply = f"Saved {len(meetings)} meeting{'s' if len(meetings) > 1 else ''}"
-    _send_reply(context, reply)
+        _report_saves(context, [_timed_save(config(), meeting) for meeting in meetings])
 
 
 def addchair(context: Context, channel: str, network: str, nick: str) -> None:
@@ -125,12 +460,12 @@ def addchair(context: Context, channel: str, network: str, nick: str) -> None:
         nick(str): Nickname to add as the chair
     """
     logger().debug("Handled 'addchair' for %s/%s nick=%s", channel, network, nick)
-    meeting = get_meeting(channel, network)
-    if not meeting:
-        reply = f"Meeting not found for {channel}/{network}"
-    else:
-        meeting.add_chair(nick, primary=True)
-        reply = f"{meeting.chair} is now the primary chair for {meeting.display_name()}"
+    with _locked_meeting(channel, network) as meeting:
+        if not meeting:
+            reply = f"Meeting not found for {channel}/{network}"
+        else:
+            meeting.add_chair(nick, primary=True)
+            reply = f"{meeting.chair} is now the primary chair for {meeting.display_name()}"
     _send_reply(context, reply)
 
 
@@ -148,14 +483,22 @@ def deletemeeting(context: Context, channel: str, network: str, *, save: bool) -
         save(bool): Whether to save the meeting before deactivating it
     """
     logger().debug("Handled 'deletemeeting' for %s/%s save=%s", channel, network, save)
-    meeting = get_meeting(channel, network)
-    if not meeting:
-        reply = f"Meeting not found for {channel}/{network}"
-    else:
-        if save:
-            write_meeting(config=config(), meeting=meeting)
-        deactivate_meeting(meeting, retain=False)
-        reply = f"Meeting {meeting.display_name()} has been deleted{' (saved first)' if save else ''}"
+    with _locked_meeting(channel, network) as meeting:
+        if not meeting:
+            reply = f"Meeting not found for {channel}/{network}"
+        else:
+            if save:
+                # in order with the meeting's other writes, and the journal is removed once it's saved
+                submit_meeting(config=config(), meeting=meeting, pipeline=write_pipeline(), final=True)
+            else:
+                journal = meeting.detach_journal()
+                if journal:
+                    journal.remove()
+            deactivate_meeting(meeting, retain=False)
+            scheduler = autosave()
+            if scheduler:
+                scheduler.forget(meeting)
+            reply = f"Meeting {meeting.display_name()} has been deleted{' (saved first)' if save else ''}"
     _send_reply(context, reply)
 
 
@@ -36,7 +36,7 @@ class Message:
     A message to be processed.
 
     Attributes:
-        id(str): Identifier for the message
+        id(Optional[str]): Identifier for the message, or None to have the meeting assign one when the message is tracked
         timestamp(str): Time the message was received
         nick(str): Nickname of the IRC user that sent the message
         channel(str): Channel the message was sent to
@@ -46,7 +46,7 @@ class Message:
         channel_nicks(Optional[Iterable[str]]): List of nicknames currently in the channel
     """
 
-    id: str
+    id: str | None
     timestamp: datetime
     nick: str
     channel: str
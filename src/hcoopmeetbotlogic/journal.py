@@ -0,0 +1,149 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Write-ahead journal for active meetings.
+"""
+
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import suppress
+from logging import Logger
+from pathlib import Path
+from typing import Any
+
+from hcoopmeetbotlogic.config import Config
+
+# Extension for journal files, which are named for the meeting id
+JOURNAL_EXTENSION = ".jsonl"
+
+# Minimum number of seconds between calls to fsync for a journal
+_SYNC_INTERVAL = 2.0
+
+# Name of the timer thread that syncs records left over at the end of a burst
+_THREAD_NAME = "meetbot-journal-sync"
+
+
+def journal_path(config: Config, meeting_id: str) -> Path:
+    """Get the path to the journal for a meeting."""
+    return Path(config.journal_dir) / f"{meeting_id}{JOURNAL_EXTENSION}"
+
+
+def read_journal(path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Read the records from a journal on disk.
+
+    If the bot crashed while a record was being appended, the final line of the journal
+    may be incomplete.  An incomplete final line is ignored, since the change it describes
+    was never completely recorded.
+    """
+    with path.open("r", encoding="utf-8") as journal:
+        for line in journal:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+class Journal:
+    """
+    Append-only write-ahead journal for an active meeting.
+
+    Each change to a meeting is appended to the journal as a single line of JSON at
+    the time the change is made, so the journal grows with the meeting and nothing is
+    ever rewritten.  Every record is flushed to the operating system as soon as it is
+    appended, which is enough to survive a crash of the bot itself.  Records are only
+    synced to disk periodically, at most once per sync interval, which keeps the journal
+    cheap enough to leave enabled all of the time.  If a record is appended too soon after
+    the last sync, a timer syncs it once the interval has elapsed, so no record stays unsynced
+    for much longer than the interval, even if nothing else is ever appended.
+
+    A journal that fails to write logs the error and then stops recording, because a
+    problem with the journal should never interfere with the meeting itself.
+    """
+
+    def __init__(self, path: Path, logger: Logger | None = None, sync_interval: float = _SYNC_INTERVAL) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._logger = logger
+        self._sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = path.open("a", encoding="utf-8")
+        self._synced = time.monotonic()
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+
+    @property
+    def closed(self) -> bool:
+        """Whether the journal has been closed, either explicitly or because of an error."""
+        return self._file.closed
+
+    def append(self, record: dict[str, Any]) -> None:
+        """Append a record to the journal, syncing to disk if the sync interval has elapsed."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            try:
+                self._file.write(line)
+                self._file.flush()
+                self._dirty = True
+                elapsed = time.monotonic() - self._synced
+                if elapsed >= self._sync_interval:
+                    self._sync()
+                elif not self._timer:
+                    self._timer = threading.Timer(self._sync_interval - elapsed, self._sync_later)
+                    self._timer.name = _THREAD_NAME
+                    self._timer.daemon = True
+                    self._timer.start()
+            except OSError:
+                if self._logger:
+                    self._logger.exception("Failed to write journal %s; journaling is disabled for this meeting", self.path)
+                with suppress(OSError):
+                    self._file.close()  # the file is closed even if its buffer can't be flushed
+
+    def sync(self) -> None:
+        """Sync any records that have been appended to disk."""
+        with self._lock:
+            if not self._file.closed and self._dirty:
+                self._sync()
+
+    def close(self) -> None:
+        """Sync and close the journal, retaining the file on disk."""
+        with self._lock:
+            self._cancel_timer()
+            if not self._file.closed:
+                if self._dirty:
+                    self._sync()
+                self._file.close()
+
+    def remove(self) -> None:
+        """Close the journal and remove the file from disk, once it is no longer needed."""
+        with self._lock:
+            self._cancel_timer()
+            self._file.close()
+            self.path.unlink(missing_ok=True)
+
+    def _sync_later(self) -> None:
+        """Sync records left unsynced at the end of a burst, on behalf of the timer."""
+        with self._lock:
+            self._timer = None
+            if self._file.closed or not self._dirty:
+                return
+            try:
+                self._sync()
+            except OSError:
+                if self._logger:
+                    self._logger.exception("Failed to sync journal %s", self.path)
+
+    def _cancel_timer(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _sync(self) -> None:
+        self._cancel_timer()
+        os.fsync(self._file.fileno())
+        self._synced = time.monotonic()
+        self._dirty = False
@@ -75,14 +75,22 @@ def derive_prefix(raw_log_path: str) -> str:
 
 
 # noinspection PyUnreachableCode
-def derive_locations(config: Config, meeting: Meeting, prefix: str | None = None, output_dir: str | None = None) -> Locations:
+def derive_locations(
+    config: Config, meeting: Meeting | None, prefix: str | None = None, output_dir: str | None = None
+) -> Locations:
     """
     Derive the locations where meeting files will be written.
 
     Use prefix and output_dir to override the file prefix and output log directory
-    that would normally be generated based on configuration.
+    that would normally be generated based on configuration.  The meeting is only
+    used to generate the file prefix, so it may be None if a prefix is provided.
     """
-    file_prefix = prefix or _file_prefix(config, meeting)
+    if prefix:
+        file_prefix = prefix
+    elif meeting:
+        file_prefix = _file_prefix(config, meeting)
+    else:
+        raise ValueError("A meeting is required to derive locations without a prefix")
     if config.output_format == OutputFormat.HTML:
         return Locations(
             raw_log=_location(config, file_prefix, RAW_LOG_EXTENSION, output_dir),
@@ -5,30 +5,34 @@
 """
 
 import json
+import sys
+import threading
 import uuid
-from datetime import datetime
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator, MutableSequence, Sequence
+from contextlib import contextmanager
+from copy import copy
+from datetime import datetime, timedelta
 from enum import StrEnum
-from typing import Any
+from typing import Any, overload
 
-import cattrs
-from attrs import define, field, frozen
+from attrs import Attribute, define, evolve, field, fields, frozen
 
-from hcoopmeetbotlogic.dateutil import formatdate, now
+from hcoopmeetbotlogic.config import MessageIds
+from hcoopmeetbotlogic.dateutil import formatdate, from_epoch, now, to_epoch
 from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import Journal
+from hcoopmeetbotlogic.serializer import structure_fn, unstructure_fn, unstructure_value, value_structure_fn, value_unstructure_fn
 
+# Offset for a timestamp in UTC, which can be stored compactly
+_UTC_OFFSET = timedelta(0)
 
-class _CattrConverter(cattrs.GenConverter):
-    """
-    Cattr converter to serialize Meeting to and from JSON.
-    """
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.register_unstructure_hook(datetime, lambda d: d.isoformat() if d else None)
-        self.register_structure_hook(datetime, lambda s, _: datetime.fromisoformat(s) if s else None)
-
+# Digits used for compact message identifiers
+_BASE32_DIGITS = "0123456789abcdefghijklmnopqrstuv"
 
-_CONVERTER = _CattrConverter()
+# Version of the raw log layout generated by Meeting.to_json(); the original layout had no version
+_JSON_VERSION = 2
 
 # Note: we use (str, Enum) so that the enum value gets serialized rather than the enum name
 
@@ -65,12 +69,36 @@ class VotingAction(StrEnum):
     OPPOSED = "-1"
 
 
-@frozen
+def _compact_timestamp(timestamp: int | datetime) -> int | datetime:
+    """
+    Store a UTC timestamp as microseconds since the epoch; any other timestamp is kept as-is, so it's restored exactly.
+
+    Any timestamp with a zero offset counts as UTC, whatever its zone, so it's restored in pytz's UTC zone
+    (see from_epoch()).  The restored timestamp is equal and formats the same, but its tzinfo may differ.
+    Timestamps from IRC and from a raw log are always in UTC, so in practice nothing is lost.
+    """
+    if isinstance(timestamp, int):  # already compact, as when evolve() copies the stored value
+        return timestamp
+    return to_epoch(timestamp) if timestamp.utcoffset() == _UTC_OFFSET else timestamp
+
+
+def _expand_timestamp(value: int | datetime) -> datetime:
+    """Restore a timestamp stored by _compact_timestamp()."""
+    return from_epoch(value) if isinstance(value, int) else value
+
+
+@frozen(weakref_slot=False)
 class TrackedMessage:
     # noinspection PyUnresolvedReferences
     """
     A message tracked as part of a meeting.
 
+    A long meeting can track many thousands of messages, so they are stored compactly.  The
+    sender nick is interned, so all messages from the same nick share a single string.  The
+    timestamp is stored as whole microseconds since the epoch, and converted back to a
+    datetime on access.  (Timestamps that aren't in UTC, like the naive timestamps in some
+    older raw logs, are stored as-is.)
+
     Attributes:
         id(str): Message identifier
         sender(str): IRC nick of the sender
@@ -80,22 +108,29 @@ class TrackedMessage:
     """
 
     id: str
-    sender: str
+    sender: str = field(converter=sys.intern)
     payload: str
     action: bool
-    timestamp: datetime
+    _timestamp: int | datetime = field(converter=_compact_timestamp, repr=lambda value: repr(_expand_timestamp(value)))
+
+    @property
+    def timestamp(self) -> datetime:
+        return _expand_timestamp(self._timestamp)
 
     def display_name(self) -> str:
         """Get the message display name."""
         return f"{self.id}@{formatdate(self.timestamp)}"
 
 
-@frozen
+@frozen(weakref_slot=False)
 class TrackedEvent:
     # noinspection PyUnresolvedReferences
     """
     An event tracked as part of a meeting, always tied to a specific message.
 
+    Like a tracked message, a UTC timestamp is stored as whole microseconds since the epoch.
+    The event type is an enum, so each event holds only a reference to a shared member.
+
     Attributes:
         id(str): The event identifier
         event_type(EventType): Type of the event
@@ -108,7 +143,7 @@ class TrackedEvent:
     message: TrackedMessage
     operand: Any | None
     id: str = field()
-    timestamp: datetime = field()
+    _timestamp: int | datetime = field(converter=_compact_timestamp, repr=lambda value: repr(_expand_timestamp(value)))
 
     # noinspection PyUnresolvedReferences
     @id.default  # noqa: A003
@@ -116,31 +151,340 @@ def _default_id(self) -> str:
         return self.message.id
 
     # noinspection PyUnresolvedReferences
-    @timestamp.default
+    @_timestamp.default
     def _default_timestamp(self) -> datetime:
         return self.message.timestamp
 
+    @property
+    def timestamp(self) -> datetime:
+        return _expand_timestamp(self._timestamp)
+
     def display_name(self) -> str:
         """Get the event display name."""
         return f"{self.id}@{formatdate(self.timestamp)}"
 
 
-@define(slots=False)
+class MessageStore(MutableSequence[TrackedMessage]):
+    """
+    Columnar storage for the messages tracked in a meeting, an optional alternative to a list.
+
+    Rather than holding a tracked message object for every message, the store keeps each
+    attribute in its own column: ids and payloads in lists, senders as indexes into a table
+    of nicks, action flags in a byte array, and timestamps as microseconds since the epoch
+    in an array of 64-bit integers.  (Timestamps that aren't in UTC are rare, so they're kept
+    separately, keyed by index.)  A tracked message is created as a view over the columns
+    only when a message is accessed.  So, the store behaves like a list of messages, except
+    that each access returns a message that is equal to, but not identical to, the message
+    that was added.
+
+    Messages are normally only appended, which is fast.  Any other change to the store
+    rebuilds all of the columns.  Bulk operations like unstructure() work directly on the
+    columns, without creating any views.
+    """
+
+    def __init__(self, messages: Iterable[TrackedMessage] = ()) -> None:
+        self._ids: list[str] = []
+        self._payloads: list[str] = []
+        self._senders = array("I")
+        self._actions = bytearray()
+        self._epochs = array("q")
+        self._zoned: dict[int, datetime] = {}
+        self._nicks: list[str] = []
+        self._nick_index: dict[str, int] = {}
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[TrackedMessage]:
+        return self._views(0, len(self))
+
+    @overload
+    def __getitem__(self, index: int) -> TrackedMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[TrackedMessage]: ...
+
+    def __getitem__(self, index: int | slice) -> TrackedMessage | list[TrackedMessage]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return list(self._views(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        index = range(len(self))[index]  # normalizes a negative index and raises IndexError if out of range
+        return next(self._views(index, index + 1))
+
+    @overload
+    def __setitem__(self, index: int, value: TrackedMessage) -> None: ...
+
+    @overload
+    def __setitem__(self, index: slice, value: Iterable[TrackedMessage]) -> None: ...
+
+    def __setitem__(self, index: int | slice, value: Any) -> None:
+        messages = list(self)
+        messages[index] = value
+        self._rebuild(messages)
+
+    def __delitem__(self, index: int | slice) -> None:
+        messages = list(self)
+        del messages[index]
+        self._rebuild(messages)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MessageStore | list):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other, strict=True))
+
+    __hash__ = None  # type: ignore[assignment] # mutable, like a list
+
+    def __repr__(self) -> str:
+        return f"MessageStore({list(self)!r})"
+
+    def __copy__(self) -> "MessageStore":
+        return self.copy()
+
+    def insert(self, index: int, value: TrackedMessage) -> None:
+        messages = list(self)
+        messages.insert(index, value)
+        self._rebuild(messages)
+
+    def append(self, value: TrackedMessage) -> None:
+        if value.sender not in self._nick_index:
+            self._nick_index[value.sender] = len(self._nicks)
+            self._nicks.append(value.sender)
+        stored = value._timestamp  # noqa: SLF001
+        if isinstance(stored, datetime):
+            self._zoned[len(self._ids)] = stored
+            stored = 0
+        self._ids.append(value.id)
+        self._payloads.append(value.payload)
+        self._senders.append(self._nick_index[value.sender])
+        self._actions.append(value.action)
+        self._epochs.append(stored)
+
+    def extend(self, values: Iterable[TrackedMessage]) -> None:
+        for value in values:
+            self.append(value)
+
+    def clear(self) -> None:
+        self._rebuild([])
+
+    def copy(self) -> "MessageStore":
+        """Copy the store, which copies each column rather than creating any views."""
+        copied = MessageStore()
+        copied._ids = self._ids.copy()
+        copied._payloads = self._payloads.copy()
+        copied._senders = array("I", self._senders)
+        copied._actions = bytearray(self._actions)
+        copied._epochs = array("q", self._epochs)
+        copied._zoned = self._zoned.copy()
+        copied._nicks = self._nicks.copy()
+        copied._nick_index = self._nick_index.copy()
+        return copied
+
+    def ids(self) -> Iterator[str]:
+        """Iterate over the ids of all messages, in order."""
+        return iter(self._ids)
+
+    def unstructure(self) -> list[dict[str, Any]]:
+        """Unstructure all of the messages in a single pass over the columns, exactly like unstructuring each message."""
+        nicks, zoned = self._nicks, self._zoned
+        return [
+            {
+                "id": message_id,
+                "sender": nicks[sender],
+                "payload": payload,
+                "action": action == 1,
+                "timestamp": (zoned[index] if zoned and index in zoned else from_epoch(epoch)).isoformat(),
+            }
+            for index, (message_id, sender, payload, action, epoch) in enumerate(
+                zip(self._ids, self._senders, self._payloads, self._actions, self._epochs, strict=True)
+            )
+        ]
+
+    def _views(self, start: int, stop: int) -> Iterator[TrackedMessage]:
+        """Create views for a range of messages, in a single pass over the columns."""
+        nicks, zoned = self._nicks, self._zoned
+        for index in range(start, stop):
+            timestamp = zoned[index] if zoned and index in zoned else self._epochs[index]  # the converter accepts an epoch as-is
+            yield TrackedMessage(
+                self._ids[index], nicks[self._senders[index]], self._payloads[index], self._actions[index] == 1, timestamp
+            )
+
+    def _rebuild(self, messages: list[TrackedMessage]) -> None:
+        """Rebuild all of the columns from a list of messages."""
+        rebuilt = MessageStore(messages)
+        self._ids, self._payloads, self._senders, self._actions = (
+            rebuilt._ids,
+            rebuilt._payloads,
+            rebuilt._senders,
+            rebuilt._actions,
+        )
+        self._epochs, self._zoned, self._nicks, self._nick_index = (
+            rebuilt._epochs,
+            rebuilt._zoned,
+            rebuilt._nicks,
+            rebuilt._nick_index,
+        )
+
+
+class _EventIndex:
+    """
+    Index from event type to the positions of those events in a meeting's list of events.
+
+    The index is maintained incrementally as events are tracked and popped.  Events that
+    are appended to the list directly (like when a meeting is deserialized or replayed)
+    are indexed the next time the index is used.  If the list is now shorter than the index,
+    or the last indexed event is no longer in its position (like when the list is replaced),
+    the index is rebuilt from scratch.  Any other change to events that were already indexed
+    isn't detected, so the list must never be edited in place other than via pop().
+    """
+
+    positions: dict[EventType, list[int]]
+    last: TrackedEvent | None
+    count: int
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the index, so it's empty."""
+        self.positions, self.last, self.count = {}, None, 0
+
+    def append(self, event: TrackedEvent) -> None:
+        """Index an event that was just appended to the list of events."""
+        self.positions.setdefault(event.event_type, []).append(self.count)
+        self.last = event
+        self.count += 1
+
+    def pop(self, event: TrackedEvent, events: list[TrackedEvent]) -> None:
+        """Remove an event that was just popped off the end of the list of events."""
+        self.positions[event.event_type].pop()
+        self.count -= 1
+        self.last = events[-1] if events else None
+
+    def sync(self, events: list[TrackedEvent]) -> None:
+        """Index events appended to the list since the last sync, or rebuild the index if the list was truncated or replaced."""
+        if self.count > len(events) or (self.count > 0 and events[self.count - 1] is not self.last):
+            self.reset()  # the list was changed other than by appending, so start over
+        for event in events[self.count :]:
+            self.append(event)
+
+
+class VoteTally:
+    """
+    Running tally of the votes on a motion, as of the most recent vote.
+
+    Only each nick's most recent vote counts, but earlier votes are remembered, so if the
+    most recent vote is removed via #undo, the nick's previous vote counts again.  The
+    counts for each voting action are maintained as votes are added and removed, so they
+    can be checked in constant time.
+
+    Attributes:
+        motion_index(Optional[int]): Index into events for the motion being voted on
+        votes(Dict[str, List[VotingAction]]): Votes cast by each nick, in order
+        total(int): Total number of votes cast, including votes that were superseded
+    """
+
+    def __init__(self, motion_index: int | None) -> None:
+        self.motion_index = motion_index
+        self.votes: dict[str, list[VotingAction]] = {}
+        self.total = 0
+        self._counts = dict.fromkeys(VotingAction, 0)
+
+    def add(self, nick: str, action: VotingAction) -> None:
+        """Add a vote, which supersedes any earlier vote by the same nick."""
+        votes = self.votes.setdefault(nick, [])
+        if votes:
+            self._counts[votes[-1]] -= 1
+        votes.append(action)
+        self._counts[action] += 1
+        self.total += 1
+
+    def remove(self, nick: str) -> None:
+        """Remove the most recent vote by a nick, so that any earlier vote counts again."""
+        votes = self.votes[nick]
+        self._counts[votes.pop()] -= 1
+        if votes:
+            self._counts[votes[-1]] += 1
+        else:
+            del self.votes[nick]
+        self.total -= 1
+
+    def count(self, action: VotingAction) -> int:
+        """Get the number of nicks whose most recent vote is for a voting action."""
+        return self._counts[action]
+
+    def nicks(self, action: VotingAction) -> list[str]:
+        """Get the nicks whose most recent vote is for a voting action, in the order they first voted."""
+        return [nick for nick, votes in self.votes.items() if votes[-1] == action]
+
+
+def uuid_message_id(meeting: "Meeting") -> str:  # noqa: ARG001
+    """Generate a random message identifier, which is unique across all meetings."""
+    return uuid.uuid4().hex
+
+
+def sequence_message_id(meeting: "Meeting") -> str:
+    """
+    Generate a compact message identifier, which is unique within a meeting.
+
+    The identifier is the position of the next message in the meeting, as a base32 number.
+    Messages are never removed from a meeting, so the position is never reused, and it
+    continues where it left off when a meeting is replayed from its journal.
+    """
+    position, digits = len(meeting.messages), []
+    while True:
+        position, digit = divmod(position, 32)
+        digits.append(_BASE32_DIGITS[digit])
+        if not position:
+            return "".join(reversed(digits))
+
+
+# Message identifier generators, for each configured way to generate identifiers
+MESSAGE_ID_GENERATORS: dict[MessageIds, Callable[["Meeting"], str]] = {
+    MessageIds.SEQUENCE: sequence_message_id,
+    MessageIds.UUID: uuid_message_id,
+}
+
+
+def _journal_setattr(meeting: "Meeting", attribute: "Attribute[Any]", value: Any) -> Any:
+    """Record an assignment to a meeting attribute in the meeting's journal, if any."""
+    if meeting.journal is not None and attribute.init:
+        meeting.journal.append({"op": "set", "field": attribute.name, "value": _UNSTRUCTURE_FIELD[attribute.name](value)})
+    return value
+
+
+@define(slots=False, on_setattr=_journal_setattr)
 class Meeting:
     # noinspection PyUnresolvedReferences
     """
     A meeting on a particular IRC channel.
 
     The meeting can be serialized and deserialized to and from JSON.  This is the mechanism we use
-    to persist the raw log to disk.  If you round trip the JSON (generate JSON and then use that
-    JSON to create a new meeting), the resulting object contains data that is equivalent, but not
-    exactly identical to, the original object.  Each tracked event has an associated message.  In
-    the original object, the tracked event always refers to one of the message objects that is
-    already in the messages list.  When you deserialize from JSON, the object in the message list
+    to persist the raw log to disk.  Each tracked event has an associated message, which is always
+    one of the message objects that is already in the messages list.  The raw log is versioned.  In
+    the current layout, each event refers to its message by id rather than embedding a copy of it,
+    so when you deserialize from JSON, events refer to the same objects that are in the messages
+    list, just like in the original object.  The original layout (with no version) embedded a copy
+    of the message in each event.  It can still be deserialized, but the object in the message list
     will be different than the one on the tracked event, although they will be equivalent by value.
-    So, if you deserialize from JSON, it's best to treat the resulting object as a read-only copy.
-    The copy won't always work exactly like a meeting that was created at runtime based on actual
-    IRC traffic.
+    So, if you deserialize a raw log in the original layout, it's best to treat the resulting object
+    as a read-only copy.  The copy won't always work exactly like a meeting that was created at
+    runtime based on actual IRC traffic.
+
+    An active meeting may also have a journal attached.  Once a journal is attached, every change
+    to the meeting is appended to the journal as it happens.  Unlike JSON, replaying the journal
+    produces a meeting that is identical to the original, including the relationship between
+    tracked events and tracked messages.  The journal is never serialized to JSON, and it is not
+    carried over into a snapshot.
+
+    Each meeting has its own reentrant lock.  The methods that change the meeting (like
+    track_message() and add_chair()) hold the lock while they work, so messages and events
+    stay consistent with each other and with the journal when several threads touch the same
+    meeting.  Code that makes several related changes, or that needs a consistent view while
+    reading, should hold the lock itself.  A snapshot is taken under the lock, and it's the
+    right way to hand an active meeting to anything that takes a while, like the writer.
 
     Attributes:
         id(str): Unique identifier for the meeting
@@ -155,11 +499,14 @@ class Meeting:
         end_time(Optional[datetime]): End time of the meeting in UTC, possibly None
         original_topic(Optional[str]): The original topic assigned to the channel prior to starting the meeting
         current_topic(Optional[str]): The current topic, assigned by a chair
-        messages(List[TrackedMessage]): List of all messages tracked as part of the meeting
+        messages(MutableSequence[TrackedMessage]): All messages tracked as part of the meeting, in a list or a MessageStore
         events(List[TrackedEvent]): List of all events tracked as part of the meeting
         aliases(Dict[str, Optional[str]): Dictionary mapping attendee IRC nick to optional alias
         vote_in_progress(bool): Whether voting is in progress
         motion_index(int): Index into events for the current motion, when voting is in progress
+        journal(Optional[Journal]): Write-ahead journal that records changes to the meeting, if any
+        message_id(Callable[[Meeting], str]): Generates an identifier for a tracked message that doesn't have one
+        lock(RLock): Lock that guards changes to the meeting
     """
 
     founder: str = field()
@@ -175,11 +522,16 @@ class Meeting:
     active: bool = False
     original_topic: str | None = None
     current_topic: str | None = None
-    messages: list[TrackedMessage] = field(factory=list)
+    messages: MutableSequence[TrackedMessage] = field(factory=list)
     events: list[TrackedEvent] = field(factory=list)
     aliases: dict[str, str | None] = field(factory=dict)
     vote_in_progress: bool = False
     motion_index: int | None = None
+    journal: Journal | None = field(default=None, init=False, eq=False, repr=False)
+    message_id: Callable[["Meeting"], str] = field(default=sequence_message_id, init=False, eq=False, repr=False)
+    lock: threading.RLock = field(factory=threading.RLock, init=False, eq=False, repr=False)
+    _event_index: _EventIndex = field(factory=_EventIndex, init=False, eq=False, repr=False)
+    _vote_tally: VoteTally | None = field(default=None, init=False, eq=False, repr=False)
 
     # noinspection PyUnresolvedReferences
     @chair.default
@@ -207,36 +559,107 @@ def meeting_key(channel: str, network: str) -> str:
         return f"{channel}/{network}"
 
     def to_json(self) -> str:
-        """Serialize a meeting to JSON."""
-        return json.dumps(_CONVERTER.unstructure(self), indent="  ")
+        """Serialize a meeting to compact JSON, where each event refers to its message by id."""
+        data = _unstructure_meeting(evolve(self, messages=[], events=[]))
+        if isinstance(self.messages, MessageStore):
+            data["messages"] = self.messages.unstructure()
+            ids: Iterable[str] = self.messages.ids()
+        else:
+            data["messages"] = [_unstructure_message(message) for message in self.messages]
+            ids = (message.id for message in self.messages)
+        first: dict[str, int] = {}
+        for index, message_id in enumerate(ids):
+            first.setdefault(message_id, index)
+        data["events"] = [_compact_event(event, self.messages, first) for event in self.events]
+        return json.dumps({"version": _JSON_VERSION, **data}, separators=(",", ":"))
 
     @staticmethod
     def from_json(data: str) -> "Meeting":
-        """Deserialize a meeting from JSON."""
-        return _CONVERTER.structure(json.loads(data), Meeting)
+        """Deserialize a meeting from JSON, in either the current layout or the original layout."""
+        parsed = json.loads(data)
+        version = parsed.pop("version", 1)
+        if version == 1:
+            return _structure_meeting(parsed)
+        if version != _JSON_VERSION:
+            raise ValueError(f"Unsupported raw log version: {version}")
+        events = parsed.pop("events")
+        meeting = _structure_meeting(parsed)
+        messages: dict[str, TrackedMessage] = {}
+        for message in meeting.messages:
+            messages.setdefault(message.id, message)
+        meeting.events.extend(_structure_event(event, messages) for event in events)
+        return meeting
+
+    @staticmethod
+    def replay(records: Iterable[dict[str, Any]]) -> "Meeting":
+        """Replay the records from a journal, returning a meeting identical to the one that was journaled."""
+        iterator = iter(records)
+        first = next(iterator, None)
+        if not first or first["op"] != "meeting":
+            raise ValueError("Journal does not start with a meeting record")
+        meeting = _structure_meeting(first["meeting"])
+        for record in iterator:
+            _REPLAY[record["op"]](meeting, record)
+        return meeting
+
+    def attach_journal(self, journal: Journal) -> None:
+        """Attach a journal to the meeting, recording the current state of the meeting as the first record."""
+        journal.append({"op": "meeting", "meeting": _unstructure_meeting(self)})
+        self.journal = journal
+
+    def resume_journal(self, journal: Journal) -> None:
+        """Attach a journal that already describes the meeting, like the journal that the meeting was replayed from."""
+        self.journal = journal
+
+    def detach_journal(self) -> Journal | None:
+        """Detach the journal from the meeting, returning it so the caller can close or remove it."""
+        journal, self.journal = self.journal, None
+        return journal
 
     def key(self) -> str:
         return Meeting.meeting_key(self.channel, self.network)
 
+    def snapshot(self) -> "Meeting":
+        """
+        Take a point-in-time copy of the meeting that is safe to hand off to another thread.
+
+        Tracked messages and events are immutable, so they are shared with the original
+        meeting.  All of the mutable containers are copied, so the snapshot is unaffected
+        by any further activity in the meeting.
+        """
+        with self.lock:
+            return evolve(
+                self,
+                chairs=self.chairs.copy(),
+                nicks=self.nicks.copy(),
+                messages=copy(self.messages),
+                events=self.events.copy(),
+                aliases=self.aliases.copy(),
+            )
+
     def display_name(self) -> str:
         """Get the meeting display name."""
         return f"{self.channel}/{self.network}@{formatdate(self.start_time)}"
 
     def add_chair(self, nick: str, *, primary: bool = True) -> None:
         """Add a chair to a meeting, potentially making it the primary chair."""
-        self.track_nick(nick, messages=0)
-        if nick not in self.chairs:
-            self.chairs.append(nick)
-            self.chairs.sort()
-        if primary:
-            self.chair = nick
+        with self.lock:
+            with self._journaled({"op": "add_chair", "nick": nick, "primary": primary}):
+                self._count_nick(nick, 0)
+                if nick not in self.chairs:
+                    self.chairs.append(nick)
+                    self.chairs.sort()
+                if primary:
+                    self.chair = nick
 
     def remove_chair(self, nick: str) -> None:
         """Remove a chair from a meeting, ignoring requests to remove the founder."""
-        if self.founder != nick and nick in self.chairs:
-            self.chairs.remove(nick)
-        if self.chair not in self.chairs:
-            self.chair = self.founder
+        with self.lock:
+            with self._journaled({"op": "remove_chair", "nick": nick}):
+                if self.founder != nick and nick in self.chairs:
+                    self.chairs.remove(nick)
+                if self.chair not in self.chairs:
+                    self.chair = self.founder
 
     def is_chair(self, nick: str) -> bool:
         """Whether a nickname is a chair for the meeting"""
@@ -244,36 +667,204 @@ def is_chair(self, nick: str) -> bool:
 
     def track_attendee(self, nick: str, alias: str | None = None) -> None:
         """Track an IRC nick as a meeting attendee, optionally assigning an alias."""
-        self.aliases[nick] = alias if alias and alias != nick else None
-        self.track_nick(nick=nick, messages=0)
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append({"op": "attendee", "nick": nick, "alias": alias})
+            self.aliases[nick] = alias if alias and alias != nick else None
+            self._count_nick(nick, 0)
 
     def track_nick(self, nick: str, messages: int = 1) -> None:
         """Track an IRC nick, incrementing its count of messages as indicated"""
-        if nick not in self.nicks:
-            self.nicks[nick] = 0
-        self.nicks[nick] += messages
+        with self.lock:
+            if self.journal is not None:
+                self.journal.append({"op": "nick", "nick": nick, "messages": messages})
+            self._count_nick(nick, messages)
 
     def track_message(self, message: Message) -> TrackedMessage:
         """Track a message associated with the meeting."""
-        # Per Wikipedia, actions start and end with \x01 (CTRL-A).
-        # See "DCC CHAT" under: https://en.wikipedia.org/wiki/Client-to-client_protocol
-        # To generate an action in an IRC client like irssi, use /action.
-        payload = message.payload.strip(" \x01")
-        action = payload[:6] == "ACTION"
-        payload = payload[7:].strip() if action else payload.strip()
-        tracked = TrackedMessage(id=message.id, timestamp=message.timestamp, action=action, sender=message.nick, payload=payload)
-        self.messages.append(tracked)
-        self.track_nick(message.nick)
-        return tracked
+        with self.lock:
+            # Per Wikipedia, actions start and end with \x01 (CTRL-A).
+            # See "DCC CHAT" under: https://en.wikipedia.org/wiki/Client-to-client_protocol
+            # To generate an action in an IRC client like irssi, use /action.
+            payload = message.payload.strip(" \x01")
+            action = payload[:6] == "ACTION"
+            payload = payload[7:].strip() if action else payload.strip()
+            message_id = message.id or self.message_id(self)
+            tracked = TrackedMessage(
+                id=message_id, timestamp=message.timestamp, action=action, sender=message.nick, payload=payload
+            )
+            if self.journal is not None:
+                self.journal.append({"op": "message", **_unstructure_message(tracked)})
+            self.messages.append(tracked)
+            self._count_nick(message.nick, 1)
+            return tracked
 
     def track_event(self, event_type: EventType, message: TrackedMessage, operand: Any | None = None) -> TrackedEvent:
         """Track an event associated with a meeting."""
-        event = TrackedEvent(event_type=event_type, message=message, operand=operand)
-        self.events.append(event)
-        return event
+        with self.lock:
+            event = TrackedEvent(event_type=event_type, message=message, operand=operand)
+            if self.journal is not None:
+                self.journal.append(self._event_record(event))
+            self._event_index.sync(self.events)
+            self.events.append(event)
+            self._event_index.append(event)
+            if event_type == EventType.VOTE and self._vote_tally is not None and self._vote_tally.motion_index == self.motion_index:
+                self._vote_tally.add(message.sender, VotingAction(str(operand)))
+            return event
 
     def pop_event(self) -> TrackedEvent | None:
         """Pop the last tracked event off the list of events, if possible, returning the event."""
-        # We do not allow the caller to pop the very first event (#startmeeting), because that would leave
-        # things in a strange, indeterminate state.  If they don't want the meeting, they should end it.
-        return self.events.pop() if len(self.events) > 1 else None
+        with self.lock:
+            # We do not allow the caller to pop the very first event (#startmeeting), because that would leave
+            # things in a strange, indeterminate state.  If they don't want the meeting, they should end it.
+            if len(self.events) <= 1:
+                return None
+            if self.journal is not None:
+                self.journal.append({"op": "pop"})
+            self._event_index.sync(self.events)
+            event = self.events.pop()
+            self._event_index.pop(event, self.events)
+            tally = self._vote_tally
+            if event.event_type == EventType.VOTE and tally is not None and tally.motion_index == self.motion_index:
+                if event.message.sender in tally.votes:  # otherwise, the tally is out of date and will be rebuilt
+                    tally.remove(event.message.sender)
+            return event
+
+    def events_of(self, event_type: EventType, start: int = 0) -> list[TrackedEvent]:
+        """
+        Get the events of a particular type in order, optionally starting at a position in the list of events.
+
+        This uses an index that is maintained as events are tracked, so it only touches the
+        events that are returned, no matter how many other events there are.
+        """
+        self._event_index.sync(self.events)
+        positions = self._event_index.positions.get(event_type, [])
+        return [self.events[position] for position in positions[bisect_left(positions, start) :]]
+
+    def vote_tally(self) -> VoteTally:
+        """
+        Get the running tally of votes on the current motion.
+
+        The tally is maintained as votes are tracked and popped.  It's only built from the
+        events (once) when it's missing or out of date, like after a meeting is recovered.
+        """
+        with self.lock:
+            tally = self._vote_tally
+            start = self.motion_index + 1 if self.motion_index is not None else len(self.events)
+            if tally is None or tally.motion_index != self.motion_index or tally.total != self._count_events(EventType.VOTE, start):
+                tally = VoteTally(self.motion_index)
+                for event in self.events_of(EventType.VOTE, start=start):
+                    tally.add(event.message.sender, VotingAction(str(event.operand)))
+                self._vote_tally = tally
+            return tally
+
+    def _count_events(self, event_type: EventType, start: int) -> int:
+        """Count the events of a particular type at or after a position in the list of events."""
+        self._event_index.sync(self.events)
+        positions = self._event_index.positions.get(event_type, [])
+        return len(positions) - bisect_left(positions, start)
+
+    def _count_nick(self, nick: str, messages: int) -> None:
+        """Increment the count of messages for a nick, without recording anything in the journal."""
+        self.nicks[nick] = self.nicks.get(nick, 0) + messages
+
+    def _event_record(self, event: TrackedEvent) -> dict[str, Any]:
+        """Build the journal record for an event, referring to its message by index when possible."""
+        record: dict[str, Any] = {"op": "event", "type": event.event_type.value, "operand": event.operand}
+        index = self._message_index(event.message)
+        record["message"] = index if index is not None else _unstructure_message(event.message)
+        if isinstance(event.operand, VotingAction):
+            record["voting"] = True  # so the operand is restored as a VotingAction rather than a plain string
+        if event.id != event.message.id or event.timestamp != event.message.timestamp:
+            record["id"], record["timestamp"] = event.id, event.timestamp.isoformat()
+        return record
+
+    def _message_index(self, message: TrackedMessage) -> int | None:
+        """Find the index of a tracked message, which is almost always the most recent message."""
+        if isinstance(self.messages, MessageStore):
+            # views are never identical to the message that was tracked, but are always equal to it
+            return next((index for index in range(len(self.messages) - 1, -1, -1) if self.messages[index] == message), None)
+        for index in range(len(self.messages) - 1, -1, -1):
+            if self.messages[index] is message:
+                return index
+        return None
+
+    @contextmanager
+    def _journaled(self, record: dict[str, Any]) -> Iterator[None]:
+        """Record an operation in the journal, suppressing the records for any changes it makes internally."""
+        journal = self.journal
+        if journal is None:
+            yield
+            return
+        journal.append(record)
+        self.journal = None
+        try:
+            yield
+        finally:
+            self.journal = journal
+
+
+def _compact_event(event: TrackedEvent, messages: Sequence[TrackedMessage], first: dict[str, int]) -> dict[str, Any]:
+    """Unstructure an event for the raw log, referring to its message by id whenever the id is unambiguous."""
+    index = first.get(event.message.id)
+    referenced = index is not None and messages[index] == event.message
+    data: dict[str, Any] = {
+        "event_type": event.event_type.value,
+        "message": event.message.id if referenced else _unstructure_message(event.message),
+        "operand": unstructure_value(event.operand),
+    }
+    if event.id != event.message.id or event.timestamp != event.message.timestamp:
+        data["id"], data["timestamp"] = event.id, event.timestamp.isoformat()
+    return data
+
+
+def _structure_event(data: dict[str, Any], messages: dict[str, TrackedMessage]) -> TrackedEvent:
+    """Structure an event from the raw log, the inverse of _compact_event()."""
+    reference = data["message"]
+    message = messages[reference] if isinstance(reference, str) else _structure_message(reference)
+    event = TrackedEvent(event_type=EventType(data["event_type"]), message=message, operand=data["operand"])
+    if "id" in data:
+        event = evolve(event, id=data["id"], timestamp=datetime.fromisoformat(data["timestamp"]))
+    return event
+
+
+def _replay_message(meeting: Meeting, record: dict[str, Any]) -> None:
+    message = _structure_message(record)
+    meeting.messages.append(message)
+    meeting._count_nick(message.sender, 1)  # noqa: SLF001
+
+
+def _replay_event(meeting: Meeting, record: dict[str, Any]) -> None:
+    reference = record["message"]
+    message = meeting.messages[reference] if isinstance(reference, int) else _structure_message(reference)
+    operand = VotingAction(record["operand"]) if record.get("voting") else record["operand"]
+    event = TrackedEvent(event_type=EventType(record["type"]), message=message, operand=operand)
+    if "id" in record:
+        event = evolve(event, id=record["id"], timestamp=datetime.fromisoformat(record["timestamp"]))
+    meeting.events.append(event)
+
+
+def _replay_set(meeting: Meeting, record: dict[str, Any]) -> None:
+    name = record["field"]
+    setattr(meeting, name, _STRUCTURE_FIELD[name](record["value"]))
+
+
+# Precompiled serializers; see serializer.py
+_unstructure_meeting = unstructure_fn(Meeting)
+_structure_meeting = structure_fn(Meeting)
+_unstructure_message = unstructure_fn(TrackedMessage)
+_structure_message = structure_fn(TrackedMessage)
+_UNSTRUCTURE_FIELD = {attribute.name: value_unstructure_fn(attribute.type) for attribute in fields(Meeting) if attribute.init}
+_STRUCTURE_FIELD = {attribute.name: value_structure_fn(attribute.type) for attribute in fields(Meeting) if attribute.init}
+
+# Replay functions for each journal operation, other than the initial "meeting" record
+_REPLAY: dict[str, Callable[[Meeting, dict[str, Any]], Any]] = {
+    "message": _replay_message,
+    "event": _replay_event,
+    "pop": lambda meeting, _: meeting.pop_event(),
+    "nick": lambda meeting, record: meeting.track_nick(record["nick"], messages=record["messages"]),
+    "attendee": lambda meeting, record: meeting.track_attendee(record["nick"], record["alias"]),
+    "add_chair": lambda meeting, record: meeting.add_chair(record["nick"], primary=record["primary"]),
+    "remove_chair": lambda meeting, record: meeting.remove_chair(record["nick"]),
+    "set": _replay_set,
+}
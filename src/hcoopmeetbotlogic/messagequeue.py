@@ -0,0 +1,163 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Bounded message queue between Limnoria callbacks and meeting logic.
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from logging import Logger
+from typing import Any
+
+from attrs import frozen
+
+# Name of the worker thread
+_THREAD_NAME = "meetbot-messages"
+
+# Default number of seconds that a full queue blocks the caller before a message is dropped
+BLOCK_TIMEOUT = 5.0
+
+
+@frozen
+class QueueStats:
+    # noinspection PyUnresolvedReferences
+    """
+    Point-in-time statistics for a message queue.
+
+    Attributes:
+        depth(int): Number of messages waiting to be processed, across all meetings
+        enqueued(int): Number of messages that have been enqueued
+        processed(int): Number of messages that have been processed
+        blocked(int): Number of times the caller had to wait because a meeting's queue was full
+        dropped(int): Number of messages dropped because a meeting's queue was still full after waiting
+        average_latency(float): Average time from enqueue until processing completed, in seconds
+        max_latency(float): Maximum time from enqueue until processing completed, in seconds
+    """
+
+    depth: int
+    enqueued: int
+    processed: int
+    blocked: int
+    dropped: int
+    average_latency: float
+    max_latency: float
+
+
+class MessageQueue:
+    """
+    Bounded queues of messages for each meeting, drained in order by a single worker thread.
+
+    Each message is submitted as a task along with a key (normally a meeting key).  Tasks
+    run one at a time, in the order they were submitted, so a meeting sees its inbound and
+    outbound messages in the same order as it would if they were handled inline.  Because
+    there is only one worker, meeting logic never runs concurrently with itself.
+
+    No more than size tasks may be waiting for any one key.  When a key's queue is full,
+    the caller blocks until there is space, which applies backpressure to the IRC callback
+    thread.  If there is still no space after the timeout, the task is dropped.  Both
+    conditions are counted, so bursts of traffic show up in the statistics.
+    """
+
+    def __init__(self, logger: Logger, size: int, timeout: float = BLOCK_TIMEOUT) -> None:
+        if size < 1:
+            raise ValueError("Message queue requires a size of at least one")
+        self._logger = logger
+        self._size = size
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._tasks: deque[tuple[str, Callable[[], Any], float]] = deque()
+        self._depths: dict[str, int] = {}
+        self._running = False
+        self._closed = False
+        self._enqueued = 0
+        self._processed = 0
+        self._blocked = 0
+        self._dropped = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._thread = threading.Thread(target=self._drain, name=_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks that have been enqueued but have not yet completed."""
+        with self._lock:
+            return len(self._tasks) + (1 if self._running else 0)
+
+    def put(self, key: str, task: Callable[[], Any]) -> bool:
+        """Enqueue a task after all other tasks already enqueued, returning False if it was dropped."""
+        with self._changed:
+            if self._closed:
+                raise RuntimeError("Message queue has been shut down")
+            # A task that enqueues more work (like a reply that is echoed back to us) must
+            # never wait on its own queue, because the worker is the only thing that drains it.
+            if self._depths.get(key, 0) >= self._size and threading.current_thread() is not self._thread:
+                self._blocked += 1
+                if not self._changed.wait_for(lambda: self._closed or self._depths.get(key, 0) < self._size, self._timeout):
+                    self._dropped += 1
+                    self._logger.warning("Dropped message for %s, since its queue is full", key)
+                    return False
+                if self._closed:
+                    raise RuntimeError("Message queue has been shut down")
+            self._tasks.append((key, task, time.monotonic()))
+            self._depths[key] = self._depths.get(key, 0) + 1
+            self._enqueued += 1
+            self._changed.notify_all()
+        return True
+
+    def stats(self) -> QueueStats:
+        """Get statistics for the queue."""
+        with self._lock:
+            return QueueStats(
+                depth=len(self._tasks),
+                enqueued=self._enqueued,
+                processed=self._processed,
+                blocked=self._blocked,
+                dropped=self._dropped,
+                average_latency=self._total_latency / self._processed if self._processed else 0.0,
+                max_latency=self._max_latency,
+            )
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for all enqueued tasks to complete, returning False if the timeout expires first."""
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._tasks and not self._running, timeout=timeout)
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        """Flush all enqueued tasks and then stop the worker thread, returning False if the flush timed out."""
+        flushed = self.flush(timeout=timeout)
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        if flushed:
+            self._thread.join()
+        return flushed
+
+    def _drain(self) -> None:
+        """Execute tasks in order until the queue is shut down."""
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._closed or self._tasks)
+                if not self._tasks:
+                    return
+                key, task, enqueued = self._tasks.popleft()
+                self._depths[key] -= 1
+                if not self._depths[key]:
+                    del self._depths[key]
+                self._running = True
+                self._changed.notify_all()  # there is now space on this key's queue
+            try:
+                task()
+            except Exception:
+                self._logger.exception("Message task failed for %s", key)
+            finally:
+                latency = time.monotonic() - enqueued
+                with self._changed:
+                    self._running = False
+                    self._processed += 1
+                    self._total_latency += latency
+                    self._max_latency = max(self._max_latency, latency)
+                    self._changed.notify_all()
@@ -0,0 +1,94 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Background write pipeline.
+"""
+
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger
+from typing import Any
+
+# Prefix used to name worker threads; all of our background threads are named "meetbot-*", to stand out in a thread dump
+_THREAD_PREFIX = "meetbot-writer"
+
+
+class WritePipeline:
+    """
+    Bounded pool of worker threads that executes tasks in order for each key.
+
+    Tasks submitted with the same key (normally a meeting key) are executed one at a
+    time, in the order they were submitted.  Tasks for different keys may run
+    concurrently, up to the configured number of workers.  This lets us get slow disk
+    writes off of the IRC callback thread without allowing an older save to overwrite
+    the results of a newer one.
+    """
+
+    def __init__(self, logger: Logger, workers: int) -> None:
+        if workers < 1:
+            raise ValueError("Write pipeline requires at least one worker")
+        self._logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=_THREAD_PREFIX)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._queues: dict[str, deque[tuple[Callable[[], Any], Future[Any]]]] = {}
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks that have been submitted but have not yet completed."""
+        with self._lock:
+            return self._pending
+
+    def submit(self, key: str, task: Callable[[], Any]) -> Future[Any]:
+        """Submit a task to be executed after all other tasks already submitted for the same key."""
+        future: Future[Any] = Future()
+        with self._lock:
+            self._pending += 1
+            queue = self._queues.get(key)
+            if queue is not None:
+                queue.append((task, future))  # a worker is already draining this key and will pick it up
+                return future
+            self._queues[key] = deque([(task, future)])
+        try:
+            self._executor.submit(self._drain, key)
+        except RuntimeError:  # the executor has been shut down
+            with self._lock:
+                del self._queues[key]
+                self._pending -= 1
+                self._idle.notify_all()
+            raise
+        return future
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for all pending tasks to complete, returning False if the timeout expires first."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        """Flush all pending tasks and then stop the worker threads, returning False if the flush timed out."""
+        flushed = self.flush(timeout=timeout)
+        self._executor.shutdown(wait=flushed)
+        return flushed
+
+    def _drain(self, key: str) -> None:
+        """Execute tasks for a key in order until its queue is empty."""
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    return
+                task, future = queue.popleft()
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(task())
+            except Exception as e:
+                self._logger.exception("Background task failed for %s", key)
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._idle.notify_all()
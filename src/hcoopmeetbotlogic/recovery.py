@@ -0,0 +1,115 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Crash recovery for active meetings.
+"""
+
+import time
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from pathlib import Path
+
+from attrs import field, frozen
+
+from hcoopmeetbotlogic.config import Config, MessageIds, MessageStorage
+from hcoopmeetbotlogic.journal import JOURNAL_EXTENSION, Journal, read_journal
+from hcoopmeetbotlogic.meeting import MESSAGE_ID_GENERATORS, Meeting, MessageStore
+
+# Maximum number of threads used to load journals
+_RECOVERY_WORKERS = 8
+
+# Prefix used to name recovery threads
+_THREAD_PREFIX = "meetbot-recovery"
+
+
+@frozen
+class Recovery:
+    # noinspection PyUnresolvedReferences
+    """
+    Results from recovering meetings.
+
+    Attributes:
+        recovered(List[Meeting]): Active meetings that were recovered, each with its journal attached again
+        completed(List[Meeting]): Meetings that had already ended, but were not yet written to disk when the bot stopped
+        failed(List[Path]): Journals that could not be recovered, which are left on disk
+        elapsed(float): Elapsed time for recovery, in seconds
+    """
+
+    recovered: list[Meeting] = field(factory=list)
+    completed: list[Meeting] = field(factory=list)
+    failed: list[Path] = field(factory=list)
+    elapsed: float = 0.0
+
+
+def _load(path: Path, storage: MessageStorage, ids: MessageIds) -> Meeting:
+    """Load a meeting from its journal, storing its messages and generating message identifiers as configured."""
+    meeting = Meeting.replay(read_journal(path))
+    meeting.message_id = MESSAGE_ID_GENERATORS[ids]
+    if storage == MessageStorage.COLUMNAR:
+        meeting.messages = MessageStore(meeting.messages)  # safe, since no journal is attached yet
+    return meeting
+
+
+def _resume(meeting: Meeting, path: Path, logger: Logger, meetings: list[Meeting], failed: list[Path]) -> None:
+    """Resume journaling a recovered meeting, appending to the journal it was recovered from."""
+    try:
+        meeting.resume_journal(Journal(path, logger))
+        meetings.append(meeting)
+    except OSError:
+        logger.exception("Failed to reopen journal %s", path)
+        failed.append(path)
+
+
+def recover_meetings(config: Config, logger: Logger, skip: Collection[str] = ()) -> Recovery:
+    """
+    Recover meetings from the journals left on disk when the bot stopped.
+
+    Journals are loaded in parallel.  A meeting that is still active is recovered with
+    its journal attached again, so journaling continues where it left off.  If there is
+    more than one active meeting for the same channel, only the most recent is recovered.
+    Meetings that had already ended are returned separately, so the caller can write them
+    to disk and remove their journals.
+
+    Args:
+        config(Config): Plugin configuration, which identifies the journal directory
+        logger(Logger): Python logger instance that should be used during processing
+        skip(Collection[str]): Identifiers for meetings that are already active, whose journals are still in use
+    """
+    start = time.perf_counter()
+    journal_dir = Path(config.journal_dir) if config.journal_dir else None
+    if not journal_dir or not journal_dir.is_dir():
+        return Recovery(elapsed=time.perf_counter() - start)
+
+    paths = sorted(path for path in journal_dir.glob(f"*{JOURNAL_EXTENSION}") if path.stem not in skip)
+    if not paths:
+        return Recovery(elapsed=time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=min(len(paths), _RECOVERY_WORKERS), thread_name_prefix=_THREAD_PREFIX) as executor:
+        futures = {path: executor.submit(_load, path, config.message_storage, config.message_ids) for path in paths}
+
+    completed: list[Meeting] = []
+    failed: list[Path] = []
+    active: dict[str, tuple[Meeting, Path]] = {}
+    for path, future in futures.items():
+        try:
+            meeting = future.result()
+        except Exception:
+            logger.exception("Failed to recover meeting from journal %s", path)
+            failed.append(path)
+            continue
+        if not meeting.active:
+            _resume(meeting, path, logger, completed, failed)
+            continue
+        candidate = (meeting, path)
+        if meeting.key() in active:
+            candidate, older = sorted([active[meeting.key()], candidate], key=lambda c: c[0].start_time, reverse=True)
+            logger.warning("Ignoring journal %s, since a newer meeting exists for %s", older[1], meeting.key())
+            failed.append(older[1])
+        active[meeting.key()] = candidate
+
+    recovered: list[Meeting] = []
+    for meeting, path in active.values():
+        _resume(meeting, path, logger, recovered, failed)
+
+    return Recovery(recovered=recovered, completed=completed, failed=failed, elapsed=time.perf_counter() - start)
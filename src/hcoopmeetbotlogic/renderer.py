@@ -0,0 +1,305 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Render formatted meeting output in separate worker processes.
+"""
+
+import os
+import pickle  # noqa: S403 # only used to talk to our own worker processes
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from collections.abc import Sequence
+from logging import Logger
+from typing import IO, Any
+
+from hcoopmeetbotlogic.config import Config
+from hcoopmeetbotlogic.location import Locations
+
+# Name of the health check thread
+_THREAD_NAME = "meetbot-render-health"
+
+# Default number of seconds between health checks for idle worker processes
+HEALTH_INTERVAL = 10.0
+
+# Default number of seconds that a worker process has to answer a health check
+PING_TIMEOUT = 5.0
+
+# Seconds that a worker process gets to exit on its own at shutdown before it's killed
+_EXIT_TIMEOUT = 5.0
+
+# Every message is a pickled tuple, preceded by its length
+_HEADER = struct.Struct("!I")
+
+# Requests understood by a worker process
+_PING = "ping"
+_RENDER = "render"
+
+# Responses sent by a worker process
+_OK = "ok"
+_ERROR = "error"
+
+
+def _command() -> list[str]:
+    """Command used to start a worker process."""
+    return [sys.executable, "-m", "hcoopmeetbotlogic.renderer"]
+
+
+def _encode(message: tuple[Any, ...]) -> bytes:
+    """Encode one message to be sent over a pipe."""
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(data)) + data
+
+
+def _send(out: IO[bytes], message: tuple[Any, ...]) -> None:
+    """Send one message over a pipe."""
+    view = memoryview(_encode(message))
+    while view:
+        view = view[out.write(view) :]  # an unbuffered pipe may accept only part of the data
+    out.flush()
+
+
+def _receive(source: IO[bytes]) -> tuple[Any, ...] | None:
+    """Receive one message from a pipe, blocking until it arrives, or return None at end of file."""
+    header = source.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    data = source.read(size)
+    if len(data) < size:
+        return None
+    return pickle.loads(data)  # type: ignore[no-any-return] # noqa: S301 # only ever sent by our own process
+
+
+def _write_exactly(fd: int, data: bytes, deadline: float) -> None:
+    """Write all of the data to a non-blocking file descriptor, raising TimeoutError if the deadline passes first."""
+    view = memoryview(data)
+    while view:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0 or not select.select([], [fd], [], timeout)[1]:
+            raise TimeoutError("Timed out sending to render worker")
+        try:
+            view = view[os.write(fd, view) :]  # the pipe may accept only part of the data
+        except BlockingIOError:
+            continue  # the pipe filled up again before we got to it
+
+
+def _read_exactly(fd: int, size: int, deadline: float) -> bytes:
+    """Read exactly size bytes from a file descriptor, raising TimeoutError if the deadline passes first."""
+    chunks, remaining = [], size
+    while remaining:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0 or not select.select([fd], [], [], timeout)[0]:
+            raise TimeoutError("Timed out waiting for render worker")
+        chunk = os.read(fd, remaining)
+        if not chunk:
+            raise EOFError("Render worker exited unexpectedly")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def serve(source: IO[bytes], out: IO[bytes]) -> None:
+    """
+    Handle requests from the bot process until the pipe is closed.
+
+    This runs in the worker process.  Each request renders the formatted log and minutes for
+    a meeting, given its raw log.  A failure is reported back to the bot process rather than
+    ending the worker, so one bad meeting doesn't take down rendering for the others.
+    """
+    while request := _receive(source):
+        try:
+            _handle(*request)
+            _send(out, (_OK, None))
+        except Exception as e:  # noqa: BLE001
+            _send(out, (_ERROR, f"{type(e).__name__}: {e}"))
+
+
+def _handle(kind: str, args: Any) -> None:
+    """Handle a single request in the worker process."""
+    # The writer depends on this module (through the shared state), so it can only be imported here
+    from hcoopmeetbotlogic.meeting import Meeting  # noqa: PLC0415
+    from hcoopmeetbotlogic.writer import write_formatted_log, write_formatted_minutes  # noqa: PLC0415
+
+    if kind == _RENDER:
+        config, locations, raw_log, incremental = args
+        meeting = Meeting.from_json(raw_log)
+        write_formatted_log(config, locations, meeting, incremental=incremental)
+        write_formatted_minutes(config, locations, meeting)
+    elif kind != _PING:
+        raise ValueError(f"Unknown request: {kind}")
+
+
+def main() -> None:
+    """Entrypoint for a worker process, which talks to the bot process over stdin and stdout."""
+    source, out = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr  # anything printed by accident must not corrupt the pipe
+    serve(source, out)
+
+
+class _Worker:
+    """A single worker process, along with the pipes used to talk to it."""
+
+    def __init__(self, command: Sequence[str]) -> None:
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)  # noqa: S603
+        assert self._process.stdin  # always set, since it's a pipe
+        os.set_blocking(self._process.stdin.fileno(), False)  # so a worker that stops reading can't block us forever
+
+    @property
+    def pid(self) -> int:
+        """Process id of the worker process."""
+        return self._process.pid
+
+    def alive(self) -> bool:
+        """Whether the worker process is still running."""
+        return self._process.poll() is None
+
+    def call(self, request: tuple[Any, ...], timeout: float) -> Any:
+        """
+        Send a request and wait for the response, raising RuntimeError if the worker reports a failure.
+
+        The timeout covers both sending the request and receiving the response, so a worker
+        that stops reading its pipe times out just like one that never answers.
+        """
+        assert self._process.stdin and self._process.stdout  # always set, since both are pipes
+        deadline = time.monotonic() + timeout
+        _write_exactly(self._process.stdin.fileno(), _encode(request), deadline)
+        (size,) = _HEADER.unpack(_read_exactly(self._process.stdout.fileno(), _HEADER.size, deadline))
+        data = _read_exactly(self._process.stdout.fileno(), size, deadline)
+        status, result = pickle.loads(data)  # noqa: S301 # only ever sent by our own worker process
+        if status != _OK:
+            raise RuntimeError(f"Render failed: {result}")
+        return result
+
+    def stop(self, timeout: float = _EXIT_TIMEOUT) -> None:
+        """Stop the worker process, letting it exit on its own if it will, and otherwise killing it."""
+        assert self._process.stdin and self._process.stdout  # always set, since both are pipes
+        try:
+            self._process.stdin.close()  # the worker exits once it sees end of file
+            self._process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+            self._process.wait()
+        self._process.stdout.close()
+
+
+class _Slot:
+    """One position in the pool, which always has a worker process that may be replaced over time."""
+
+    def __init__(self, command: Sequence[str]) -> None:
+        self.lock = threading.Lock()  # held while the worker is in use, since it handles one request at a time
+        self.worker = _Worker(command)
+
+
+class RenderWorkers:
+    """
+    Pool of worker processes that render formatted output outside of the bot process.
+
+    Rendering the formatted log and minutes is CPU-bound, and in the bot process it holds
+    the GIL that Limnoria's networking threads also need.  A worker process receives the
+    serialized raw log for a meeting over a pipe and writes the formatted output itself, so a
+    heavy render never stalls the bot.  Each worker handles one request at a time.  A meeting
+    is always rendered by the same worker, so the worker can append to the formatted log
+    incrementally, rather than rendering the whole thing every time.
+
+    A worker that crashes, fails to answer a health check, or takes longer than the timeout
+    to accept a request or to render it is killed and replaced with a fresh process.  The render that was in progress
+    fails, but the next save for that meeting renders everything again.  Idle workers are
+    health checked periodically in the background, so a dead worker is replaced before the
+    next save needs it.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        workers: int,
+        timeout: float,
+        interval: float = HEALTH_INTERVAL,
+        command: Sequence[str] | None = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Render workers require at least one worker")
+        self._logger = logger
+        self._timeout = timeout
+        self._interval = interval
+        self._command = list(command) if command else _command()
+        self._lock = threading.Lock()
+        self._restarts = 0
+        self._closed = threading.Event()
+        self._slots = [_Slot(self._command) for _ in range(workers)]
+        self._thread = threading.Thread(target=self._monitor, name=_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+    @property
+    def restarts(self) -> int:
+        """Number of times that a worker process has been replaced."""
+        with self._lock:
+            return self._restarts
+
+    def pids(self) -> list[int]:
+        """Process ids of the current worker processes."""
+        return [slot.worker.pid for slot in self._slots]
+
+    def render(self, config: Config, locations: Locations, raw_log: str, *, incremental: bool) -> None:
+        """Render the formatted output for a meeting, given its raw log, raising RuntimeError if the render fails."""
+        slot = self._slots[zlib.crc32(locations.raw_log.path.encode("utf-8")) % len(self._slots)]
+        with slot.lock:
+            if self._closed.is_set():
+                raise RuntimeError("Render workers have been shut down")
+            if not slot.worker.alive():
+                self._restart(slot, "exited")
+            try:
+                slot.worker.call((_RENDER, (config, locations, raw_log, incremental)), self._timeout)
+            except (OSError, EOFError, TimeoutError, pickle.UnpicklingError) as e:
+                self._restart(slot, f"{type(e).__name__}: {e}")
+                raise RuntimeError(f"Render worker failed: {e}") from e
+
+    def check(self) -> int:
+        """Health check all idle worker processes, replacing any that are unhealthy, and return the number replaced."""
+        replaced = 0
+        for slot in self._slots:
+            if not slot.lock.acquire(blocking=False):
+                continue  # busy rendering, which has its own timeout
+            try:
+                if self._closed.is_set():
+                    break
+                try:
+                    slot.worker.call((_PING, None), PING_TIMEOUT)
+                except (OSError, EOFError, TimeoutError, RuntimeError, pickle.UnpicklingError) as e:
+                    self._restart(slot, f"failed health check ({type(e).__name__}: {e})")
+                    replaced += 1
+            finally:
+                slot.lock.release()
+        return replaced
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """Stop the health checks and then stop all worker processes, waiting for any render in progress."""
+        self._closed.set()
+        self._thread.join()
+        for slot in self._slots:
+            with slot.lock:
+                slot.worker.stop(timeout=timeout if timeout is not None else _EXIT_TIMEOUT)
+
+    def _restart(self, slot: _Slot, reason: str) -> None:
+        """Replace the worker process in a slot, which the caller has locked."""
+        self._logger.warning("Restarting render worker %d: %s", slot.worker.pid, reason)
+        slot.worker.stop(timeout=0)
+        slot.worker = _Worker(self._command)
+        with self._lock:
+            self._restarts += 1
+
+    def _monitor(self) -> None:
+        """Health check the worker processes periodically, until shut down."""
+        while not self._closed.wait(self._interval):
+            try:
+                self.check()
+            except Exception:
+                self._logger.exception("Render worker health check failed")
+
+
+if __name__ == "__main__":
+    main()
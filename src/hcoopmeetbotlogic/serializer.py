@@ -0,0 +1,252 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Precompiled serialization for attrs classes.
+
+Rather than interpreting each class's fields every time an object is converted, like a
+generic converter does, we generate a dedicated Python function for each class the first
+time it's needed.  Each generated function converts every field with a single inline
+expression, chosen based on the field's type annotation.  The resulting unstructured
+data is plain JSON-compatible dicts, lists, and scalars: datetimes become ISO 8601
+strings, enums become their values, and nested attrs classes become dicts.
+"""
+
+import types
+from collections.abc import Callable, MutableSequence, Sequence
+from datetime import datetime
+from enum import Enum
+from typing import Any, TypeVar, Union, get_args, get_origin, get_type_hints
+
+from attrs import NOTHING, Attribute, fields, has
+
+_T = TypeVar("_T")
+
+# Compiled functions, keyed by kind and type
+_COMPILED: dict[Any, Callable[..., Any]] = {}
+
+# Generic types that are unstructured to and structured from a list
+_SEQUENCES = {list, Sequence, MutableSequence}
+
+# Types that are already JSON-compatible, so they are used as-is
+_SCALARS = (str, int, float, bool)
+
+
+def unstructure_value(value: Any) -> Any:
+    """Unstructure a value whose type isn't known in advance, based on its runtime type."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list | tuple):
+        return [unstructure_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: unstructure_value(item) for key, item in value.items()}
+    cls: type = type(value)
+    if has(cls):
+        return unstructure_fn(cls)(value)
+    return value
+
+
+def _optional(annotation: Any) -> Any | None:
+    """If the annotation is Optional[X], return X, otherwise None."""
+    if get_origin(annotation) in {Union, types.UnionType}:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1 and len(get_args(annotation)) == 2:
+            return args[0]
+    return None
+
+
+def _serialized(cls: type, attribute: "Attribute[Any]") -> tuple[str, Any]:
+    """
+    Get the name and type that a field is serialized as.
+
+    A private field that is exposed via a property named for its alias (like _timestamp,
+    exposed as timestamp) is serialized via the property, so the stored representation
+    can differ from the public one.  The field's converter must accept the property's type.
+    """
+    alias = attribute.alias or attribute.name
+    exposed = getattr(cls, alias, None)
+    if alias != attribute.name and isinstance(exposed, property) and exposed.fget:
+        return alias, get_type_hints(exposed.fget)["return"]
+    return attribute.name, attribute.type
+
+
+class _Generator:
+    """Generates the source code for conversion functions, tracking the objects the code refers to."""
+
+    def __init__(self) -> None:
+        self.namespace: dict[str, Any] = {"fromisoformat": datetime.fromisoformat, "unstructure_value": unstructure_value}
+        self._depth = 0
+        self.inlined: list[type] = []
+
+    def reference(self, value: Any) -> str:
+        """Make an object available to the generated code, returning the name it can be referred to by."""
+        name = f"_ref{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def variable(self) -> str:
+        """Get a unique variable name for use in a comprehension."""
+        self._depth += 1
+        return f"_v{self._depth}"
+
+    def unstructure_class(self, cls: type, expression: str) -> str:
+        """Generate a dict display that unstructures an attrs class inline, without a function call."""
+        self.inlined.append(cls)
+        entries = [
+            f"{name!r}: {self.unstructure(annotation, f'{expression}.{name}')}"
+            for name, annotation in (_serialized(cls, attribute) for attribute in fields(cls) if attribute.init)
+        ]
+        self.inlined.pop()
+        return f"{{{', '.join(entries)}}}"
+
+    def structure_class(self, cls: type, expression: str) -> str | None:
+        """
+        Generate a constructor call that structures an attrs class inline, without a function call.
+
+        This is only possible when every field is required, since otherwise the arguments
+        depend on which keys are present.  Returns None if the class can't be inlined.
+        """
+        attributes = [attribute for attribute in fields(cls) if attribute.init]
+        if cls in self.inlined or any(attribute.default is not NOTHING for attribute in attributes):
+            return None
+        self.inlined.append(cls)
+        arguments = []
+        for attribute in attributes:
+            name, annotation = _serialized(cls, attribute)
+            arguments.append(f"{attribute.alias}={self.structure(annotation, f'{expression}[{name!r}]')}")
+        self.inlined.pop()
+        return f"{self.reference(cls)}({', '.join(arguments)})"
+
+    def unstructure(self, annotation: Any, expression: str) -> str:  # noqa: PLR0911
+        """Generate an expression that unstructures an expression of the given type."""
+        if annotation in _SCALARS:
+            return expression
+        if annotation is Any:
+            return f"unstructure_value({expression})"
+        if annotation is datetime:
+            return f"{expression}.isoformat()"
+        if isinstance(annotation, type) and issubclass(annotation, Enum):
+            return f"{expression}.value"
+        if has(annotation):
+            if annotation in self.inlined:  # a recursive reference
+                return f"{self.reference(unstructure_fn(annotation))}({expression})"
+            return self.unstructure_class(annotation, expression)
+        inner = _optional(annotation)
+        if inner is datetime:
+            return f"({expression}.isoformat() if {expression} else None)"
+        if inner is not None:
+            return f"(None if {expression} is None else {self.unstructure(inner, expression)})"
+        origin, args = get_origin(annotation), get_args(annotation)
+        if origin in _SEQUENCES:
+            item = self.variable()
+            converted = self.unstructure(args[0], item)
+            return f"list({expression})" if converted == item else f"[{converted} for {item} in {expression}]"
+        if origin is dict and args[0] is str:
+            key, item = self.variable(), self.variable()
+            converted = self.unstructure(args[1], item)
+            return (
+                f"dict({expression})" if converted == item else f"{{{key}: {converted} for {key}, {item} in {expression}.items()}}"
+            )
+        raise TypeError(f"Unable to unstructure type: {annotation}")
+
+    def structure(self, annotation: Any, expression: str) -> str:  # noqa: PLR0911
+        """Generate an expression that structures an unstructured expression into the given type."""
+        if annotation in _SCALARS or annotation is Any:
+            return expression
+        if annotation is datetime:
+            return f"fromisoformat({expression})"
+        if isinstance(annotation, type) and issubclass(annotation, Enum):
+            return f"{self.reference(annotation)}({expression})"
+        if has(annotation):
+            return self.structure_class(annotation, expression) or f"{self.reference(structure_fn(annotation))}({expression})"
+        inner = _optional(annotation)
+        if inner is datetime:
+            return f"(fromisoformat({expression}) if {expression} else None)"
+        if inner is not None:
+            return f"(None if {expression} is None else {self.structure(inner, expression)})"
+        origin, args = get_origin(annotation), get_args(annotation)
+        if origin in _SEQUENCES:
+            item = self.variable()
+            converted = self.structure(args[0], item)
+            return f"list({expression})" if converted == item else f"[{converted} for {item} in {expression}]"
+        if origin is dict and args[0] is str:
+            key, item = self.variable(), self.variable()
+            converted = self.structure(args[1], item)
+            return (
+                f"dict({expression})" if converted == item else f"{{{key}: {converted} for {key}, {item} in {expression}.items()}}"
+            )
+        raise TypeError(f"Unable to structure type: {annotation}")
+
+    def compile(self, name: str, source: str) -> Callable[..., Any]:
+        """Compile generated source code, returning the function with the given name."""
+        exec(compile(source, f"<serializer {name}>", "exec"), self.namespace)  # noqa: S102 # the source is generated here, not supplied
+        return self.namespace[name]  # type: ignore[no-any-return]
+
+
+def _cached(key: Any, generate: Callable[[_Generator], Callable[..., Any]]) -> Callable[..., Any]:
+    """Get a compiled function from the cache, generating it the first time it's needed."""
+    if key not in _COMPILED:
+        _COMPILED[key] = generate(_Generator())
+    return _COMPILED[key]
+
+
+def _generate_unstructure(generator: _Generator, cls: type) -> Callable[..., Any]:
+    return generator.compile("unstructure", f"def unstructure(o):\n    return {generator.unstructure_class(cls, 'o')}\n")
+
+
+def _generate_structure(generator: _Generator, cls: type) -> Callable[..., Any]:
+    inlined = generator.structure_class(cls, "d")
+    if inlined:
+        return generator.compile("structure", f"def structure(d):\n    return {inlined}\n")
+    generator.inlined.append(cls)
+    lines = ["def structure(d):", "    kwargs = {"]
+    optional = []
+    for attribute in fields(cls):
+        if attribute.init:
+            name, annotation = _serialized(cls, attribute)
+            expression = generator.structure(annotation, f"d[{name!r}]")
+            if attribute.default is NOTHING:
+                lines.append(f"        {attribute.alias!r}: {expression},")
+            else:
+                optional += [f"    if {name!r} in d:", f"        kwargs[{attribute.alias!r}] = {expression}"]
+    lines += ["    }", *optional, f"    return {generator.reference(cls)}(**kwargs)"]
+    return generator.compile("structure", "\n".join(lines) + "\n")
+
+
+def unstructure_fn(cls: type) -> Callable[[Any], dict[str, Any]]:
+    """
+    Get a function that unstructures an instance of an attrs class into a dict.
+
+    Fields that are not set via the constructor are not included, so the result can
+    always be passed back to structure_fn().
+    """
+    return _cached(("unstructure", cls), lambda generator: _generate_unstructure(generator, cls))
+
+
+def structure_fn(cls: type[_T]) -> Callable[[dict[str, Any]], _T]:
+    """
+    Get a function that structures a dict into an instance of an attrs class.
+
+    Fields with a default may be missing from the dict, in which case the default is
+    used.  Any keys that don't correspond to a field are ignored.
+    """
+    return _cached(("structure", cls), lambda generator: _generate_structure(generator, cls))
+
+
+def value_unstructure_fn(annotation: Any) -> Callable[[Any], Any]:
+    """Get a function that unstructures a single value of the given type."""
+    return _cached(
+        ("unstructure value", annotation),
+        lambda generator: generator.compile(
+            "unstructure", f"def unstructure(v):\n    return {generator.unstructure(annotation, 'v')}\n"
+        ),
+    )
+
+
+def value_structure_fn(annotation: Any) -> Callable[[Any], Any]:
+    """Get a function that structures a single value into the given type."""
+    return _cached(
+        ("structure value", annotation),
+        lambda generator: generator.compile("structure", f"def structure(v):\n    return {generator.structure(annotation, 'v')}\n"),
+    )
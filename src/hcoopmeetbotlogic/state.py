@@ -5,11 +5,16 @@
 """
 
 import operator
+import threading
 from collections import deque
 from logging import Logger
 
-from hcoopmeetbotlogic.config import Config
-from hcoopmeetbotlogic.meeting import Meeting
+from hcoopmeetbotlogic.autosave import AutosaveScheduler
+from hcoopmeetbotlogic.config import MESSAGE_IDS_DEFAULT, Config, MessageIds, MessageStorage
+from hcoopmeetbotlogic.meeting import MESSAGE_ID_GENERATORS, Meeting, MessageStore
+from hcoopmeetbotlogic.messagequeue import MessageQueue
+from hcoopmeetbotlogic.pipeline import WritePipeline
+from hcoopmeetbotlogic.renderer import RenderWorkers
 
 _COMPLETED_SIZE = 16  # size of the _COMPLETED deque
 
@@ -32,6 +37,39 @@
 except NameError:
     _CONFIG = None
 
+try:
+    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    _PIPELINE  # type: ignore[has-type,used-before-def] # noqa: B018
+except NameError:
+    _PIPELINE = None
+
+try:
+    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    _QUEUE  # type: ignore[has-type,used-before-def] # noqa: B018
+except NameError:
+    _QUEUE = None
+
+try:
+    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    _AUTOSAVE  # type: ignore[has-type,used-before-def] # noqa: B018
+except NameError:
+    _AUTOSAVE = None
+
+try:
+    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    _RENDER_WORKERS  # type: ignore[has-type,used-before-def] # noqa: B018
+except NameError:
+    _RENDER_WORKERS = None
+
+# The registry lock guards _ACTIVE and _COMPLETED.  It's held only briefly, and never while
+# doing real work on a meeting.  A meeting's own lock may be held while taking the registry
+# lock (for instance, to deactivate a meeting), but never the other way around.
+try:
+    # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
+    _LOCK  # type: ignore[has-type,used-before-def] # noqa: B018
+except NameError:
+    _LOCK = threading.RLock()
+
 try:
     # noinspection PyUnresolvedReferences,PyUnboundLocalVariable
     _ACTIVE  # type: ignore[used-before-def] # noqa: B018
@@ -75,25 +113,98 @@ def config() -> Config:
     return _CONFIG
 
 
-def add_meeting(nick: str, channel: str, network: str) -> Meeting:
-    """Add a new active meeting."""
-    meeting = Meeting(founder=nick, channel=channel, network=network)
-    _ACTIVE[meeting.key()] = meeting
+# noinspection PyShadowingNames
+def set_write_pipeline(pipeline: WritePipeline | None) -> None:
+    """Set the shared write pipeline, or None to write meetings inline."""
+    global _PIPELINE  # noqa: PLW0603
+    _PIPELINE = pipeline
+
+
+def write_pipeline() -> WritePipeline | None:
+    """Give the rest of the plugin access to the shared write pipeline, if there is one."""
+    return _PIPELINE
+
+
+def set_message_queue(queue: MessageQueue | None) -> None:
+    """Set the shared message queue, or None to handle messages inline."""
+    global _QUEUE  # noqa: PLW0603
+    _QUEUE = queue
+
+
+def message_queue() -> MessageQueue | None:
+    """Give the rest of the plugin access to the shared message queue, if there is one."""
+    return _QUEUE
+
+
+def set_autosave(scheduler: AutosaveScheduler | None) -> None:
+    """Set the shared autosave scheduler, or None to disable autosave."""
+    global _AUTOSAVE  # noqa: PLW0603
+    _AUTOSAVE = scheduler
+
+
+def autosave() -> AutosaveScheduler | None:
+    """Give the rest of the plugin access to the shared autosave scheduler, if there is one."""
+    return _AUTOSAVE
+
+
+def set_render_workers(workers: RenderWorkers | None) -> None:
+    """Set the shared render worker processes, or None to render in the bot process."""
+    global _RENDER_WORKERS  # noqa: PLW0603
+    _RENDER_WORKERS = workers
+
+
+def render_workers() -> RenderWorkers | None:
+    """Give the rest of the plugin access to the shared render worker processes, if there are any."""
+    return _RENDER_WORKERS
+
+
+def add_meeting(
+    nick: str,
+    channel: str,
+    network: str,
+    storage: MessageStorage = MessageStorage.LIST,
+    ids: MessageIds = MESSAGE_IDS_DEFAULT,
+) -> Meeting:
+    """Add a new active meeting, storing its messages and generating message identifiers as configured."""
+    messages = MessageStore() if storage == MessageStorage.COLUMNAR else []
+    meeting = Meeting(founder=nick, channel=channel, network=network, messages=messages)
+    meeting.message_id = MESSAGE_ID_GENERATORS[ids]
+    with _LOCK:
+        _ACTIVE[meeting.key()] = meeting
     return meeting
 
 
+def restore_meeting(meeting: Meeting) -> bool:
+    """
+    Restore a recovered meeting, either as an active meeting or as a completed meeting.
+
+    Returns False if the meeting is active and there is already an active meeting for the same channel.
+    """
+    with _LOCK:
+        if not meeting.active:
+            _COMPLETED.append(meeting)  # will potentially roll off an older meeting
+            return True
+        if meeting.key() in _ACTIVE:
+            return False
+        _ACTIVE[meeting.key()] = meeting
+        return True
+
+
 def deactivate_meeting(meeting: Meeting, *, retain: bool = True) -> None:
     """Move a meeting out of the active list, optionally retaining it in the completed list."""
     key = meeting.key()
-    assert key in _ACTIVE  # if the key is not tracked, something is screwed up
-    popped = _ACTIVE.pop(key)
-    assert popped is meeting  # if they're not the same, something is screwed up
-    if retain:
-        _COMPLETED.append(popped)  # will potentially roll off an older meeting
+    with _LOCK:
+        assert key in _ACTIVE  # if the key is not tracked, something is screwed up
+        popped = _ACTIVE.pop(key)
+        assert popped is meeting  # if they're not the same, something is screwed up
+        if retain:
+            _COMPLETED.append(popped)  # will potentially roll off an older meeting
 
 
 def get_meeting(channel: str, network: str) -> Meeting | None:
     """Get a meeting for the channel and network."""
+    # This is called for every message on every channel, so it doesn't take the registry lock.
+    # A single dictionary lookup is atomic, so it sees the registry either before or after any change.
     try:
         key = Meeting.meeting_key(channel, network)
         return _ACTIVE[key]
@@ -101,12 +212,22 @@ def get_meeting(channel: str, network: str) -> Meeting | None:
         return None
 
 
-def get_meetings(*, active: bool = True, completed: bool = True) -> list[Meeting]:
-    """Return a list of tracked meetings, optionally filtering out active or completed meetings."""
+def get_meetings(*, active: bool = True, completed: bool = True, snapshot: bool = False) -> list[Meeting]:
+    """
+    Return a list of tracked meetings, optionally filtering out active or completed meetings.
+
+    The list reflects the registry at a single point in time, even if meetings are being
+    started and ended on other threads.  The meetings themselves are live objects unless
+    snapshot is True.  In that case, each meeting is replaced by a snapshot, taken under its
+    own lock, so the caller can work with it at leisure without blocking the meeting.
+    """
     meetings: list[Meeting] = []
-    if active:
-        meetings += _ACTIVE.values()
-    if completed:
-        meetings += _COMPLETED
+    with _LOCK:
+        if active:
+            meetings += _ACTIVE.values()
+        if completed:
+            meetings += _COMPLETED
+    if snapshot:
+        meetings = [meeting.snapshot() for meeting in meetings]  # outside the registry lock, per the lock ordering
     meetings.sort(key=operator.attrgetter("end_time", "start_time"))
     return meetings
@@ -4,20 +4,28 @@
 Writes meeting log and minutes to disk.
 """
 
+import hashlib
 import re
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime
 from enum import Enum
+from functools import cache, partial
 from pathlib import Path
-from typing import Any, TextIO
+from typing import Any, BinaryIO, TextIO, TypeVar
 
 from attrs import field, frozen
-from genshi.builder import Element, tag
+from genshi.builder import Element, Fragment, tag
 from genshi.template import MarkupTemplate, TemplateLoader
 
-from hcoopmeetbotlogic.config import Config, OutputFormat
-from hcoopmeetbotlogic.dateutil import formatdate
-from hcoopmeetbotlogic.location import Locations, derive_locations
+from hcoopmeetbotlogic.config import Config, OutputFormat, RenderEngine
+from hcoopmeetbotlogic.dateutil import formatdate_cached
+from hcoopmeetbotlogic.journal import Journal
+from hcoopmeetbotlogic.location import Location, Locations, derive_locations
 from hcoopmeetbotlogic.meeting import EventType, Meeting, TrackedMessage
+from hcoopmeetbotlogic.pipeline import WritePipeline
 from hcoopmeetbotlogic.release import URL, VERSION
+from hcoopmeetbotlogic.state import render_workers
 
 # Location of Genshi templates
 _TEMPLATES = str(Path(__file__).parent / "templates")
@@ -39,8 +47,25 @@
 # Identifies a nick at the front of the payload, to be highlighted
 _NICK_REGEX = re.compile(r"(^[^\s]+:(?!//))")  # note: lookback (?!//) prevents us from matching URLs
 
-# List of event types that are excluded from the summary in the meeting minutes
-_EXCLUDED = [
+# Splits a message into tokens, capturing the whitespace between them
+_WHITESPACE_REGEX = re.compile(r"(\s+)")
+
+# Closing markup of the formatted log, which follows the last rendered message
+_LOG_CLOSING = "\n</pre>"
+
+# Number of messages rendered into each chunk that is written to the formatted log
+_LOG_CHUNK_SIZE = 500
+
+# Placeholder for the title when precompiling a Genshi template into strings; escaping leaves it unchanged
+_TITLE_MARKER = "HCOOPMEETBOTTITLEMARKER"
+
+# Identifies whitespace that Genshi strips from text outside of <pre>, either trailing spaces or blank lines
+_STRIPPABLE_REGEX = re.compile(r"[ \t]\n|\n[ \t]*\n")
+_STRIP_REGEX = re.compile(r"(<[^>]*>)|[ \t]*\n(?:[ \t]*\n)*")
+_TAG_GROUP = 1
+
+# Event types that are excluded from the summary in the meeting minutes
+_EXCLUDED = frozenset([
     EventType.START_MEETING,
     EventType.END_MEETING,
     EventType.UNDO,
@@ -49,7 +74,7 @@
     EventType.ADD_CHAIR,
     EventType.REMOVE_CHAIR,
     EventType.ATTENDEE,
-]
+])
 
 
 @frozen
@@ -77,13 +102,21 @@ def for_message(config: Config, message: TrackedMessage) -> "_LogMessage":
             content=_LogMessage._content(message),
         )
 
+    def fragment(self) -> Fragment:
+        """Get the message as a line of markup, exactly like the loop in the log.html template."""
+        return tag(self.id, self.timestamp, " ", self.nick, " ", self.content, "\n")
+
+    def render(self) -> str:
+        """Render the message as a line of HTML, exactly like the loop in the log.html template."""
+        return _render_element(self.fragment())
+
     @staticmethod
     def _id(message: TrackedMessage) -> Element:
         return tag.a(name=message.id)
 
     @staticmethod
     def _timestamp(config: Config, message: TrackedMessage) -> Element:
-        formatted = formatdate(timestamp=message.timestamp, zone=config.timezone, fmt=_TIME_FORMAT)
+        formatted = formatdate_cached(timestamp=message.timestamp, zone=config.timezone, fmt=_TIME_FORMAT)
         return tag.span(formatted, class_="tm")
 
     @staticmethod
@@ -96,15 +129,11 @@ def _nick(message: TrackedMessage) -> Element:
     def _content(message: TrackedMessage) -> Element:
         if message.action:
             return tag.span(_LogMessage._payload(message.payload), class_="ac")
-        operation_match = _OPERATION_REGEX.match(message.payload)
-        if operation_match:
-            operation = operation_match.group(_OPERATION_GROUP).lower().strip()
-            operand = operation_match.group(_OPERAND_GROUP).strip()
-            if operation == "#topic":
-                return tag.span(
-                    tag.span(f"{operation} ", class_="topic"), tag.span(_LogMessage._payload(operand), class_="topicline")
-                )
-            return tag.span(tag.span(f"{operation} ", class_="cmd"), tag.span(_LogMessage._payload(operand), class_="cmdline"))
+        parsed = _parse_operation(message.payload)
+        if parsed:
+            operation, operand = parsed
+            outer, inner = _operation_classes(operation)
+            return tag.span(tag.span(f"{operation} ", class_=outer), tag.span(_LogMessage._payload(operand), class_=inner))
         return _LogMessage._payload(message.payload)
 
     @staticmethod
@@ -116,6 +145,19 @@ def _payload(payload: str) -> Element:
         ])
 
 
+def _parse_operation(payload: str) -> tuple[str, str] | None:
+    """Parse the operation and operand out of a message payload, if it contains an operation."""
+    operation_match = _OPERATION_REGEX.match(payload)
+    if not operation_match:
+        return None
+    return operation_match.group(_OPERATION_GROUP).lower().strip(), operation_match.group(_OPERAND_GROUP).strip()
+
+
+def _operation_classes(operation: str) -> tuple[str, str]:
+    """Get the span classes for an operation and its operand in the log."""
+    return ("topic", "topicline") if operation == "#topic" else ("cmd", "cmdline")
+
+
 @frozen
 class _MeetingAction:
     """An action assigned to a meeting attendee."""
@@ -165,6 +207,56 @@ def matches(self, message: str) -> bool:
         return bool(self.nick_pattern.search(message)) or bool(self.alias_pattern and self.alias_pattern.search(message))
 
 
+class _AttendeeMatcher:
+    """
+    Utility class to identify all attendees whose nick or alias is found in a message.
+
+    This gives the same results as checking an _AliasMatcher for every attendee, but it
+    only needs a single pass over each message.  Each message is split into tokens on
+    whitespace, and every run of tokens that could contain an identifier (alone, followed
+    by a colon, or wrapped in parentheses) is looked up in a case-insensitive index of
+    nicks and aliases.  The rare identifier that can't be tokenized that way (because it
+    is empty or has leading or trailing whitespace) falls back to an _AliasMatcher.
+    """
+
+    def __init__(self, attendees: dict[str, str | None]) -> None:
+        self._index: dict[str, set[str]] = {}  # lowercase identifier to the nicks that it identifies
+        self._lengths: set[int] = set()  # distinct identifier lengths, measured in tokens
+        self._fallback: list[_AliasMatcher] = []
+        for nick, alias in attendees.items():
+            for identifier in [nick, alias]:
+                if identifier:
+                    if identifier.strip() != identifier:
+                        self._fallback.append(_AliasMatcher(nick, identifier))
+                    else:
+                        self._index.setdefault(identifier.lower(), set()).add(nick)
+                        self._lengths.add(len(identifier.split()))
+
+    def matches(self, message: str) -> set[str]:
+        """Return the nicks of all attendees whose nick or alias is found in the message."""
+        found: set[str] = set()
+        parts = _WHITESPACE_REGEX.split(message)  # tokens at even indexes, whitespace separators at odd indexes
+        tokens = (len(parts) + 1) // 2
+        for start in range(tokens):
+            for length in self._lengths:
+                if start + length <= tokens:
+                    candidate = "".join(parts[2 * start : 2 * (start + length) - 1])
+                    self._lookup(candidate, found)
+        for matcher in self._fallback:
+            if matcher.matches(message):
+                found.add(matcher.nick)
+        return found
+
+    def _lookup(self, candidate: str, found: set[str]) -> None:
+        """Add nicks for the candidate, in any of the forms that _AliasMatcher accepts."""
+        lowered = candidate.lower()
+        found.update(self._index.get(lowered, ()))
+        if lowered.endswith(":"):
+            found.update(self._index.get(lowered[:-1], ()))
+        if lowered.startswith("(") and lowered.endswith(")"):
+            found.update(self._index.get(lowered[1:-1], ()))
+
+
 @frozen
 class _MeetingEvent:
     """A meeting event tied to a topic."""
@@ -201,64 +293,48 @@ class _MeetingMinutes:
 
     @staticmethod
     def for_meeting(config: Config, meeting: Meeting) -> "_MeetingMinutes":
-        return _MeetingMinutes(
-            start_time=formatdate(timestamp=meeting.start_time, zone=config.timezone, fmt=_DATE_FORMAT),
-            end_time=formatdate(timestamp=meeting.end_time, zone=config.timezone, fmt=_DATE_FORMAT),
-            founder=meeting.founder,
-            actions=_MeetingMinutes._actions(meeting),
-            attendees=_MeetingMinutes._attendees(meeting),
-            topics=_MeetingMinutes._topics(config, meeting),
-        )
+        return _MinutesBuilder(config, meeting).build()
 
-    @staticmethod
-    def _actions(meeting: Meeting) -> list[_MeetingAction]:
-        actions = []
-        for event in meeting.events:
-            if event.event_type == EventType.ACTION and event.operand:
-                action = _MeetingAction(id=f"action-{event.id}", text=event.operand)
-                actions.append(action)
-        return actions
 
-    @staticmethod
-    def _attendees(meeting: Meeting) -> list[_MeetingAttendee]:
-        attendees = []
-        total = sum(meeting.nicks.values())
-        for nick in sorted(meeting.nicks.keys()):
-            count = meeting.nicks[nick]
-            percentage = str(round(count / total * 100.0) if total > 0.0 else 0.0)
-            alias = meeting.aliases.get(nick, None)
-            actions = _MeetingMinutes._attendee_actions(meeting, nick, alias)
-            attendee = _MeetingAttendee(nick=nick, alias=alias, count=count, percentage=percentage, actions=actions)
-            attendees.append(attendee)
-        return attendees
+class _MinutesBuilder:
+    """
+    Builds the meeting minutes in a single pass over the meeting events.
 
-    @staticmethod
-    def _attendee_actions(meeting: Meeting, nick: str, alias: str | None) -> list[_MeetingAction]:
-        actions = []
-        matcher = _AliasMatcher(nick, alias)
-        for event in meeting.events:
-            if event.event_type == EventType.ACTION and event.operand:
-                if matcher.matches(event.operand):
-                    action = _MeetingAction(id=f"action-{event.id}", text=event.operand)
-                    actions.append(action)
-        return actions
+    Actions, topics, and the actions for each attendee are all collected in the same
+    walk over the events.  Formatted timestamps are cached for the life of the builder,
+    since many events share the same timestamp.
+    """
 
-    @staticmethod
-    def _topics(config: Config, meeting: Meeting) -> list[_MeetingTopic]:
+    def __init__(self, config: Config, meeting: Meeting) -> None:
+        self._config = config
+        self._meeting = meeting
+        self._formatted: dict[tuple[datetime | None, str], str] = {}
+
+    def build(self) -> _MeetingMinutes:
+        """Build the minutes for the meeting."""
+        meeting = self._meeting
+        matcher = _AttendeeMatcher({nick: meeting.aliases.get(nick, None) for nick in meeting.nicks})
+        attendee_actions: dict[str, list[_MeetingAction]] = {nick: [] for nick in meeting.nicks}
+        actions = []
         current = _MeetingTopic(
             id=meeting.messages[0].id,
             name="Prologue",
-            timestamp=formatdate(timestamp=meeting.messages[0].timestamp, zone=config.timezone, fmt=_TIME_FORMAT),
+            timestamp=self._formatdate(meeting.messages[0].timestamp, _TIME_FORMAT),
             nick=meeting.founder,
             events=[],
         )
         topics = [current]
         for event in meeting.events:
+            if event.event_type == EventType.ACTION and event.operand:
+                action = _MeetingAction(id=f"action-{event.id}", text=event.operand)
+                actions.append(action)
+                for nick in matcher.matches(event.operand):
+                    attendee_actions[nick].append(action)
             if event.event_type == EventType.TOPIC:
                 current = _MeetingTopic(
                     id=event.id,
                     name=str(event.operand),
-                    timestamp=formatdate(timestamp=event.timestamp, zone=config.timezone, fmt=_TIME_FORMAT),
+                    timestamp=self._formatdate(event.timestamp, _TIME_FORMAT),
                     nick=event.message.sender,
                 )
                 topics.append(current)
@@ -267,7 +343,7 @@ def _topics(config: Config, meeting: Meeting) -> list[_MeetingTopic]:
                 item = _MeetingEvent(
                     id=event.id,
                     event_type=event.event_type.value,
-                    timestamp=formatdate(timestamp=event.timestamp, zone=config.timezone, fmt=_TIME_FORMAT),
+                    timestamp=self._formatdate(event.timestamp, _TIME_FORMAT),
                     nick=event.message.sender,
                     payload=str(event.operand),
                     link=url_match.group(_URL_GROUP) if url_match else None,
@@ -277,14 +353,42 @@ def _topics(config: Config, meeting: Meeting) -> list[_MeetingTopic]:
                 item = _MeetingEvent(
                     id=event.id,
                     event_type=event.event_type.value,
-                    timestamp=formatdate(timestamp=event.timestamp, zone=config.timezone, fmt=_TIME_FORMAT),
+                    timestamp=self._formatdate(event.timestamp, _TIME_FORMAT),
                     nick=event.message.sender,
                     payload=event.operand.value if isinstance(event.operand, Enum) else str(event.operand),
                 )
                 current.events.append(item)
         if not topics[0].events:
             del topics[0]  # get rid of the prologue unless we actually used it
-        return topics
+        return _MeetingMinutes(
+            start_time=self._formatdate(meeting.start_time, _DATE_FORMAT),
+            end_time=self._formatdate(meeting.end_time, _DATE_FORMAT),
+            founder=meeting.founder,
+            actions=actions,
+            attendees=self._attendees(attendee_actions),
+            topics=topics,
+        )
+
+    def _attendees(self, attendee_actions: dict[str, list[_MeetingAction]]) -> list[_MeetingAttendee]:
+        meeting = self._meeting
+        attendees = []
+        total = sum(meeting.nicks.values())
+        for nick in sorted(meeting.nicks.keys()):
+            count = meeting.nicks[nick]
+            percentage = str(round(count / total * 100.0) if total > 0.0 else 0.0)
+            alias = meeting.aliases.get(nick, None)
+            attendee = _MeetingAttendee(nick=nick, alias=alias, count=count, percentage=percentage, actions=attendee_actions[nick])
+            attendees.append(attendee)
+        return attendees
+
+    def _formatdate(self, timestamp: datetime | None, fmt: str) -> str:
+        """Format a timestamp in the configured time zone, reusing earlier results for the same timestamp."""
+        key = (timestamp, fmt)
+        formatted = self._formatted.get(key)
+        if formatted is None:
+            formatted = formatdate_cached(timestamp=timestamp, zone=self._config.timezone, fmt=fmt)
+            self._formatted[key] = formatted
+        return formatted
 
 
 def _render_html(template: str, context: dict[str, Any], out: TextIO) -> None:
@@ -293,25 +397,384 @@ def _render_html(template: str, context: dict[str, Any], out: TextIO) -> None:
     renderer.generate(**context).render(method="html", doctype="html", out=out)
 
 
+def _render_element(element: Fragment) -> str:
+    """Render a Genshi element or fragment to HTML, the same way it would be rendered within the <pre> in a template."""
+    return str(element.generate().render(method="html", encoding=None, strip_whitespace=False))
+
+
+@frozen
+class _LogProgress:
+    """Tracks how much of a formatted log has already been rendered to disk."""
+
+    meeting_id: str  # the meeting that the file was rendered for
+    header: str  # all markup prior to the first message; if this changes, the whole file must be re-rendered
+    count: int  # number of messages that have already been rendered
+    offset: int  # byte offset where the closing markup begins, which is where new messages are appended
+    size: int  # size of the file in bytes after the last write
+    mtime: int  # modification time of the file in nanoseconds after the last write
+
+
+class _IncrementalLogWriter:
+    """
+    Writes the formatted log incrementally, rendering only messages that are not on disk yet.
+
+    The first write for a meeting renders the entire log, exactly like the log.html
+    template.  After that, new messages are appended in place of the closing markup, and
+    then the closing markup is rewritten.  If anything about the file looks different
+    than it did after our last write (for instance, it's been removed or regenerated),
+    or if the header has changed because the meeting was renamed, we fall back to
+    rendering the whole log again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._progress: dict[str, _LogProgress] = {}
+
+    def forget(self, path: Path) -> None:
+        """Forget progress for a path, so the next write renders the whole log."""
+        with self._lock:
+            self._progress.pop(str(path), None)
+
+    def write(self, config: Config, path: Path, meeting: Meeting) -> None:
+        """Write the formatted log, appending only messages that have not already been rendered."""
+        header, footer = _log_frame(config, meeting)
+        with self._lock:
+            progress = self._progress.pop(str(path), None)  # if the write fails, we'll start over next time
+        count = len(meeting.messages)
+        if self._resumable(progress, path, meeting, header):
+            assert progress is not None  # checked by _resumable()
+            with path.open("r+b") as out:
+                out.seek(progress.offset)
+                offset = progress.offset + _write_rows(out, config, meeting.messages, progress.count)
+                out.write(footer.encode("utf-8"))
+                out.truncate()
+        else:
+            offset = _write_log(config, path, meeting, header, footer)
+        stat = path.stat()
+        with self._lock:
+            self._progress[str(path)] = _LogProgress(meeting.id, header, count, offset, stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def _resumable(progress: _LogProgress | None, path: Path, meeting: Meeting, header: str) -> bool:
+        """Whether we can safely append to the file described by progress."""
+        if not progress or progress.meeting_id != meeting.id or progress.header != header:
+            return False
+        if progress.count > len(meeting.messages) or not path.is_file():
+            return False
+        stat = path.stat()
+        return stat.st_size == progress.size and stat.st_mtime_ns == progress.mtime
+
+
+# Singleton incremental log writer, shared across all meetings
+_LOG_WRITER = _IncrementalLogWriter()
+
+
+@frozen
+class _WriteRecord:
+    """What was last written to a meeting's files, and what the files looked like afterwards."""
+
+    digest: str  # digest of everything the content of the files is derived from
+    files: tuple[tuple[str, int, int], ...]  # path, size in bytes, and modification time in nanoseconds for each file
+
+
+class _ChangeTracker:
+    """
+    Remembers what was last written for each meeting, so files are not rewritten when nothing has changed.
+
+    The formatted log and minutes are derived entirely from the raw log, the configuration,
+    the file locations, and the software version, so a digest of those things identifies the
+    content of all of the files.  Writes are only skipped if the digest matches and every file
+    still looks exactly like it did after our last write.  If a file has been removed or
+    changed behind our back, everything is written again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._records: dict[str, _WriteRecord] = {}
+
+    @staticmethod
+    def digest(config: Config, locations: Locations, raw_log: str) -> str:
+        """Build a digest of everything the content of a meeting's files is derived from."""
+        digest = hashlib.sha256(raw_log.encode("utf-8"))
+        digest.update(f"\0{config!r}\0{locations!r}\0{VERSION}".encode())
+        return digest.hexdigest()
+
+    def unchanged(self, locations: Locations, digest: str) -> bool:
+        """Whether the files at these locations were last written with this digest, and are still intact."""
+        with self._lock:
+            record = self._records.get(locations.raw_log.path)
+        return record is not None and record.digest == digest and record.files == _stat_files(locations)
+
+    def forget(self, locations: Locations) -> None:
+        """Forget what was written to these locations, so the next write is never skipped."""
+        with self._lock:
+            self._records.pop(locations.raw_log.path, None)
+
+    def record(self, locations: Locations, digest: str) -> None:
+        """Record that the files at these locations were just written with this digest."""
+        files = _stat_files(locations)
+        with self._lock:
+            self._records[locations.raw_log.path] = _WriteRecord(digest, files)
+
+
+def _stat_files(locations: Locations) -> tuple[tuple[str, int, int], ...]:
+    """Get the size and modification time of each file, with -1 for a file that doesn't exist."""
+    files = []
+    for location in (locations.raw_log, locations.formatted_log, locations.formatted_minutes):
+        try:
+            stat = Path(location.path).stat()
+            files.append((location.path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            files.append((location.path, -1, -1))
+    return tuple(files)
+
+
+# Singleton change tracker, shared across all meetings
+_CHANGES = _ChangeTracker()
+
+
+@frozen
+class WriteResult:
+    """
+    Result of writing meeting files to disk.
+
+    Attributes:
+        locations(Locations): Locations of the meeting files
+        written(bool): Whether the files were written, or skipped because their content would have been identical
+    """
+
+    locations: Locations
+    written: bool
+
+    @property
+    def skipped(self) -> list[str]:
+        """Paths of the files that were skipped, if any."""
+        if self.written:
+            return []
+        return [
+            location.path for location in (self.locations.raw_log, self.locations.formatted_log, self.locations.formatted_minutes)
+        ]
+
+
+def _log_frame(config: Config, meeting: Meeting) -> tuple[str, str]:
+    """Render the header and footer of the formatted log, the markup that surrounds the messages."""
+    title = f"{meeting.name} Log"
+    if config.render_engine == RenderEngine.STRING:
+        before, after = _string_frame("log.html")
+        rendered = before + _strip_whitespace(_escape(title)) + after
+    else:
+        rendered = _render_html_text(template="log.html", context={"title": title, "messages": []})
+    split = rendered.rindex(_LOG_CLOSING)
+    return rendered[:split], rendered[split:]
+
+
+def _write_log(config: Config, path: Path, meeting: Meeting, header: str, footer: str) -> int:
+    """Write the entire formatted log, returning the byte offset where the footer begins."""
+    with path.open("wb") as out:
+        encoded = header.encode("utf-8")
+        out.write(encoded)
+        offset = len(encoded) + _write_rows(out, config, meeting.messages, 0)
+        out.write(footer.encode("utf-8"))
+    return offset
+
+
+def _write_rows(out: BinaryIO, config: Config, messages: Sequence[TrackedMessage], start: int) -> int:
+    """Write messages starting at an index to the formatted log, returning the number of bytes written."""
+    written = 0
+    for chunk in _render_rows(config, messages, start):
+        encoded = chunk.encode("utf-8")
+        out.write(encoded)
+        written += len(encoded)
+    return written
+
+
+def _render_rows(config: Config, messages: Sequence[TrackedMessage], start: int) -> Iterator[str]:
+    """
+    Lazily render messages starting at an index as lines of HTML for the formatted log.
+
+    Messages are rendered in chunks of _LOG_CHUNK_SIZE, so only one chunk of rendered
+    output (and its intermediate Genshi elements) is held in memory at a time, no matter
+    how large the meeting is.  For Genshi, each chunk is serialized as a single fragment,
+    since that's much cheaper than serializing each message individually.
+    """
+    for begin in range(start, len(messages), _LOG_CHUNK_SIZE):
+        chunk = messages[begin : begin + _LOG_CHUNK_SIZE]
+        if config.render_engine == RenderEngine.STRING:
+            yield "".join(_render_string_row(config, message) for message in chunk)
+        else:
+            yield _render_element(tag(*[_LogMessage.for_message(config, message).fragment() for message in chunk]))
+
+
+def _render_html_text(template: str, context: dict[str, Any]) -> str:
+    """Render the named template to HTML, returning the result as a string."""
+    renderer = _LOADER.load(filename=template, cls=MarkupTemplate)  # type: MarkupTemplate
+    return str(renderer.generate(**context).render(method="html", doctype="html", encoding=None))
+
+
+# The string rendering engine generates exactly the same output as the Genshi templates,
+# but builds it directly from precompiled strings rather than streaming events through
+# Genshi's serializer, which is much faster.  Only the static frame of each document (the
+# head, including the stylesheet) is taken from the Genshi template itself.  The body is
+# hand-written HTML: _render_string_row() mirrors _LogMessage and _render_string_minutes()
+# mirrors minutes.html, so any change to either one must be made here too.
+# TestRenderEngines in test_writer.py renders the same meetings with both engines and
+# fails if their output differs at all.
+# Every dynamic value is escaped by _escape() exactly like Genshi escapes it.  This
+# preserves the same guarantees as the Genshi engine: if someone pastes Javascript into an
+# IRC conversation, that Javascript will show up as literal text in the rendered output.
+
+
+def _escape(value: str, *, quotes: bool = False) -> str:
+    """Escape text for HTML exactly like Genshi does, including double quotes if the text is an attribute value."""
+    escaped = value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return escaped.replace('"', "&#34;") if quotes else escaped
+
+
+def _strip_whitespace(html: str) -> str:
+    """Strip whitespace from text outside of tags, exactly like Genshi does for any element other than <pre>."""
+    if not _STRIPPABLE_REGEX.search(html):
+        return html  # the common case, since the precompiled strings are already stripped
+    return _STRIP_REGEX.sub(lambda match: match.group(_TAG_GROUP) or "\n", html)
+
+
+@cache
+def _string_frame(template: str) -> tuple[str, str]:
+    """Precompile the static markup of a Genshi template, split around the first use of the title."""
+    minutes = _MeetingMinutes(start_time="", end_time="", founder="", actions=[], attendees=[], topics=[])
+    software = {"version": "", "url": ""}
+    context = {"title": _TITLE_MARKER, "messages": [], "software": software, "logpath": "", "minutes": minutes}
+    before, after = _render_html_text(template=template, context=context).split(_TITLE_MARKER, 2)[:2]
+    return before, after
+
+
+def _render_string_row(config: Config, message: TrackedMessage) -> str:
+    """Render a message as a line of HTML, exactly like _LogMessage.render()."""
+    timestamp = formatdate_cached(timestamp=message.timestamp, zone=config.timezone, fmt=_TIME_FORMAT)
+    nickclass = "nka" if message.action else "nk"
+    return (
+        f'<a name="{_escape(message.id, quotes=True)}"></a><span class="tm">{_escape(timestamp)}</span> '
+        f'<span class="{nickclass}">&lt;{_escape(message.sender)}&gt;</span> {_render_string_content(message)}\n'
+    )
+
+
+def _render_string_content(message: TrackedMessage) -> str:
+    if message.action:
+        return f'<span class="ac">{_render_string_payload(message.payload)}</span>'
+    parsed = _parse_operation(message.payload)
+    if parsed:
+        operation, operand = parsed
+        outer, inner = _operation_classes(operation)
+        payload = _render_string_payload(operand)
+        return f'<span><span class="{outer}">{_escape(operation)} </span><span class="{inner}">{payload}</span></span>'
+    return _render_string_payload(message.payload)
+
+
+def _render_string_payload(payload: str) -> str:
+    spans = "".join(
+        f'<span class="hi">{_escape(element)}</span>' if _NICK_REGEX.fullmatch(element) else f"<span>{_escape(element)}</span>"
+        for element in _NICK_REGEX.split(payload, 1)
+        if element
+    )
+    return f"<span>{spans}</span>"
+
+
+def _render_string_minutes(context: dict[str, Any]) -> str:
+    """Render the meeting minutes to HTML, exactly like the minutes.html template, which this must be kept in step with."""
+    minutes: _MeetingMinutes = context["minutes"]
+    software = context["software"]
+    before, after = _string_frame("minutes.html")
+    title = _escape(context["title"])
+    logpath = _escape(context["logpath"], quotes=True)
+    out = [
+        before,
+        title,
+        after,
+        title,
+        "</h1>\n    <div>\n",
+        f'        <span class="details">Meeting started by {_escape(minutes.founder)} at {_escape(minutes.start_time)} ',
+        f'(<a href="{logpath}">full logs</a>).</span>\n        <h3>Attendees</h3>\n        <ol class="decimal">',
+        "\n            " if minutes.attendees else "",
+    ]
+    for attendee in minutes.attendees:
+        alias = f"<span> (aka {_escape(attendee.alias)})</span>" if attendee.alias else ""
+        count = f"{attendee.count} lines ({_escape(attendee.percentage)}%)"
+        out.append(f"<li>\n                {_escape(attendee.nick)}{alias} - {count}\n            </li>")
+    out.extend([
+        '\n        </ol>\n        <h3>Meeting Summary</h3>\n        <ol class="decimal">',
+        "\n            " if minutes.topics else "",
+    ])
+    for topic in minutes.topics:
+        out.extend([
+            f'<li>\n                <span class="topic">{_escape(topic.name)}</span>\n                <span class="details">',
+            f'(<a href="{logpath}#{_escape(topic.id, quotes=True)}">{_escape(topic.nick)}</a>, {_escape(topic.timestamp)})</span>',
+            '\n                <ol class="latin">',
+            "\n                    " if topic.events else "",
+        ])
+        for event in topic.events:
+            event_class = _escape(event.event_type, quotes=True)
+            payload = _escape(event.payload)
+            if event.link is not None:
+                payload = f'<a href="{_escape(event.link, quotes=True)}">{payload}</a>'
+            out.extend([
+                f'<li>\n                        <span class="event">{_escape(event.event_type)}: </span>',
+                f'\n                                <span class="{event_class}">{payload}</span>',
+                f'\n                        <span class="details">(<a href="{logpath}#{_escape(event.id, quotes=True)}">',
+                f"{_escape(event.nick)}</a>, {_escape(event.timestamp)})</span>\n                    </li>",
+            ])
+        out.append("\n                </ol>\n            </li>")
+    out.extend([
+        f'\n        </ol>\n        <span class="details">Meeting ended at {_escape(minutes.end_time)} ',
+        f'(<a href="{logpath}">full logs</a>).</span>\n        <h3>Action Items</h3>\n        <ol class="decimal">',
+    ])
+    for action in minutes.actions:
+        action_id = _escape(action.id, quotes=True)
+        out.append(f'\n            <li id="{action_id}">{_escape(action.text)} (<a href="#{action_id}">link</a>)</li>')
+    out.append("\n        </ol>\n        <h3>Action Items by Attendee</h3>\n        <ul>")
+    for attendee in minutes.attendees:
+        if attendee.actions:
+            out.append(f"\n                <li>\n                    {_escape(attendee.nick)}\n                    <ol>")
+            for action in attendee.actions:
+                action_id = _escape(action.id, quotes=True)
+                out.append(f'\n                        <li>{_escape(action.text)} (<a href="#{action_id}">link</a>)</li>')
+            out.append("\n                    </ol>\n                </li>")
+    out.extend([
+        f'\n        </ul>\n        <span class="details">Generated by <a href="{_escape(software["url"], quotes=True)}">',
+        f"HCoop Meetbot</a> v{_escape(software['version'])}</span>\n    </div>\n</body>\n</html>",
+    ])
+    return _strip_whitespace("".join(out))
+
+
 def write_raw_log(config: Config, locations: Locations, meeting: Meeting) -> None:  # noqa: ARG001
     """Write the raw meeting log to disk in JSON format."""
-    Path(locations.raw_log.path).parent.mkdir(exist_ok=True, parents=True)
-    Path(locations.raw_log.path).write_text(meeting.to_json(), encoding="utf-8")
+    _write_raw_log(locations.raw_log, meeting.to_json())
+
+
+def _write_raw_log(location: Location, raw_log: str) -> None:
+    """Write an already-serialized raw meeting log to disk."""
+    Path(location.path).parent.mkdir(exist_ok=True, parents=True)
+    Path(location.path).write_text(raw_log, encoding="utf-8")
 
 
 # noinspection PyUnreachableCode
-def write_formatted_log(config: Config, locations: Locations, meeting: Meeting) -> None:
-    """Write the formatted meeting log to disk."""
-    context = {
-        "title": f"{meeting.name} Log",
-        "messages": [_LogMessage.for_message(config, message) for message in meeting.messages],
-    }
-    Path(locations.formatted_log.path).parent.mkdir(exist_ok=True, parents=True)
-    with Path(locations.formatted_log.path).open("w", encoding="utf-8") as out:
-        if config.output_format == OutputFormat.HTML:
-            _render_html(template="log.html", context=context, out=out)
-        else:
-            raise ValueError(f"Unsupported output format: {config.output_format}")
+def write_formatted_log(config: Config, locations: Locations, meeting: Meeting, *, incremental: bool = False) -> None:
+    """
+    Write the formatted meeting log to disk.
+
+    If incremental is True, only messages that have been added since the last incremental
+    write are rendered, and they're appended to the existing file.  Otherwise, the entire
+    log is rendered from scratch.  Either way, messages are rendered lazily and written in
+    chunks, so memory use stays bounded even for very large meetings.
+    """
+    path = Path(locations.formatted_log.path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+    if config.output_format != OutputFormat.HTML:
+        raise ValueError(f"Unsupported output format: {config.output_format}")
+    if incremental:
+        _LOG_WRITER.write(config, path, meeting)
+    else:
+        _LOG_WRITER.forget(path)
+        header, footer = _log_frame(config, meeting)
+        _write_log(config, path, meeting, header, footer)
 
 
 # noinspection PyUnreachableCode
@@ -326,15 +789,77 @@ def write_formatted_minutes(config: Config, locations: Locations, meeting: Meeti
     Path(locations.formatted_minutes.path).parent.mkdir(exist_ok=True, parents=True)
     with Path(locations.formatted_minutes.path).open("w", encoding="utf-8") as out:
         if config.output_format == OutputFormat.HTML:
-            _render_html(template="minutes.html", context=context, out=out)
+            if config.render_engine == RenderEngine.STRING:
+                out.write(_render_string_minutes(context))
+            else:
+                _render_html(template="minutes.html", context=context, out=out)
         else:
             raise ValueError(f"Unsupported output format: {config.output_format}")
 
 
+def _write_locations(config: Config, locations: Locations, meeting: Meeting) -> bool:
+    """Write meeting files to disk at previously-derived locations, returning False if the write was skipped as unchanged."""
+    raw_log = meeting.to_json()
+    digest = _CHANGES.digest(config, locations, raw_log)
+    if _CHANGES.unchanged(locations, digest):
+        return False
+    _CHANGES.forget(locations)  # if the write fails, we'll write everything next time
+    _write_raw_log(locations.raw_log, raw_log)
+    # Either way, the formatted log is only rendered incrementally while the meeting is active,
+    # so everything is always rendered when the meeting ends.  A worker keeps rendering off of the bot's GIL.
+    workers = render_workers()
+    if workers:
+        workers.render(config, locations, raw_log, incremental=meeting.active)
+    else:
+        write_formatted_log(config, locations, meeting, incremental=meeting.active)
+        write_formatted_minutes(config, locations, meeting)
+    _CHANGES.record(locations, digest)
+    return True
+
+
+def save_meeting(config: Config, meeting: Meeting) -> WriteResult:
+    """Write meeting files to disk, skipping the write if nothing has changed since the last time."""
+    locations = derive_locations(config, meeting)
+    return WriteResult(locations, _write_locations(config, locations, meeting))
+
+
 def write_meeting(config: Config, meeting: Meeting) -> Locations:
     """Write meeting files to disk, returning the file locations."""
+    return save_meeting(config, meeting).locations
+
+
+def submit_meeting(config: Config, meeting: Meeting, pipeline: WritePipeline | None, *, final: bool = False) -> Locations:
+    """
+    Submit meeting files to be written to disk in the background, returning the file locations immediately.
+
+    The files are written from a snapshot of the meeting as it exists right now, so the
+    meeting can continue to change while the write is pending.  Writes for the same meeting
+    always happen in the order they were submitted.  If there is no pipeline, the files are
+    written inline, exactly like write_meeting().
+
+    If this is the final write for the meeting, the meeting's journal is detached, and it is
+    removed once the files have been written successfully.
+    """
+    journal = meeting.detach_journal() if final else None
+    if pipeline is None:
+        return _retire_journal(journal, partial(write_meeting, config, meeting))
     locations = derive_locations(config, meeting)
-    write_raw_log(config, locations, meeting)
-    write_formatted_log(config, locations, meeting)
-    write_formatted_minutes(config, locations, meeting)
+    snapshot = meeting.snapshot()
+    pipeline.submit(meeting.key(), partial(_retire_journal, journal, partial(_write_locations, config, locations, snapshot)))
     return locations
+
+
+_T = TypeVar("_T")
+
+
+def _retire_journal(journal: Journal | None, write: Callable[[], _T]) -> _T:
+    """Execute the final write for a meeting, removing its journal only if the write succeeds."""
+    try:
+        result = write()
+    except Exception:
+        if journal:
+            journal.close()  # keep the journal on disk, since the meeting was never saved
+        raise
+    if journal:
+        journal.remove()
+    return result
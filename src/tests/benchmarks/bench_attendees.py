@@ -0,0 +1,58 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark attendee action matching for the meeting minutes.
+
+Compares the original approach (one _AliasMatcher per attendee, each scanning every
+event) with a single pass using _AttendeeMatcher as the number of attendees grows.
+
+Run from the src directory:  python -m tests.benchmarks.bench_attendees
+"""
+
+from functools import partial
+
+from hcoopmeetbotlogic.meeting import EventType, Meeting
+from hcoopmeetbotlogic.writer import _AliasMatcher, _AttendeeMatcher
+from tests.benchmarks.util import best_of, print_table, synthetic_meeting
+
+ATTENDEES = [10, 50, 150, 300, 600]
+MESSAGES = 20000
+
+
+def legacy(meeting: Meeting) -> dict[str, list[str]]:
+    """The original O(attendees x events) implementation."""
+    result = {}
+    for nick in meeting.nicks:
+        matcher = _AliasMatcher(nick, meeting.aliases.get(nick, None))
+        result[nick] = [
+            event.id
+            for event in meeting.events
+            if event.event_type == EventType.ACTION and event.operand and matcher.matches(event.operand)
+        ]
+    return result
+
+
+def indexed(meeting: Meeting) -> dict[str, list[str]]:
+    """The single-pass implementation, equivalent to what the minutes builder does."""
+    result: dict[str, list[str]] = {nick: [] for nick in meeting.nicks}
+    matcher = _AttendeeMatcher({nick: meeting.aliases.get(nick, None) for nick in meeting.nicks})
+    for event in meeting.events:
+        if event.event_type == EventType.ACTION and event.operand:
+            for nick in matcher.matches(event.operand):
+                result[nick].append(event.id)
+    return result
+
+
+def main() -> None:
+    rows = []
+    for attendees in ATTENDEES:
+        meeting = synthetic_meeting(messages=MESSAGES, attendees=attendees)
+        actions = sum(1 for event in meeting.events if event.event_type == EventType.ACTION)
+        before = best_of(partial(legacy, meeting))
+        after = best_of(partial(indexed, meeting))
+        rows.append([attendees, actions, f"{before * 1000:.1f}", f"{after * 1000:.1f}", f"{before / after:.1f}x"])
+    print_table(["attendees", "actions", "legacy (ms)", "indexed (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark date formatting.
+
+Compares the original formatdate() implementation, which looks up the pytz time zone
+on every call, against the current implementations, formatting one timestamp for
+every message in a large log.
+
+Run from the src directory:  python -m tests.benchmarks.bench_dateutil
+"""
+
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from functools import partial
+
+from pytz import timezone
+
+from hcoopmeetbotlogic.dateutil import _formatsecond, formatdate, formatdate_cached
+from tests.benchmarks.util import START_TIME, best_of, print_table
+
+MESSAGES = [1000, 10000, 50000]
+ZONE = "America/Chicago"
+FORMAT = "%H:%M:%S"
+
+
+def legacy(timestamp: datetime | None, zone: str = "UTC", fmt: str = "%Y-%m-%dT%H:%M%z") -> str:
+    """The original implementation of formatdate()."""
+    return timestamp.astimezone(timezone(zone)).strftime(fmt) if timestamp else "None"
+
+
+def each(function: Callable[..., str], timestamps: list[datetime]) -> None:
+    for timestamp in timestamps:
+        function(timestamp, zone=ZONE, fmt=FORMAT)
+
+
+def cold(function: Callable[[], object]) -> Callable[[], object]:
+    """Wrap a function so the formatting cache is cleared before each run."""
+
+    def wrapper() -> object:
+        _formatsecond.cache_clear()
+        return function()
+
+    return wrapper
+
+
+def main() -> None:
+    rows = []
+    for messages in MESSAGES:
+        # a busy meeting has a few messages per second, so many messages share a timestamp
+        timestamps = [START_TIME + timedelta(seconds=i // 3, microseconds=i) for i in range(messages)]
+        baseline = best_of(partial(each, legacy, timestamps))
+        results = {
+            "formatdate": best_of(partial(each, formatdate, timestamps)),
+            "cached (cold)": best_of(cold(partial(each, formatdate_cached, timestamps))),
+            "cached (warm)": best_of(partial(each, formatdate_cached, timestamps)),
+        }
+        rows.append([messages, "legacy", f"{baseline * 1000:.1f}", "1.0x"])
+        rows += [[messages, name, f"{elapsed * 1000:.1f}", f"{baseline / elapsed:.1f}x"] for name, elapsed in results.items()]
+    print_table(["messages", "implementation", "elapsed (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
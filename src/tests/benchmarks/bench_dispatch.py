@@ -0,0 +1,113 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark command dispatch.
+
+Compares the original dispatch implementation (regular expression matching for every
+message, and a method lookup by name for every command) with the precomputed handler
+table and first-character check, over a realistic mix of chat, commands, and links.
+The handlers themselves do nothing, so the difference is entirely dispatch overhead.
+
+Run from the src directory:  python -m tests.benchmarks.bench_dispatch
+"""
+
+import random
+from functools import partial
+from typing import Any
+from unittest.mock import patch
+
+from hcoopmeetbotlogic.command import (
+    _HANDLERS,
+    _METHOD_PREFIX,
+    _OPERAND_GROUP,
+    _OPERATION_GROUP,
+    _OPERATION_REGEX,
+    _URL_GROUP,
+    _URL_REGEX,
+    dispatch,
+)
+from hcoopmeetbotlogic.meeting import Meeting, TrackedMessage
+from tests.benchmarks.util import START_TIME, WORDS, best_of, print_table
+
+MESSAGES = 100000
+COMMAND_PERCENTAGES = [0, 2, 5, 20]
+COMMANDS = ["#info", "#action", "#idea", "#topic", "#here", "#vote +1", "#link", " #info", "#bogus"]
+URLS = ["https://example.com/agenda", "http://example.com"]
+
+
+class _Handler:
+    """A command handler that does nothing."""
+
+    def __call__(self, *args: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> "_Handler":
+        if name.startswith(_METHOD_PREFIX) and name[len(_METHOD_PREFIX) :] in _HANDLERS:
+            return self  # so this can also stand in for the dispatcher, with all of its do_* methods
+        raise AttributeError(name)
+
+
+class _Context:
+    """A context that ignores replies."""
+
+    def send_reply(self, reply: str) -> None:
+        pass
+
+
+def legacy(dispatcher: Any, meeting: Meeting, context: Any, message: TrackedMessage) -> None:
+    """The original dispatch implementation."""
+    if message.payload.lower().strip().startswith(meeting.channel.lower()):
+        return
+    operation_match = _OPERATION_REGEX.match(message.payload)
+    url_match = _URL_REGEX.match(message.payload)
+    if operation_match:
+        operation = operation_match.group(_OPERATION_GROUP).lower().strip()
+        operand = operation_match.group(_OPERAND_GROUP).strip()
+        if hasattr(dispatcher, f"{_METHOD_PREFIX}{operation}"):
+            getattr(dispatcher, f"{_METHOD_PREFIX}{operation}")(meeting, context, operation, operand, message)
+        else:
+            context.send_reply(f"Unknown command: #{operation}")
+    elif url_match:
+        dispatcher.do_link(meeting, context, "link", url_match.group(_URL_GROUP), message)
+
+
+def traffic(percentage: int, seed: int = 42) -> list[TrackedMessage]:
+    """Generate channel traffic where the given percentage of messages are commands or links."""
+    generator = random.Random(seed)  # noqa: S311
+    messages = []
+    for i in range(MESSAGES):
+        chatter = " ".join(generator.choice(WORDS) for _ in range(generator.randint(3, 15)))
+        if generator.randint(1, 100) <= percentage:
+            payload = generator.choice([*(f"{command} {chatter}" for command in COMMANDS), *URLS, "#channel: hello"])
+        else:
+            payload = chatter
+        messages.append(TrackedMessage(f"id-{i}", "nick", payload, False, START_TIME))
+    return messages
+
+
+def run(function: Any, meeting: Meeting, context: _Context, messages: list[TrackedMessage]) -> None:
+    for message in messages:
+        function(meeting, context, message)
+
+
+def main() -> None:
+    meeting = Meeting(founder="chair", channel="#channel", network="network")
+    context = _Context()
+    handler = _Handler()
+    rows = []
+    with patch.dict(_HANDLERS, dict.fromkeys(_HANDLERS, handler)):
+        for percentage in COMMAND_PERCENTAGES:
+            messages = traffic(percentage)
+            before = best_of(partial(run, partial(legacy, handler), meeting, context, messages))
+            after = best_of(partial(run, dispatch, meeting, context, messages))
+            rows.append([
+                f"{percentage}%",
+                f"{MESSAGES / before:,.0f}",
+                f"{MESSAGES / after:,.0f}",
+                f"{before / after:.1f}x",
+            ])
+    print_table(["commands", "legacy (msg/s)", "table (msg/s)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark message identifiers.
+
+Compares random UUID message ids (the original behavior) against compact sequence ids,
+measuring the time and memory to track messages, and the size of the journal, raw log,
+formatted log, and minutes written for the same meeting.
+
+Run from the src directory:  python -m tests.benchmarks.bench_ids
+"""
+
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.config import Config, MessageIds, RenderEngine
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import Journal
+from hcoopmeetbotlogic.meeting import MESSAGE_ID_GENERATORS, Meeting
+from hcoopmeetbotlogic.writer import write_meeting
+from tests.benchmarks.util import START_TIME, best_of, print_table, synthetic_meeting
+
+MESSAGES = [1000, 10000, 100000]
+ATTENDEES = 25
+IDS = [MessageIds.UUID, MessageIds.SEQUENCE]
+
+
+def track(generator: Callable[[Meeting], str], messages: int) -> None:
+    """Track the given number of messages in a new meeting, assigning ids with the generator."""
+    meeting = Meeting(founder="chair", channel="#channel", network="network")
+    meeting.message_id = generator
+    for i in range(messages):
+        meeting.track_message(Message(None, START_TIME, "nick", "#channel", "network", f"message {i}"))
+
+
+def retained(generator: Callable[[Meeting], str], messages: int) -> float:
+    """Measure the memory retained per message when tracking messages with ids assigned by the generator."""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        meeting = Meeting(founder="chair", channel="#channel", network="network")
+        meeting.message_id = generator
+        for i in range(messages):
+            meeting.track_message(Message(None, START_TIME, "nick", "#channel", "network", f"message {i}"))
+        return (tracemalloc.get_traced_memory()[0] - start) / messages
+    finally:
+        tracemalloc.stop()
+
+
+def sizes(temp: Path, generator: Callable[[Meeting], str], messages: int) -> list[int]:
+    """Get the size of each file written for a synthetic meeting with ids assigned by the generator."""
+    directory = temp / generator.__name__
+    meeting = synthetic_meeting(messages, ATTENDEES, message_id=generator)
+    journal = Journal(directory / "journal.jsonl")
+    meeting.attach_journal(journal)  # the first record is a snapshot of the whole meeting
+    journal.close()
+    locations = write_meeting(Config(conf_file=None, log_dir=str(directory), render_engine=RenderEngine.STRING), meeting)
+    paths = [
+        str(journal.path),
+        *(location.path for location in (locations.raw_log, locations.formatted_log, locations.formatted_minutes)),
+    ]
+    return [Path(path).stat().st_size for path in paths]
+
+
+def main() -> None:
+    rows = []
+    with TemporaryDirectory() as temp:
+        for messages in MESSAGES:
+            elapsed = [best_of(partial(track, MESSAGE_ID_GENERATORS[ids], messages)) for ids in IDS]
+            rows.append([
+                messages,
+                "track (msg/s)",
+                *(f"{messages / value:,.0f}" for value in elapsed),
+                f"{elapsed[0] / elapsed[1]:.2f}x",
+            ])
+            memory = [retained(MESSAGE_ID_GENERATORS[ids], messages) for ids in IDS]
+            rows.append([messages, "bytes/message", *(f"{value:.1f}" for value in memory), f"{memory[0] / memory[1]:.2f}x"])
+            written = [sizes(Path(temp) / str(messages), MESSAGE_ID_GENERATORS[ids], messages) for ids in IDS]
+            for index, name in enumerate(["journal (bytes)", "raw log (bytes)", "log (bytes)", "minutes (bytes)"]):
+                before, after = written[0][index], written[1][index]
+                rows.append([messages, name, f"{before:,}", f"{after:,}", f"{before / after:.2f}x"])
+    print_table(["messages", "measure", "uuid", "sequence", "ratio"], rows)
+
+
+if __name__ == "__main__":
+    main()
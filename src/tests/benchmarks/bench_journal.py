@@ -0,0 +1,68 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the write-ahead journal.
+
+Compares the cost of tracking every message in a meeting with and without a journal
+attached against the cost of rewriting the raw log once, which is what it used to take
+to make a meeting durable.  The bytes column shows the size of the journal and the size
+of the raw log, respectively.
+
+Run from the src directory:  python -m tests.benchmarks.bench_journal
+"""
+
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import Journal
+from hcoopmeetbotlogic.meeting import Meeting
+from tests.benchmarks.util import print_table, synthetic_meeting
+
+MESSAGES = [1000, 10000, 50000]
+ATTENDEES = 25
+
+
+def track(source: Meeting, journal: Journal | None) -> float:
+    """Track all of the messages from a source meeting in a new meeting, returning elapsed time in seconds."""
+    messages = [
+        Message(id=m.id, timestamp=m.timestamp, nick=m.sender, channel=source.channel, network=source.network, payload=m.payload)
+        for m in source.messages
+    ]
+    meeting = Meeting(founder=source.founder, channel=source.channel, network=source.network)
+    if journal:
+        meeting.attach_journal(journal)
+    start = time.perf_counter()
+    for message in messages:
+        meeting.track_message(message)
+    if journal:
+        journal.close()
+    return time.perf_counter() - start
+
+
+def rewrite(meeting: Meeting, path: Path) -> float:
+    """Rewrite the raw log for a meeting, returning elapsed time in seconds."""
+    start = time.perf_counter()
+    path.write_text(meeting.to_json(), encoding="utf-8")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    rows = []
+    with TemporaryDirectory() as temp:
+        for messages in MESSAGES:
+            meeting = synthetic_meeting(messages, ATTENDEES)
+            journal = Journal(Path(temp) / f"{messages}.jsonl")
+            raw_log = Path(temp) / f"{messages}.json"
+            results = [
+                ("track, no journal", track(meeting, None), ""),
+                ("track, journal", track(meeting, journal), journal.path.stat().st_size),
+                ("rewrite raw log once", rewrite(meeting, raw_log), raw_log.stat().st_size),
+            ]
+            rows += [[messages, name, f"{elapsed * 1000:.1f}", size] for name, elapsed, size in results]
+    print_table(["messages", "operation", "elapsed (ms)", "bytes"], rows)
+
+
+if __name__ == "__main__":
+    main()
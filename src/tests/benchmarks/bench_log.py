@@ -0,0 +1,77 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark memory use while writing the formatted log.
+
+Compares the original implementation, which built a _LogMessage for every message before
+rendering the log.html template, against the current chunked implementation for each
+rendering engine.  Peak memory is measured with tracemalloc, so elapsed times are much
+slower than normal and are only useful relative to each other.
+
+Run from the src directory:  python -m tests.benchmarks.bench_log
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.location import Location, Locations
+from hcoopmeetbotlogic.meeting import Meeting
+from hcoopmeetbotlogic.writer import _LogMessage, _render_html, write_formatted_log
+from tests.benchmarks.util import print_table, synthetic_meeting
+
+MESSAGES = [1000, 10000, 50000]
+ATTENDEES = 25
+
+
+def legacy(config: Config, locations: Locations, meeting: Meeting) -> None:
+    """The original implementation of write_formatted_log()."""
+    context = {
+        "title": f"{meeting.name} Log",
+        "messages": [_LogMessage.for_message(config, message) for message in meeting.messages],
+    }
+    with Path(locations.formatted_log.path).open("w", encoding="utf-8") as out:
+        _render_html(template="log.html", context=context, out=out)
+
+
+def measure(function: Callable[[], None]) -> tuple[float, int]:
+    """Run a function once, returning elapsed time in seconds and peak memory in bytes."""
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        return elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    rows = []
+    with TemporaryDirectory() as temp:
+        locations = Locations(
+            raw_log=Location(path=str(Path(temp) / "log.json"), url="http://raw"),
+            formatted_log=Location(path=str(Path(temp) / "log.html"), url="http://log"),
+            formatted_minutes=Location(path=str(Path(temp) / "minutes.html"), url="http://minutes"),
+        )
+        for messages in MESSAGES:
+            meeting = synthetic_meeting(messages, ATTENDEES)
+            genshi = Config(conf_file=None, render_engine=RenderEngine.GENSHI)
+            string = Config(conf_file=None, render_engine=RenderEngine.STRING)
+            results = {
+                "legacy": measure(partial(legacy, genshi, locations, meeting)),
+                "chunked (genshi)": measure(partial(write_formatted_log, genshi, locations, meeting)),
+                "chunked (string)": measure(partial(write_formatted_log, string, locations, meeting)),
+            }
+            rows += [
+                [messages, name, f"{elapsed * 1000:.1f}", f"{peak / 1024 / 1024:.1f}"] for name, (elapsed, peak) in results.items()
+            ]
+    print_table(["messages", "implementation", "elapsed (ms)", "peak memory (MB)"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the plugin's handling of channel traffic.
+
+Compares the original doPrivmsg() implementation (which builds a message and context for
+every message, including the list of nicks in the channel) with the fast path, which
+ignores traffic on channels without a meeting before doing any of that work.  A fake IRC
+object stands in for Limnoria, with many busy channels and a meeting on just one of them.
+
+Run from the src directory:  python -m tests.benchmarks.bench_plugin
+"""
+
+import atexit
+import logging
+import os
+import random
+import shutil
+from functools import partial
+from tempfile import mkdtemp
+from types import SimpleNamespace
+from typing import Any
+from uuid import uuid4
+
+from hcoopmeetbotlogic import handler
+from hcoopmeetbotlogic.config import Config
+from hcoopmeetbotlogic.dateutil import now
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.state import add_meeting, deactivate_meeting, get_meeting, set_config, set_logger
+from tests.benchmarks.util import WORDS, best_of, print_table
+
+CHANNELS = [10, 100, 300]
+USERS = [50, 500]
+MESSAGES = 20000
+NETWORK = "network"
+
+
+def fake_irc(channels: int, users: int) -> Any:
+    """Build a fake IRC object with the given number of channels, each with the given number of users."""
+    state = SimpleNamespace(
+        channels={
+            f"#channel{i}": SimpleNamespace(topic=f"topic {i}", users={f"user{i}-{j}" for j in range(users)})
+            for i in range(channels)
+        }
+    )
+    return SimpleNamespace(
+        state=state,
+        msg=SimpleNamespace(tags={"receivedOn": NETWORK}),
+        network=NETWORK,
+        nick="bot",
+        reply=lambda _: None,
+        sendMsg=lambda _: None,
+    )
+
+
+def traffic(channels: int, seed: int = 42) -> list[Any]:
+    """Generate chat messages spread evenly across all of the channels."""
+    generator = random.Random(seed)  # noqa: S311
+    return [
+        SimpleNamespace(
+            args=[f"#channel{generator.randrange(channels)}", " ".join(generator.choice(WORDS) for _ in range(8))],
+            nick=f"nick{generator.randrange(100)}",
+        )
+        for _ in range(MESSAGES)
+    ]
+
+
+def legacy(plugin: Any, handler: Any, context: Any, irc: Any, msg: Any) -> None:
+    """The original doPrivmsg() implementation."""
+    channel = msg.args[0]
+    topic = irc.state.channels[channel].topic if channel in irc.state.channels else ""
+    users = irc.state.channels[channel].users if channel in irc.state.channels else []
+    message = Message(
+        id=uuid4().hex,
+        timestamp=now(),
+        nick=msg.nick,
+        channel=channel,
+        network=irc.msg.tags["receivedOn"],
+        payload=msg.args[1],
+        topic=topic,
+        channel_nicks=[str(n) for n in users],
+    )
+    handler.irc_message(context=context(plugin, irc, msg), message=message)
+
+
+def run(function: Any, irc: Any, messages: list[Any]) -> None:
+    for msg in messages:
+        function(irc, msg)
+
+
+def main() -> None:
+    set_logger(logging.getLogger("bench_plugin"))
+    set_config(Config(conf_file=None, journal_dir=""))
+    temp = mkdtemp()
+    atexit.register(shutil.rmtree, temp, ignore_errors=True)  # registered first, so it runs after Limnoria's own shutdown logging
+    os.chdir(temp)  # importing Limnoria creates its working directories in the current directory
+    from HcoopMeetbot.plugin import HcoopMeetbot, _context  # noqa: PLC0415
+
+    plugin: Any = SimpleNamespace(log=logging.getLogger("bench_plugin"))
+    meeting = add_meeting(nick="chair", channel="#channel0", network=NETWORK)  # only one channel has a meeting
+    rows = []
+    for channels in CHANNELS:
+        for users in USERS:
+            irc, messages = fake_irc(channels, users), traffic(channels)
+            before = best_of(partial(run, partial(legacy, plugin, handler, _context), irc, messages))
+            after = best_of(partial(run, partial(HcoopMeetbot.doPrivmsg, plugin), irc, messages))
+            rows.append([channels, users, f"{MESSAGES / before:,.0f}", f"{MESSAGES / after:,.0f}", f"{before / after:.1f}x"])
+    assert get_meeting("#channel0", NETWORK) is meeting
+    deactivate_meeting(meeting, retain=False)
+    print_table(["channels", "users", "legacy (msg/s)", "fast path (msg/s)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
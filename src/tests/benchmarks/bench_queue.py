@@ -0,0 +1,82 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the message queue.
+
+Feeds a burst of meeting traffic, including an occasional #save that writes the meeting
+to disk inline, through the handler with and without the message queue.  Measures how
+long the IRC callback thread is held up by each message, which is what stalls the bot,
+along with the total time until all of the messages have been handled.
+
+Run from the src directory:  python -m tests.benchmarks.bench_queue
+"""
+
+import logging
+import random
+import time
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic import handler
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.interface import Context, Message
+from hcoopmeetbotlogic.messagequeue import MessageQueue
+from hcoopmeetbotlogic.state import deactivate_meeting, get_meeting, set_config, set_logger, set_message_queue, set_write_pipeline
+from tests.benchmarks.util import START_TIME, WORDS, print_table
+
+MESSAGES = 5000
+SAVE_EVERY = [0, 1000, 250]
+QUEUE_SIZE = 10000
+CHANNEL = "#channel"
+NETWORK = "network"
+
+
+def traffic(save_every: int, seed: int = 42) -> list[Message]:
+    """Generate a meeting's worth of traffic, with a #save every so often."""
+    generator = random.Random(seed)  # noqa: S311
+    payloads = ["#startmeeting"]
+    for i in range(1, MESSAGES):
+        if save_every and i % save_every == 0:
+            payloads.append("#save")
+        else:
+            payloads.append(" ".join(generator.choice(WORDS) for _ in range(generator.randint(3, 15))))
+    return [Message(None, START_TIME, "chair", CHANNEL, NETWORK, payload) for payload in payloads]
+
+
+def feed(messages: list[Message], queue: MessageQueue | None) -> tuple[float, float, float]:
+    """Feed messages through the handler, returning the average and maximum callback time and the total time."""
+    set_message_queue(queue)
+    context = Context(get_topic=lambda: "", set_topic=lambda _: None, send_reply=lambda _: None, send_message=lambda _: None)
+    elapsed = []
+    start = time.perf_counter()
+    for message in messages:
+        before = time.perf_counter()
+        handler.irc_message(context, message)
+        elapsed.append(time.perf_counter() - before)
+    if queue:
+        queue.shutdown()
+    total = time.perf_counter() - start
+    meeting = get_meeting(CHANNEL, NETWORK)
+    assert meeting and len(meeting.messages) == len(messages)
+    deactivate_meeting(meeting, retain=False)
+    set_message_queue(None)
+    return sum(elapsed) / len(elapsed), max(elapsed), total
+
+
+def main() -> None:
+    logger = logging.getLogger("bench_queue")
+    logger.setLevel(logging.WARNING)
+    set_logger(logger)
+    set_write_pipeline(None)  # so #save writes inline, like a slow command
+    rows = []
+    with TemporaryDirectory() as temp:
+        set_config(Config(conf_file=None, log_dir=temp, journal_dir="", render_engine=RenderEngine.STRING))
+        for save_every in SAVE_EVERY:
+            messages = traffic(save_every)
+            for mode, queue in (("inline", None), ("queued", MessageQueue(logger, QUEUE_SIZE))):
+                average, maximum, total = feed(messages, queue)
+                rows.append([save_every or "never", mode, f"{average * 1e6:,.1f}", f"{maximum * 1000:,.2f}", f"{total:.3f}"])
+    print_table(["#save every", "mode", "callback avg (us)", "callback max (ms)", "total (s)"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark crash recovery of active meetings.
+
+Writes journals for a number of large active meetings and then measures how long it
+takes to recover all of them, using a single worker and using the default number of
+workers.
+
+Run from the src directory:  python -m tests.benchmarks.bench_recovery
+"""
+
+import logging
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from hcoopmeetbotlogic import recovery
+from hcoopmeetbotlogic.config import Config
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import Journal, journal_path
+from hcoopmeetbotlogic.meeting import Meeting
+from tests.benchmarks.util import print_table, synthetic_meeting
+
+MEETINGS = [1, 10, 25]
+MESSAGES = 10000
+ATTENDEES = 25
+
+
+def journal(config: Config, source: Meeting, channel: str) -> None:
+    """Journal a copy of a source meeting on a different channel, as if the bot crashed during the meeting."""
+    meeting = Meeting(founder=source.founder, channel=channel, network=source.network)
+    journal = Journal(journal_path(config, meeting.id))
+    meeting.attach_journal(journal)
+    meeting.active = True
+    for m in source.messages:
+        meeting.track_message(
+            Message(id=m.id, timestamp=m.timestamp, nick=m.sender, channel=channel, network="n", payload=m.payload)
+        )
+    journal.close()
+
+
+def main() -> None:
+    logger = logging.getLogger("bench")
+    source = synthetic_meeting(MESSAGES, ATTENDEES)
+    rows = []
+    for meetings in MEETINGS:
+        with TemporaryDirectory() as temp:
+            config = Config(conf_file=None, log_dir=temp, journal_dir=str(Path(temp) / "journal"))
+            for i in range(meetings):
+                journal(config, source, f"#channel{i}")
+            for workers in [1, recovery._RECOVERY_WORKERS]:
+                with patch.object(recovery, "_RECOVERY_WORKERS", workers):
+                    result = recovery.recover_meetings(config, logger)
+                for meeting in result.recovered:
+                    meeting.detach_journal().close()  # type: ignore[union-attr]
+                rows.append([meetings, MESSAGES, workers, len(result.recovered), f"{result.elapsed * 1000:.1f}"])
+    print_table(["meetings", "messages", "workers", "recovered", "elapsed (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main()
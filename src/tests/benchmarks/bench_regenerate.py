@@ -0,0 +1,71 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark regenerating an archive of raw logs.
+
+Compares one meetbot process per raw log (the only option before batch mode, paying for
+interpreter startup, configuration, and template loading every time) with a single batch
+run, both serial and across a pool of worker processes.  The last column is an incremental
+run over the same archive, where all of the output is already up to date.  Running a
+separate process for every raw log is slow, so it's measured for a sample of the raw logs
+and extrapolated to the whole archive.
+
+Run from the src directory:  python -m tests.benchmarks.bench_regenerate
+"""
+
+import os
+import subprocess
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.cli import _find_raw_logs, _regenerate_all
+from hcoopmeetbotlogic.config import Config
+from tests.benchmarks.util import best_of, print_table, synthetic_meeting
+
+RAW_LOGS = [50, 200]
+MESSAGES = 1000
+SAMPLE = 5
+WORKERS = os.cpu_count() or 1
+CONFIG = str(Path(__file__).parent.parent / "hcoopmeetbotlogic/fixtures/test_config/valid/HcoopMeetbot.conf")
+
+
+def archive(temp: str, count: int) -> Path:
+    """Build an archive of raw logs spread across a few directories."""
+    root = Path(temp) / f"archive-{count}"
+    for i in range(count):
+        path = root / str(2000 + i % 10) / f"meeting-{i}.log.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(synthetic_meeting(MESSAGES, 10, seed=i).to_json(), encoding="utf-8")
+    return root
+
+
+def per_process(raw_logs: list[Path]) -> float:
+    """Time a separate meetbot process for each raw log, like a script would do."""
+    start = time.perf_counter()
+    for raw_log in raw_logs:
+        command = "from hcoopmeetbotlogic.cli import meetbot; meetbot()"
+        args = ["regenerate", "-c", CONFIG, "-r", str(raw_log), "-d", str(raw_log.parent), "-w", "1", "-f"]
+        subprocess.run([sys.executable, "-c", command, *args], check=True, capture_output=True)  # noqa: S603
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    config = Config(conf_file=None)
+    rows = []
+    with TemporaryDirectory() as temp:
+        for count in RAW_LOGS:
+            root = archive(temp, count)
+            raw_logs = _find_raw_logs(str(root))
+            legacy = per_process([raw_log for raw_log, _ in raw_logs[:SAMPLE]]) * count / SAMPLE
+            serial = best_of(partial(_regenerate_all, config, raw_logs, root, 1, force=True), repeat=1)
+            pooled = best_of(partial(_regenerate_all, config, raw_logs, root, WORKERS, force=True), repeat=1)
+            incremental = best_of(partial(_regenerate_all, config, raw_logs, root, WORKERS, force=False))
+            rows.append([count, f"{count / legacy:,.1f}", f"{count / serial:,.1f}", f"{count / pooled:,.1f}", f"{count / incremental:,.0f}"])  # fmt: skip
+    print_table(["raw logs", "per process (logs/s)", "batch, serial", f"batch, {WORKERS} workers", "incremental"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the rendering engines.
+
+Compares the Genshi engine against the string engine, rendering a complete formatted
+log and complete meeting minutes for a large meeting.
+
+Run from the src directory:  python -m tests.benchmarks.bench_render
+"""
+
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.location import Location, Locations
+from hcoopmeetbotlogic.meeting import Meeting
+from hcoopmeetbotlogic.writer import write_formatted_log, write_formatted_minutes
+from tests.benchmarks.util import best_of, print_table, synthetic_meeting
+
+MESSAGES = [1000, 10000, 50000]
+ATTENDEES = 25
+
+
+def render(config: Config, locations: Locations, meeting: Meeting) -> None:
+    write_formatted_log(config, locations, meeting)
+    write_formatted_minutes(config, locations, meeting)
+
+
+def main() -> None:
+    rows = []
+    with TemporaryDirectory() as temp:
+        locations = Locations(
+            raw_log=Location(path=str(Path(temp) / "log.json"), url="http://raw"),
+            formatted_log=Location(path=str(Path(temp) / "log.html"), url="http://log"),
+            formatted_minutes=Location(path=str(Path(temp) / "minutes.html"), url="http://minutes"),
+        )
+        for messages in MESSAGES:
+            meeting = synthetic_meeting(messages, ATTENDEES)
+            results = {
+                engine: best_of(partial(render, Config(conf_file=None, render_engine=engine), locations, meeting))
+                for engine in RenderEngine
+            }
+            baseline = results[RenderEngine.GENSHI]
+            rows += [
+                [messages, engine, f"{elapsed * 1000:.1f}", f"{baseline / elapsed:.1f}x"] for engine, elapsed in results.items()
+            ]
+    print_table(["messages", "engine", "elapsed (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
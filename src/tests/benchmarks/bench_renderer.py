@@ -0,0 +1,62 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark rendering in worker processes.
+
+Saves a large meeting, rendering the formatted log and minutes from scratch, both in the
+bot process and in a render worker process.  Besides the elapsed time, it measures the CPU
+time spent by the thread doing the save, which is time that thread held the GIL and kept
+Limnoria's networking threads from running.  With a worker, the bot process still serializes
+the raw log, but otherwise just waits on the pipe while the worker renders.  The elapsed time
+includes the worker's CPU time, so on a machine with a single core, the worker competes with
+the bot process for the CPU even though it doesn't compete for the GIL.
+
+Run from the src directory:  python -m tests.benchmarks.bench_renderer
+"""
+
+import logging
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.renderer import RenderWorkers
+from hcoopmeetbotlogic.state import set_render_workers
+from hcoopmeetbotlogic.writer import save_meeting
+from tests.benchmarks.util import print_table, synthetic_meeting
+
+MESSAGES = [5000, 20000]
+
+
+def save(config: Config, messages: int) -> tuple[float, float]:
+    """Save a fresh meeting, returning the elapsed time and the CPU time spent by this thread."""
+    meeting = synthetic_meeting(messages, 20)
+    meeting.active = False  # render everything, like when the meeting ends
+    start, cpu = time.perf_counter(), time.thread_time()
+    save_meeting(config, meeting)
+    return time.perf_counter() - start, time.thread_time() - cpu
+
+
+def main() -> None:
+    logger = logging.getLogger("bench_renderer")
+    rows = []
+    with TemporaryDirectory() as temp:
+        for engine in RenderEngine:
+            for messages in MESSAGES:
+                for mode in ("in process", "worker"):
+                    workers = RenderWorkers(logger, 1, 300) if mode == "worker" else None
+                    set_render_workers(workers)
+                    directory = Path(temp) / f"{engine}-{messages}-{mode.replace(' ', '-')}"
+                    config = Config(conf_file=None, log_dir=str(directory), render_engine=engine)
+                    if workers:
+                        save(config, 10)  # so the worker has started up before we measure it
+                    elapsed, cpu = save(config, messages)
+                    if workers:
+                        workers.shutdown()
+                    set_render_workers(None)
+                    rows.append([engine, messages, mode, f"{elapsed:.3f}", f"{cpu:.3f}", f"{cpu / elapsed:.0%}"])
+    print_table(["engine", "messages", "rendering", "save (s)", "bot CPU (s)", "GIL held"], rows)
+
+
+if __name__ == "__main__":
+    main()
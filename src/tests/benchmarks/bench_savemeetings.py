@@ -0,0 +1,75 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the savemeetings admin command.
+
+Opens a number of active meetings at once, like during a network-wide event, and times
+savemeetings writing all of them, both inline (one meeting after another, like before the
+write pipeline was used) and across a write pipeline with a varying number of workers.
+Every run writes into a fresh directory, so no meeting is skipped as unchanged.  Rendering
+holds the GIL, so on a fast local disk the workers mostly take turns; the pipeline pays off
+when writes wait on slow storage, like a network filesystem.
+
+Run from the src directory:  python -m tests.benchmarks.bench_savemeetings
+"""
+
+import logging
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from hcoopmeetbotlogic import handler
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.interface import Context
+from hcoopmeetbotlogic.pipeline import WritePipeline
+from hcoopmeetbotlogic.state import deactivate_meeting, restore_meeting, set_config, set_logger, set_write_pipeline
+from tests.benchmarks.util import print_table, synthetic_meeting
+
+MEETINGS = [10, 40]
+MESSAGES = 1000
+WORKERS = [0, 2, 4, 8]
+
+
+def save(directory: Path, workers: int) -> float:
+    """Time savemeetings for all active meetings, with the given number of pipeline workers."""
+    logger = logging.getLogger("bench_savemeetings")
+    pipeline = WritePipeline(logger, workers) if workers else None
+    set_write_pipeline(pipeline)
+    set_config(Config(conf_file=None, log_dir=str(directory), journal_dir="", render_engine=RenderEngine.STRING))
+    replies: list[str] = []
+    context = Context(get_topic=lambda: "", set_topic=lambda _: None, send_reply=replies.append, send_message=lambda _: None)
+    start = time.perf_counter()
+    handler.savemeetings(context)
+    if pipeline:
+        pipeline.flush()  # savemeetings replies from the pipeline once the last meeting is saved
+    elapsed = time.perf_counter() - start
+    if pipeline:
+        pipeline.shutdown()
+    set_write_pipeline(None)
+    assert "failed" not in replies[0]
+    return elapsed
+
+
+def main() -> None:
+    logger = logging.getLogger("bench_savemeetings")
+    logger.setLevel(logging.WARNING)
+    set_logger(logger)
+    rows = []
+    with TemporaryDirectory() as temp:
+        for count in MEETINGS:
+            meetings = []
+            for i in range(count):
+                meeting = synthetic_meeting(MESSAGES, 10, seed=i)
+                meeting.channel = f"#channel{i}"
+                restore_meeting(meeting)
+                meetings.append(meeting)
+            for workers in WORKERS:
+                elapsed = save(Path(temp) / f"{count}-{workers}", workers)
+                rows.append([count, f"{workers} workers" if workers else "inline", f"{elapsed:.3f}", f"{count / elapsed:,.1f}"])
+            for meeting in meetings:
+                deactivate_meeting(meeting, retain=False)
+    print_table(["meetings", "mode", "total (s)", "meetings/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
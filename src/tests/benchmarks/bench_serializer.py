@@ -0,0 +1,49 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the precompiled meeting serializer.
+
+Compares the generated serializer against the generic cattrs converter that was used
+before, converting the same meeting to and from unstructured data.  Both produce the
+same data, so the difference is entirely conversion overhead.
+
+Run from the src directory:  python -m tests.benchmarks.bench_serializer
+"""
+
+import cattrs
+
+from hcoopmeetbotlogic.meeting import Meeting
+from hcoopmeetbotlogic.serializer import structure_fn, unstructure_fn
+from tests.benchmarks.util import best_of, print_table, synthetic_meeting
+from tests.hcoopmeetbotlogic.testdata import reference_converter
+
+MESSAGES = [1000, 10000, 100000]
+ATTENDEES = 25
+REPEAT = 7
+
+
+def compare(messages: int, converter: cattrs.GenConverter) -> list[list[object]]:
+    """Compare cattrs against the generated serializer for a meeting with the given number of messages."""
+    unstructure, structure = unstructure_fn(Meeting), structure_fn(Meeting)
+    meeting = synthetic_meeting(messages, ATTENDEES)
+    data = unstructure(meeting)
+    assert data == converter.unstructure(meeting)
+    assert structure(data) == converter.structure(data, Meeting)
+    results = [
+        ("unstructure", best_of(lambda: converter.unstructure(meeting), REPEAT), best_of(lambda: unstructure(meeting), REPEAT)),
+        ("structure", best_of(lambda: converter.structure(data, Meeting), REPEAT), best_of(lambda: structure(data), REPEAT)),
+    ]
+    return [
+        [messages, operation, f"{baseline * 1000:.1f}", f"{generated * 1000:.1f}", f"{baseline / generated:.1f}x"]
+        for operation, baseline, generated in results
+    ]
+
+
+def main() -> None:
+    converter = reference_converter()
+    rows = [row for messages in MESSAGES for row in compare(messages, converter)]
+    print_table(["messages", "operation", "cattrs (ms)", "generated (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Benchmark the columnar message store.
+
+Compares a meeting whose messages are kept in a list against the same meeting with its
+messages in a message store, measuring the memory retained by the messages, the time to
+generate the raw log, and the time to render the formatted log.
+
+Run from the src directory:  python -m tests.benchmarks.bench_store
+"""
+
+import tracemalloc
+from collections.abc import MutableSequence
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from attrs import evolve
+
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.location import Location, Locations
+from hcoopmeetbotlogic.meeting import MessageStore, TrackedMessage
+from hcoopmeetbotlogic.writer import write_formatted_log
+from tests.benchmarks.util import best_of, print_table, synthetic_meeting
+
+MESSAGES = [1000, 10000, 100000]
+ATTENDEES = 25
+
+
+def retained(messages: list[TrackedMessage], store: MutableSequence[TrackedMessage]) -> int:
+    """Measure the memory retained when tracking new copies of messages in a store, like messages received from IRC."""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for message in messages:
+            store.append(evolve(message, id=message.id.upper(), sender=message.sender.upper(), payload=message.payload.upper()))
+        return tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+
+def compare(messages: int, locations: Locations) -> list[list[object]]:
+    """Compare list storage against columnar storage for a meeting with the given number of messages."""
+    listed = synthetic_meeting(messages, ATTENDEES)
+    columnar = evolve(listed, messages=MessageStore(listed.messages))
+    assert columnar.to_json() == listed.to_json()
+    config = Config(conf_file=None, render_engine=RenderEngine.STRING)
+    results = [
+        ("to_json (ms)", [best_of(meeting.to_json) * 1000 for meeting in (listed, columnar)]),
+        (
+            "render (ms)",
+            [best_of(partial(write_formatted_log, config, locations, meeting)) * 1000 for meeting in (listed, columnar)],
+        ),
+    ]
+    memory = [retained(list(listed.messages), []), retained(list(listed.messages), MessageStore())]
+    return [
+        [messages, "bytes/message", f"{memory[0] / messages:.1f}", f"{memory[1] / messages:.1f}", f"{memory[0] / memory[1]:.2f}x"],
+        *(
+            [messages, operation, f"{elapsed[0]:.1f}", f"{elapsed[1]:.1f}", f"{elapsed[0] / elapsed[1]:.2f}x"]
+            for operation, elapsed in results
+        ),
+    ]
+
+
+def main() -> None:
+    with TemporaryDirectory() as temp:
+        locations = Locations(
+            raw_log=Location(path=str(Path(temp) / "log.json"), url="http://raw"),
+            formatted_log=Location(path=str(Path(temp) / "log.html"), url="http://log"),
+            formatted_minutes=Location(path=str(Path(temp) / "minutes.html"), url="http://minutes"),
+        )
+        rows = [row for messages in MESSAGES for row in compare(messages, locations)]
+    print_table(["messages", "measure", "list", "columnar", "ratio"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+"""
+Shared utilities for benchmarks.
+"""
+
+import random
+import time
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.meeting import EventType, Meeting
+
+START_TIME = datetime(2021, 4, 13, 2, 6, 12, tzinfo=UTC)
+
+WORDS = ["the", "meeting", "should", "review", "budget", "server", "please", "agenda", "vote", "later", "bylaws", "backup"]
+
+
+def best_of(function: Callable[[], Any], repeat: int = 3) -> float:
+    """Run a function several times, returning the best elapsed time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_table(headings: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+    """Print a simple fixed-width table of results."""
+    widths = [max(len(str(value)) for value in [heading, *(row[i] for row in rows)]) for i, heading in enumerate(headings)]
+    print("  ".join(heading.rjust(width) for heading, width in zip(headings, widths, strict=True)))
+    print("  ".join("-" * width for width in widths))
+    for row in rows:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths, strict=True)))
+
+
+def synthetic_meeting(
+    messages: int,
+    attendees: int,
+    action_every: int = 20,
+    seed: int = 42,
+    message_id: Callable[[Meeting], str] | None = None,
+) -> Meeting:
+    """
+    Generate a large, semi-realistic meeting for benchmarking.
+
+    The meeting has the requested number of attendees (all identified with #here and an
+    alias) and the requested number of chat messages.  Every so often, one of the messages
+    is an #action that calls out one or two attendees, and there's a #topic every so often.
+    If a message id generator is provided, the meeting assigns message ids using it.
+    """
+    generator = random.Random(seed)  # noqa: S311
+    meeting = Meeting(founder="chair", channel="#channel", network="network", start_time=START_TIME)
+    meeting.active = True
+    if message_id:
+        meeting.message_id = message_id
+    nicks = [f"nick{i}" for i in range(attendees)]
+
+    def track(nick: str, payload: str, seconds: int) -> None:
+        message = Message(
+            id=None if message_id else f"id-{seconds}",
+            timestamp=START_TIME + timedelta(seconds=seconds),
+            nick=nick,
+            channel=meeting.channel,
+            network=meeting.network,
+            payload=payload,
+        )
+        tracked = meeting.track_message(message)
+        if payload == "#startmeeting":
+            meeting.track_event(EventType.START_MEETING, tracked)
+        elif payload.startswith("#here "):
+            meeting.track_event(EventType.ATTENDEE, tracked, operand=payload[6:])
+            meeting.track_attendee(nick, payload[6:])
+        elif payload.startswith("#topic "):
+            meeting.track_event(EventType.TOPIC, tracked, operand=payload[7:])
+        elif payload.startswith("#action "):
+            meeting.track_event(EventType.ACTION, tracked, operand=payload[8:])
+
+    track("chair", "#startmeeting", 0)
+    for i, nick in enumerate(nicks):
+        track(nick, f"#here Person {i}", i + 1)
+    for i in range(messages):
+        seconds = attendees + i + 1
+        nick = generator.choice(nicks) if nicks else "chair"
+        chatter = " ".join(generator.choice(WORDS) for _ in range(generator.randint(3, 15)))
+        if i % (action_every * 10) == 0:
+            track("chair", f"#topic Topic {i}", seconds)
+        elif i % action_every == 0 and nicks:
+            target = generator.choice(nicks)
+            alias = f"Person {nicks.index(target)}"
+            track("chair", f"#action {generator.choice([target, alias, f'({target})', f'{target}:'])} to {chatter}", seconds)
+        else:
+            track(nick, chatter, seconds)
+    return meeting
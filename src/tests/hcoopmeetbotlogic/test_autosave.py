@@ -0,0 +1,154 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hcoopmeetbotlogic.autosave import AutosaveScheduler
+from hcoopmeetbotlogic.meeting import Meeting
+
+
+@pytest.fixture
+def logger():
+    return MagicMock()
+
+
+def meeting(channel: str = "#channel") -> Meeting:
+    return Meeting(founder="founder", channel=channel, network="network")
+
+
+class TestAutosaveScheduler:
+    def test_invalid_interval(self, logger):
+        with pytest.raises(ValueError):
+            AutosaveScheduler(logger, 0, 0, MagicMock())
+
+    def test_coalesce(self, logger):
+        save = MagicMock()
+        scheduler = AutosaveScheduler(logger, 60, 0, save)
+        try:
+            first = meeting()
+            for _ in range(100):
+                scheduler.touch(first)
+            assert scheduler.pending == 1  # a burst of changes is a single save
+            save.assert_not_called()  # nothing is due until the interval passes
+            assert scheduler.flush(timeout=5)
+            save.assert_called_once_with(first)
+            assert scheduler.saved == 1
+            assert scheduler.pending == 0
+        finally:
+            scheduler.shutdown()
+
+    def test_interval(self, logger):
+        saved = threading.Event()
+        scheduler = AutosaveScheduler(logger, 0.05, 0, lambda _: saved.set())
+        try:
+            scheduler.touch(meeting())
+            assert saved.wait(timeout=5)
+        finally:
+            scheduler.shutdown()
+
+    def test_messages(self, logger):
+        saved = threading.Event()
+        save = MagicMock(side_effect=lambda _: saved.set())
+        scheduler = AutosaveScheduler(logger, 0, 10, save)
+        try:
+            first = meeting()
+            for _ in range(9):
+                scheduler.touch(first)
+            assert not saved.wait(timeout=0.05)  # without an interval, only the message limit triggers a save
+            scheduler.touch(first)
+            assert saved.wait(timeout=5)
+            save.assert_called_once_with(first)
+        finally:
+            scheduler.shutdown()
+
+    def test_messages_before_interval(self, logger):
+        saved = threading.Event()
+        scheduler = AutosaveScheduler(logger, 3600, 5, lambda _: saved.set())
+        try:
+            scheduler.touch(meeting(), changes=5)
+            assert saved.wait(timeout=5)
+        finally:
+            scheduler.shutdown()
+
+    @patch("hcoopmeetbotlogic.autosave.time.monotonic")
+    def test_deadline_spread(self, monotonic, logger):
+        monotonic.return_value = 1000.0
+        scheduler = AutosaveScheduler(logger, 100, 0, MagicMock())
+        try:
+            deadlines = {scheduler._deadline(meeting(f"#channel-{i}")) for i in range(10)}
+            assert len(deadlines) == 10  # meetings that change together aren't all saved together
+            assert all(1100.0 <= deadline <= 1125.0 for deadline in deadlines)
+            first = meeting()
+            assert scheduler._deadline(first) == scheduler._deadline(first)  # but each meeting is stable
+        finally:
+            scheduler.shutdown()
+
+    def test_forget(self, logger):
+        save = MagicMock()
+        scheduler = AutosaveScheduler(logger, 60, 0, save)
+        try:
+            first = meeting()
+            scheduler.touch(first)
+            scheduler.forget(first)
+            assert scheduler.flush(timeout=5)
+            save.assert_not_called()
+        finally:
+            scheduler.shutdown()
+
+    def test_failure_is_logged(self, logger):
+        saved = []
+
+        def save(meeting):
+            if meeting.channel == "#fail":
+                raise RuntimeError("hello")
+            saved.append(meeting)
+
+        scheduler = AutosaveScheduler(logger, 60, 0, save)
+        try:
+            scheduler.touch(meeting("#fail"))
+            scheduler.touch(meeting("#ok"))
+            assert scheduler.flush(timeout=5)
+            logger.exception.assert_called_once()
+            assert [m.channel for m in saved] == ["#ok"]  # the worker keeps going
+            assert scheduler.saved == 2
+        finally:
+            scheduler.shutdown()
+
+    def test_touch_while_saving(self, logger):
+        started, release = threading.Event(), threading.Event()
+        save = MagicMock(side_effect=lambda _: started.set() or release.wait())
+        scheduler = AutosaveScheduler(logger, 0, 1, save)
+        try:
+            first = meeting()
+            scheduler.touch(first)
+            assert started.wait(timeout=5)
+            scheduler.touch(first)  # changed again while the first save is running
+            assert scheduler.pending == 2
+            release.set()
+            assert scheduler.flush(timeout=5)
+            assert save.call_count == 2
+        finally:
+            release.set()
+            scheduler.shutdown()
+
+    def test_flush_timeout(self, logger):
+        release = threading.Event()
+        scheduler = AutosaveScheduler(logger, 60, 0, lambda _: release.wait())
+        try:
+            scheduler.touch(meeting())
+            assert scheduler.flush(timeout=0.05) is False
+            assert scheduler.pending == 1
+        finally:
+            release.set()
+            scheduler.shutdown()
+
+    def test_shutdown(self, logger):
+        save = MagicMock()
+        scheduler = AutosaveScheduler(logger, 60, 0, save)
+        scheduler.touch(meeting("#one"))
+        scheduler.touch(meeting("#two"))
+        assert scheduler.shutdown(timeout=5)
+        assert save.call_count == 2  # everything dirty is saved before the worker stops
+        scheduler.touch(meeting("#three"))  # ignored once closed
+        assert scheduler.pending == 0
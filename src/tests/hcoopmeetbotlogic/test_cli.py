@@ -1,4 +1,6 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
+import os
+import shutil
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import ANY, MagicMock, patch
@@ -96,3 +98,73 @@ def test_regenerate(self, load_config, derive_locations):
             derive_locations.assert_called_once_with(config, ANY, RAW_LOG_PREFIX, temp)
             assert contents(formatted_log.path) == contents(EXPECTED_LOG)
             assert contents(formatted_minutes.path) == contents(EXPECTED_MINUTES)
+
+    def test_bad_raw_log_dir(self):
+        with TemporaryDirectory() as temp:
+            result = invoke(["regenerate", "-c", CONFIG_PATH, "-r", temp, "-d", temp])  # no raw logs in the directory
+            assert result.exit_code == 2
+
+    def test_bad_workers(self):
+        with TemporaryDirectory() as temp:
+            result = invoke(["regenerate", "-c", CONFIG_PATH, "-r", RAW_LOG, "-d", temp, "-w", "0"])
+            assert result.exit_code == 2
+
+    def test_regenerate_directory(self):
+        with TemporaryDirectory() as temp:
+            archive, output = _archive(temp), Path(temp) / "output"
+            output.mkdir()
+            (archive / "2022" / "bad.log.json").write_text("{", encoding="utf-8")
+            result = invoke(["regenerate", "-c", CONFIG_PATH, "-r", str(archive), "-d", str(output), "-w", "2"])
+            assert result.exit_code == 1
+            assert f"Failed: {archive / '2022' / 'bad.log.json'}: JSONDecodeError" in result.output
+            assert "Regenerated 3, skipped 0, failed 1 of 4 raw log(s)" in result.output
+            assert "Could not regenerate 1 raw log(s)" in result.output
+            for prefix in ["2022/one", "2022/two", "2023/06/three"]:  # the structure of the archive is mirrored
+                assert (output / f"{prefix}.log.html").is_file()
+                assert (output / f"{prefix}.html").is_file()
+            assert not (output / "2022" / "bad.log.html").exists()
+
+    def test_regenerate_skips_up_to_date(self):
+        with TemporaryDirectory() as temp:
+            archive = _archive(temp)
+            args = ["regenerate", "-c", CONFIG_PATH, "-r", str(archive), "-d", str(archive), "-w", "1"]
+            assert "Regenerated 3, skipped 0, failed 0 of 3 raw log(s)" in invoke(args).output
+            assert "Regenerated 0, skipped 3, failed 0 of 3 raw log(s)" in invoke(args).output
+            minutes = archive / "2022" / "one.html"
+            os.utime(archive / "2022" / "one.log.json", ns=(minutes.stat().st_mtime_ns + 1, minutes.stat().st_mtime_ns + 1))
+            assert "Regenerated 1, skipped 2, failed 0 of 3 raw log(s)" in invoke(args).output  # the raw log changed
+            os.utime(archive / "2022" / "one.log.json", ns=(minutes.stat().st_mtime_ns, minutes.stat().st_mtime_ns))
+            assert "Regenerated 1, skipped 2, failed 0 of 3 raw log(s)" in invoke(args).output  # changed in the same tick
+            (archive / "2022" / "two.log.html").unlink()
+            assert "Regenerated 1, skipped 2, failed 0 of 3 raw log(s)" in invoke(args).output  # some output is missing
+            result = invoke([*args, "--force"])
+            assert result.exit_code == 0
+            assert "Regenerated 3, skipped 0, failed 0 of 3 raw log(s)" in result.output
+
+    def test_regenerate_single_file_never_skipped(self):
+        with TemporaryDirectory() as temp:
+            archive = _archive(temp)
+            args = ["regenerate", "-c", CONFIG_PATH, "-r", str(archive / "2022" / "one.log.json"), "-d", str(archive)]
+            assert "Regenerated 1, skipped 0, failed 0 of 1 raw log(s)" in invoke(args).output
+            assert "Regenerated 1, skipped 0, failed 0 of 1 raw log(s)" in invoke(args).output  # even though it's up to date
+
+    def test_regenerate_glob(self):
+        with TemporaryDirectory() as temp:
+            archive, output = _archive(temp), Path(temp) / "output"
+            output.mkdir()
+            result = invoke(["regenerate", "-c", CONFIG_PATH, "-r", f"{archive}/**/t*.log.json", "-d", str(output)])
+            assert result.exit_code == 0
+            assert "Regenerated 2, skipped 0, failed 0 of 2 raw log(s)" in result.output
+            assert (output / "2022" / "two.html").is_file()
+            assert (output / "2023" / "06" / "three.html").is_file()
+            assert not (output / "2022" / "one.html").exists()
+
+
+def _archive(temp: str) -> Path:
+    """Build an archive of raw logs in a directory tree, like the one the bot maintains."""
+    archive = Path(temp) / "archive"
+    for prefix in ["2022/one", "2022/two", "2023/06/three"]:
+        (archive / prefix).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(RAW_LOG, archive / f"{prefix}.log.json")
+        os.utime(archive / f"{prefix}.log.json", (0, 0))  # older than any output, even with a coarse timestamp
+    return archive
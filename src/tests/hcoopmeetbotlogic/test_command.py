@@ -4,8 +4,23 @@
 
 import pytest
 
-from hcoopmeetbotlogic.command import CommandDispatcher, dispatch, is_startmeeting, list_commands
-from hcoopmeetbotlogic.meeting import EventType, VotingAction
+from hcoopmeetbotlogic.command import _HANDLERS, CommandDispatcher, dispatch, is_startmeeting, list_commands
+from hcoopmeetbotlogic.meeting import EventType, VoteTally, VotingAction
+
+
+def _tally(votes: list[MagicMock]) -> VoteTally:
+    tally = VoteTally(0)
+    for vote in votes:
+        tally.add(vote.message.sender, vote.operand)
+    return tally
+
+
+@pytest.fixture
+def handlers():
+    """Replace each of the command handlers with a mock, returning the mocks keyed by operation."""
+    mocks = {operation: MagicMock() for operation in _HANDLERS}
+    with patch.dict(_HANDLERS, mocks):
+        yield mocks
 
 
 def run_dispatch(payload, operation, operand, method):
@@ -72,10 +87,9 @@ def test_startmeeting(self, message, expected):
             pytest.param("ssh"),
         ],
     )
-    @patch("hcoopmeetbotlogic.command._DISPATCHER")
-    def test_dispatch_valid_link(self, dispatcher, protocol):
+    def test_dispatch_valid_link(self, handlers, protocol):
         url = f"{protocol}://whatever"
-        run_dispatch(url, "link", url, dispatcher.do_link)
+        run_dispatch(url, "link", url, handlers["link"])
 
     @pytest.mark.parametrize(
         "protocol",
@@ -84,66 +98,60 @@ def test_dispatch_valid_link(self, dispatcher, protocol):
             pytest.param("bogus"),
         ],
     )
-    @patch("hcoopmeetbotlogic.command._DISPATCHER")
-    def test_dispatch_invalid_link(self, dispatcher, protocol):
+    def test_dispatch_invalid_link(self, handlers, protocol):
         url = f"{protocol}://whatever"
         meeting = MagicMock(channel="#channel")
         context = MagicMock()
         message = MagicMock(payload=url)
         dispatch(meeting, context, message)
-        dispatcher.do_link.assert_not_called()
-
-    @patch("hcoopmeetbotlogic.command._DISPATCHER")
-    def test_dispatch_valid_command(self, dispatcher):
-        run_dispatch("#startmeeting", "startmeeting", "", dispatcher.do_startmeeting)
-        run_dispatch("#endmeeting", "endmeeting", "", dispatcher.do_endmeeting)
-        run_dispatch("#topic some stuff", "topic", "some stuff", dispatcher.do_topic)
-        run_dispatch("#motion some stuff", "motion", "some stuff", dispatcher.do_motion)
-        run_dispatch("#vote +1", "vote", "+1", dispatcher.do_vote)
-        run_dispatch("#close", "close", "", dispatcher.do_close)
-        run_dispatch("#accepted", "accepted", "", dispatcher.do_accepted)
-        run_dispatch("#failed", "failed", "", dispatcher.do_failed)
-        run_dispatch("#inconclusive", "inconclusive", "", dispatcher.do_inconclusive)
-        run_dispatch("#chair name", "chair", "name", dispatcher.do_chair)
-        run_dispatch("#unchair name", "unchair", "name", dispatcher.do_unchair)
-        run_dispatch("#undo", "undo", "", dispatcher.do_undo)
-        run_dispatch("#meetingname name", "meetingname", "name", dispatcher.do_meetingname)
-        run_dispatch("#action some stuff", "action", "some stuff", dispatcher.do_action)
-        run_dispatch("#here alias", "here", "alias", dispatcher.do_here)
-        run_dispatch("#nick name", "nick", "name", dispatcher.do_nick)
-        run_dispatch("#info some stuff", "info", "some stuff", dispatcher.do_info)
-        run_dispatch("#idea some stuff", "idea", "some stuff", dispatcher.do_idea)
-        run_dispatch("#help some stuff", "help", "some stuff", dispatcher.do_help)
-        run_dispatch("#link http://whatever", "link", "http://whatever", dispatcher.do_link)
-        run_dispatch("http://whatever", "link", "http://whatever", dispatcher.do_link)  # auto-detected as a #link event
+        handlers["link"].assert_not_called()
+
+    def test_dispatch_valid_command(self, handlers):
+        run_dispatch("#startmeeting", "startmeeting", "", handlers["startmeeting"])
+        run_dispatch("#endmeeting", "endmeeting", "", handlers["endmeeting"])
+        run_dispatch("#topic some stuff", "topic", "some stuff", handlers["topic"])
+        run_dispatch("#motion some stuff", "motion", "some stuff", handlers["motion"])
+        run_dispatch("#vote +1", "vote", "+1", handlers["vote"])
+        run_dispatch("#close", "close", "", handlers["close"])
+        run_dispatch("#accepted", "accepted", "", handlers["accepted"])
+        run_dispatch("#failed", "failed", "", handlers["failed"])
+        run_dispatch("#inconclusive", "inconclusive", "", handlers["inconclusive"])
+        run_dispatch("#chair name", "chair", "name", handlers["chair"])
+        run_dispatch("#unchair name", "unchair", "name", handlers["unchair"])
+        run_dispatch("#undo", "undo", "", handlers["undo"])
+        run_dispatch("#meetingname name", "meetingname", "name", handlers["meetingname"])
+        run_dispatch("#action some stuff", "action", "some stuff", handlers["action"])
+        run_dispatch("#here alias", "here", "alias", handlers["here"])
+        run_dispatch("#nick name", "nick", "name", handlers["nick"])
+        run_dispatch("#info some stuff", "info", "some stuff", handlers["info"])
+        run_dispatch("#idea some stuff", "idea", "some stuff", handlers["idea"])
+        run_dispatch("#help some stuff", "help", "some stuff", handlers["help"])
+        run_dispatch("#link http://whatever", "link", "http://whatever", handlers["link"])
+        run_dispatch("http://whatever", "link", "http://whatever", handlers["link"])  # auto-detected as a #link event
         run_dispatch(
             "#link Agenda at https://whatever/agenda.html like usual",
             "link",
             "Agenda at https://whatever/agenda.html like usual",
-            dispatcher.do_link,
+            handlers["link"],
         )
 
-    @patch("hcoopmeetbotlogic.command.hasattr")
-    @patch("hcoopmeetbotlogic.command.getattr")
-    def test_dispatch_invalid_command(self, _getattr, _hasattr):
+    def test_dispatch_invalid_command(self, handlers):
         meeting = MagicMock(channel="#channel")
         context = MagicMock()
         message = MagicMock(payload="#bogus")
-        _hasattr.return_value = False
         dispatch(meeting, context, message)
-        _getattr.assert_not_called()
+        for handler in handlers.values():
+            handler.assert_not_called()
         context.send_reply.assert_called_once_with("Unknown command: #bogus")
 
-    @patch("hcoopmeetbotlogic.command.hasattr")
-    @patch("hcoopmeetbotlogic.command.getattr")
-    def test_dispatch_non_commands(self, _getattr, _hasattr):
+    def test_dispatch_non_commands(self, handlers):
         def run_ignored_dispatch(payload, channel=None):
             meeting = MagicMock(channel=channel or "#channel")
             context = MagicMock()
             message = MagicMock(payload=payload)
-            _hasattr.return_value = False
             dispatch(meeting, context, message)
-            _getattr.assert_not_called()
+            for handler in handlers.values():
+                handler.assert_not_called()
             context.send_reply.assert_not_called()
 
         run_ignored_dispatch("#1234")
@@ -153,14 +161,22 @@ def run_ignored_dispatch(payload, channel=None):
         run_ignored_dispatch("#2s3d4f")
         run_ignored_dispatch("#channame", "#channame")
         run_ignored_dispatch("  #channame", "#channame")
+        run_ignored_dispatch("  #CHANNAME is where we are", "#channame")
+        run_ignored_dispatch("hello, everyone")
+        run_ignored_dispatch("a #action in the middle isn't a command")
+        run_ignored_dispatch("see http://whatever")
+        run_ignored_dispatch("")
+        run_ignored_dispatch("   ")
+
+    def test_handlers(self):
+        assert sorted("#" + operation for operation in _HANDLERS) == list_commands()
 
     # noinspection PyTypeChecker
-    @patch("hcoopmeetbotlogic.command._DISPATCHER")
-    def test_dispatch_command_variations(self, dispatcher):
-        run_dispatch(" #startmeeting", "startmeeting", "", dispatcher.do_startmeeting)
-        run_dispatch("\t#startmeeting", "startmeeting", "", dispatcher.do_startmeeting)
-        run_dispatch("#startmeeting   ", "startmeeting", "", dispatcher.do_startmeeting)
-        run_dispatch(" #idea     some stuff    ", "idea", "some stuff", dispatcher.do_idea)
+    def test_dispatch_command_variations(self, handlers):
+        run_dispatch(" #startmeeting", "startmeeting", "", handlers["startmeeting"])
+        run_dispatch("\t#startmeeting", "startmeeting", "", handlers["startmeeting"])
+        run_dispatch("#startmeeting   ", "startmeeting", "", handlers["startmeeting"])
+        run_dispatch(" #idea     some stuff    ", "idea", "some stuff", handlers["idea"])
 
 
 class TestCommandDispatcher:
@@ -256,9 +272,10 @@ def test_startmeeting_as_not_chair(self, dispatcher, meeting, context, message):
     @patch("hcoopmeetbotlogic.command.formatdate")
     @patch("hcoopmeetbotlogic.command.now")
     @patch("hcoopmeetbotlogic.command.config")
-    @patch("hcoopmeetbotlogic.command.write_meeting")
+    @patch("hcoopmeetbotlogic.command.write_pipeline")
+    @patch("hcoopmeetbotlogic.command.submit_meeting")
     def test_endmeeting_as_chair(
-        self, write_meeting, config, now, formatdate, deactivate_meeting, dispatcher, meeting, context, message
+        self, submit_meeting, write_pipeline, config, now, formatdate, deactivate_meeting, dispatcher, meeting, context, message
     ):
         meeting.end_time = None
         meeting.active = None
@@ -267,13 +284,15 @@ def test_endmeeting_as_chair(
         formatdate.return_value = "11111"
         now.return_value = datetime(2021, 3, 7, 13, 14, 0, tzinfo=UTC)
         meeting.is_chair.return_value = True
-        write_meeting.return_value = MagicMock()
-        write_meeting.return_value.raw_log = MagicMock(url="rawurl")
-        write_meeting.return_value.formatted_log = MagicMock(url="logurl")
-        write_meeting.return_value.formatted_minutes = MagicMock(url="minutesurl")
+        submit_meeting.return_value = MagicMock()
+        submit_meeting.return_value.raw_log = MagicMock(url="rawurl")
+        submit_meeting.return_value.formatted_log = MagicMock(url="logurl")
+        submit_meeting.return_value.formatted_minutes = MagicMock(url="minutesurl")
         dispatcher.do_endmeeting(meeting, context, "a", "b", message)
         meeting.track_event.assert_called_once_with(EventType.END_MEETING, message)
-        write_meeting.assert_called_once_with(config=config.return_value, meeting=meeting)
+        submit_meeting.assert_called_once_with(
+            config=config.return_value, meeting=meeting, pipeline=write_pipeline.return_value, final=True
+        )
         context.send_reply.assert_has_calls([
             call("Meeting ended at 11111"),
             call("Raw log: rawurl"),
@@ -286,31 +305,32 @@ def test_endmeeting_as_chair(
         assert meeting.end_time is now.return_value
         assert meeting.active is False
 
-    @patch("hcoopmeetbotlogic.command.write_meeting")
-    def test_endmeeting_as_not_chair(self, write_meeting, dispatcher, meeting, context, message):
+    @patch("hcoopmeetbotlogic.command.submit_meeting")
+    def test_endmeeting_as_not_chair(self, submit_meeting, dispatcher, meeting, context, message):
         meeting.end_time = None
         meeting.active = None
         meeting.is_chair.return_value = False
         dispatcher.do_endmeeting(meeting, context, "a", "b", message)
         meeting.track_event.assert_not_called()
-        write_meeting.assert_not_called()
+        submit_meeting.assert_not_called()
         context.set_topic.assert_not_called()
         context.send_reply.assert_not_called()
         assert meeting.end_time is None
         assert meeting.active is None
 
     @patch("hcoopmeetbotlogic.command.config")
-    @patch("hcoopmeetbotlogic.command.write_meeting")
-    def test_save_as_chair(self, write_meeting, config, dispatcher, meeting, context, message):
+    @patch("hcoopmeetbotlogic.command.write_pipeline")
+    @patch("hcoopmeetbotlogic.command.submit_meeting")
+    def test_save_as_chair(self, submit_meeting, write_pipeline, config, dispatcher, meeting, context, message):
         meeting.is_chair.return_value = True
         config.return_value = MagicMock()
-        write_meeting.return_value = MagicMock()
-        write_meeting.return_value.raw_log = MagicMock(url="rawurl")
-        write_meeting.return_value.formatted_log = MagicMock(url="logurl")
-        write_meeting.return_value.formatted_minutes = MagicMock(url="minutesurl")
+        submit_meeting.return_value = MagicMock()
+        submit_meeting.return_value.raw_log = MagicMock(url="rawurl")
+        submit_meeting.return_value.formatted_log = MagicMock(url="logurl")
+        submit_meeting.return_value.formatted_minutes = MagicMock(url="minutesurl")
         dispatcher.do_save(meeting, context, "a", "b", message)
         meeting.track_event.assert_called_once_with(EventType.SAVE_MEETING, message)
-        write_meeting.assert_called_once_with(config=config.return_value, meeting=meeting)
+        submit_meeting.assert_called_once_with(config=config.return_value, meeting=meeting, pipeline=write_pipeline.return_value)
         context.send_reply.assert_has_calls([
             call("Meeting saved"),
             call("Raw log: rawurl"),
@@ -318,11 +338,11 @@ def test_save_as_chair(self, write_meeting, config, dispatcher, meeting, context
             call("Minutes: minutesurl"),
         ])
 
-    @patch("hcoopmeetbotlogic.command.write_meeting")
-    def test_save_as_not_chair(self, write_meeting, dispatcher, meeting, context, message):
+    @patch("hcoopmeetbotlogic.command.submit_meeting")
+    def test_save_as_not_chair(self, submit_meeting, dispatcher, meeting, context, message):
         meeting.is_chair.return_value = False
         dispatcher.do_save(meeting, context, "a", "b", message)
-        write_meeting.assert_not_called()
+        submit_meeting.assert_not_called()
         meeting.track_event.assert_not_called()
         context.send_reply.assert_not_called()
 
@@ -584,6 +604,7 @@ def test_close_no_votes(self, dispatcher, meeting, context, message):
         meeting.is_chair.return_value = True
         meeting.vote_in_progress = True
         meeting.motion_index = 0
+        meeting.vote_tally.return_value = VoteTally(0)
         dispatcher.do_close(meeting, context, "a", "b", message)
         assert meeting.vote_in_progress is True
         assert meeting.motion_index == 0
@@ -599,6 +620,7 @@ def test_close_accepted(self, dispatcher, meeting, context, message):
         meeting.events.append(MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="one")))
         meeting.events.append(MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="two")))
         meeting.events.append(MagicMock(event_type=EventType.VOTE, operand=VotingAction.OPPOSED, message=MagicMock(sender="three")))
+        meeting.vote_tally.return_value = _tally(meeting.events[1:])
         dispatcher.do_close(meeting, context, "a", "b", message)
         assert meeting.vote_in_progress is False
         assert meeting.motion_index is None
@@ -621,6 +643,7 @@ def test_close_accepted_unanimous(self, dispatcher, meeting, context, message):
         meeting.events.append(
             MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="three"))
         )
+        meeting.vote_tally.return_value = _tally(meeting.events[1:])
         dispatcher.do_close(meeting, context, "a", "b", message)
         assert meeting.vote_in_progress is False
         assert meeting.motion_index is None
@@ -643,6 +666,7 @@ def test_close_failed(self, dispatcher, meeting, context, message):
         meeting.events.append(
             MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="three"))
         )
+        meeting.vote_tally.return_value = _tally(meeting.events[1:])
         dispatcher.do_close(meeting, context, "a", "b", message)
         assert meeting.vote_in_progress is False
         assert meeting.motion_index is None
@@ -666,6 +690,7 @@ def test_close_inconclusive(self, dispatcher, meeting, context, message):
             MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="three"))
         )
         meeting.events.append(MagicMock(event_type=EventType.VOTE, operand=VotingAction.IN_FAVOR, message=MagicMock(sender="four")))
+        meeting.vote_tally.return_value = _tally(meeting.events[1:])
         dispatcher.do_close(meeting, context, "a", "b", message)
         assert meeting.vote_in_progress is False
         assert meeting.motion_index is None
@@ -6,7 +6,15 @@
 
 import pytest
 
-from hcoopmeetbotlogic.config import Config, OutputFormat, load_config
+from hcoopmeetbotlogic.config import (
+    Config,
+    MessageIds,
+    MessageStorage,
+    OutputFormat,
+    RenderEngine,
+    _parse_int,
+    load_config,
+)
 
 MISSING_DIR = "bogus"
 VALID_DIR = Path(__file__).parent / "fixtures/test_config/valid"  # valid config with no optional values
@@ -17,6 +25,13 @@
 INVALID_DIR = Path(__file__).parent / "fixtures/test_config/invalid"
 BAD_BOOLEAN_DIR = Path(__file__).parent / "fixtures/test_config/bad_boolean"
 BAD_FORMAT_DIR = Path(__file__).parent / "fixtures/test_config/bad_format"
+BAD_THREADS_DIR = Path(__file__).parent / "fixtures/test_config/bad_threads"
+BAD_ENGINE_DIR = Path(__file__).parent / "fixtures/test_config/bad_engine"
+BAD_STORAGE_DIR = Path(__file__).parent / "fixtures/test_config/bad_storage"
+BAD_IDS_DIR = Path(__file__).parent / "fixtures/test_config/bad_ids"
+BAD_QUEUE_DIR = Path(__file__).parent / "fixtures/test_config/bad_queue"
+BAD_AUTOSAVE_DIR = Path(__file__).parent / "fixtures/test_config/bad_autosave"
+BAD_RENDER_DIR = Path(__file__).parent / "fixtures/test_config/bad_render"
 
 
 @pytest.fixture
@@ -28,7 +43,25 @@ def context():
 
 class TestConfig:
     def test_constructor(self):
-        config = Config("conf_file", "log_dir", "url_prefix", "pattern", "timezone", True, OutputFormat.HTML)
+        config = Config(
+            "conf_file",
+            "log_dir",
+            "url_prefix",
+            "pattern",
+            "timezone",
+            True,
+            OutputFormat.HTML,
+            5,
+            RenderEngine.STRING,
+            "journal_dir",
+            MessageStorage.COLUMNAR,
+            MessageIds.UUID,
+            100,
+            300,
+            25,
+            3,
+            45,
+        )
         assert config.conf_file == "conf_file"
         assert config.log_dir == "log_dir"
         assert config.url_prefix == "url_prefix"
@@ -36,6 +69,20 @@ def test_constructor(self):
         assert config.timezone == "timezone"
         assert config.use_channel_topic is True
         assert config.output_format == OutputFormat.HTML
+        assert config.write_threads == 5
+        assert config.render_engine == RenderEngine.STRING
+        assert config.journal_dir == "journal_dir"
+        assert config.message_storage == MessageStorage.COLUMNAR
+        assert config.message_ids == MessageIds.UUID
+        assert config.message_queue_size == 100
+        assert config.autosave_seconds == 300
+        assert config.autosave_messages == 25
+        assert config.render_workers == 3
+        assert config.render_timeout == 45
+
+    def test_default_journal_dir(self):
+        config = Config(conf_file=None, log_dir="/tmp/meetings")
+        assert config.journal_dir == ""  # opt-in, since a journal under the published log directory would be served
 
 
 class TestParsing:
@@ -52,6 +99,7 @@ def test_valid_configuration_dir(self):
         assert config.timezone == "America/Chicago"
         assert config.use_channel_topic is True
         assert config.output_format == OutputFormat.HTML
+        assert config.journal_dir == ""
 
     def test_valid_configuration_file(self):
         logger = MagicMock()
@@ -80,6 +128,16 @@ def test_valid_configuration_with_optional(self):
         assert config.timezone == "America/Chicago"
         assert config.use_channel_topic is True
         assert config.output_format == OutputFormat.HTML
+        assert config.write_threads == 4
+        assert config.render_engine == RenderEngine.STRING
+        assert config.journal_dir == "/tmp/journal"
+        assert config.message_storage == MessageStorage.COLUMNAR
+        assert config.message_ids == MessageIds.UUID
+        assert config.message_queue_size == 500
+        assert config.autosave_seconds == 120
+        assert config.autosave_messages == 50
+        assert config.render_workers == 2
+        assert config.render_timeout == 30
 
     def test_no_channel_configuration(self):
         logger = MagicMock()
@@ -106,6 +164,16 @@ def test_empty_configuration(self):
         assert config.pattern == "%Y/{name}.%Y%m%d.%H%M"
         assert config.timezone == "UTC"
         assert config.use_channel_topic is False
+        assert config.write_threads == 2
+        assert config.render_engine == RenderEngine.GENSHI
+        assert config.journal_dir == ""
+        assert config.message_storage == MessageStorage.LIST
+        assert config.message_ids == MessageIds.SEQUENCE
+        assert config.message_queue_size == 0
+        assert config.autosave_seconds == 0
+        assert config.autosave_messages == 0
+        assert config.render_workers == 0
+        assert config.render_timeout == 60
 
     def test_bad_boolean_configuration(self):
         logger = MagicMock()
@@ -133,6 +201,87 @@ def test_bad_format_configuration(self):
         assert config.timezone == "UTC"
         assert config.use_channel_topic is False
 
+    def test_bad_threads_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_THREADS_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the thread count is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.write_threads == 2
+
+    def test_bad_engine_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_ENGINE_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the render engine is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.render_engine == RenderEngine.GENSHI
+
+    def test_bad_storage_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_STORAGE_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the message storage is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.message_storage == MessageStorage.LIST
+
+    def test_bad_ids_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_IDS_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the message ids are invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.message_ids == MessageIds.SEQUENCE
+
+    def test_bad_queue_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_QUEUE_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the queue size is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.message_queue_size == 0
+
+    def test_bad_autosave_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_AUTOSAVE_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the autosave interval is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.autosave_seconds == 0
+
+    def test_bad_render_configuration(self):
+        logger = MagicMock()
+        conf_dir = BAD_RENDER_DIR
+        conf_file = conf_dir / "HcoopMeetbot.conf"
+        assert conf_dir.is_dir() and conf_file.is_file()
+        config = load_config(logger, str(conf_dir))  # since the render timeout is invalid, it's like the file doesn't exist
+        assert config.conf_file is None
+        assert config.log_dir == str(Path.home() / "hcoop-meetbot")
+        assert config.render_timeout == 60
+
+    @pytest.mark.parametrize(
+        "value,minimum,valid",
+        [[0, 0, True], [5, 0, True], [-1, 0, False], [0, 1, False], [1, 1, True]],
+    )
+    def test_parse_int(self, value, minimum, valid):
+        if valid:
+            assert _parse_int("someKey", value, minimum=minimum) == value
+        else:
+            with pytest.raises(ValueError, match=rf"Invalid someKey: {value} \(must be at least {minimum}\)"):
+                _parse_int("someKey", value, minimum=minimum)
+
     def test_invalid_configuration(self):
         logger = MagicMock()
         conf_dir = INVALID_DIR
@@ -1,7 +1,9 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 
-from hcoopmeetbotlogic.dateutil import formatdate, now
+import pytest
+
+from hcoopmeetbotlogic.dateutil import formatdate, formatdate_cached, now
 
 
 class TestDateFunctions:
@@ -13,3 +15,17 @@ def test_format_date(self):
         assert formatdate(timestamp, zone="UTC") == "2021-03-07T13:14+0000"
         assert formatdate(timestamp, zone="America/Chicago") == "2021-03-07T07:14-0600"
         assert formatdate(timestamp, zone="US/Eastern") == "2021-03-07T08:14-0500"
+
+    def test_format_date_none(self):
+        assert formatdate(None) == "None"
+        assert formatdate_cached(None) == "None"
+
+    @pytest.mark.parametrize("zone", ["UTC", "America/Chicago", "US/Eastern", "Europe/London", "Asia/Kolkata"])
+    @pytest.mark.parametrize("fmt", ["%Y-%m-%dT%H:%M%z", "%Y-%m-%d %H:%M:%S%z", "%H:%M:%S", "%H:%M:%S.%f %Z"])
+    def test_cached_matches_uncached(self, zone, fmt):
+        # Walk across a daylight saving time transition in each direction, in uneven steps with microseconds
+        timestamps = []
+        for start in [datetime(2021, 3, 14, 6, 0, 0, tzinfo=UTC), datetime(2021, 11, 7, 5, 0, 0, tzinfo=UTC)]:
+            timestamps += [start + timedelta(seconds=seconds, microseconds=seconds * 7919) for seconds in range(0, 14400, 97)]
+        expected = [formatdate(timestamp, zone=zone, fmt=fmt) for timestamp in timestamps]
+        assert [formatdate_cached(timestamp, zone=zone, fmt=fmt) for timestamp in timestamps] == expected
@@ -1,22 +1,44 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
 
+import sys
+import threading
+from functools import partial
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, call, patch
 
 import pytest
 
+from hcoopmeetbotlogic.autosave import AutosaveScheduler
+from hcoopmeetbotlogic.config import Config, MessageIds, MessageStorage
 from hcoopmeetbotlogic.handler import (
+    _autosave,
+    _mark_dirty,
+    _recover_meetings,
     _send_reply,
     addchair,
     commands,
     configure,
     deletemeeting,
     irc_message,
+    is_tracked,
     listmeetings,
     meetversion,
     outbound_message,
+    queuestats,
     recent,
     savemeetings,
+    shutdown,
 )
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import read_journal
+from hcoopmeetbotlogic.location import derive_locations
+from hcoopmeetbotlogic.meeting import EventType, Meeting
+from hcoopmeetbotlogic.messagequeue import MessageQueue, QueueStats
+from hcoopmeetbotlogic.pipeline import WritePipeline
+from hcoopmeetbotlogic.recovery import Recovery
+from hcoopmeetbotlogic.state import deactivate_meeting, get_meeting, restore_meeting
+from tests.hcoopmeetbotlogic.testdata import time
 
 
 @pytest.fixture
@@ -38,17 +60,228 @@ def test_send_reply(self, logger, context):
 
 
 class TestConfig:
+    @patch("hcoopmeetbotlogic.handler._recover_meetings")
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    @patch("hcoopmeetbotlogic.handler.set_autosave")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.set_message_queue")
+    @patch("hcoopmeetbotlogic.handler.RenderWorkers")
+    @patch("hcoopmeetbotlogic.handler.render_workers")
+    @patch("hcoopmeetbotlogic.handler.set_render_workers")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.set_write_pipeline")
     @patch("hcoopmeetbotlogic.handler.set_config")
     @patch("hcoopmeetbotlogic.handler.set_logger")
     @patch("hcoopmeetbotlogic.handler.load_config")
-    def test_configure_valid(self, load_config, set_logger, set_config):
+    def test_configure_valid(
+        self,
+        load_config,
+        set_logger,
+        set_config,
+        set_write_pipeline,
+        write_pipeline,
+        set_render_workers,
+        render_workers,
+        render_workers_class,
+        set_message_queue,
+        message_queue,
+        set_autosave,
+        autosave,
+        recover_meetings,
+    ):
         logger = MagicMock()
-        config = MagicMock()
+        config = MagicMock(
+            write_threads=2, message_queue_size=10, autosave_seconds=60, autosave_messages=0, render_workers=2, render_timeout=30
+        )
         load_config.return_value = config
+        write_pipeline.return_value = None
+        render_workers.return_value = None
+        message_queue.return_value = None
+        autosave.return_value = None
         configure(logger, "dir")
         load_config.assert_called_once_with(logger, "dir")
         set_logger.assert_called_once_with(logger)
         set_config.assert_called_once_with(config)
+        recover_meetings.assert_called_once_with(logger, config)
+        pipeline = set_write_pipeline.call_args.args[0]
+        assert isinstance(pipeline, WritePipeline)
+        pipeline.shutdown()
+        queue = set_message_queue.call_args.args[0]
+        assert isinstance(queue, MessageQueue)
+        queue.shutdown()
+        scheduler = set_autosave.call_args.args[0]
+        assert isinstance(scheduler, AutosaveScheduler)
+        scheduler.shutdown()
+        render_workers_class.assert_called_once_with(logger, 2, 30)
+        set_render_workers.assert_called_once_with(render_workers_class.return_value)
+
+    @patch("hcoopmeetbotlogic.handler._recover_meetings")
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    @patch("hcoopmeetbotlogic.handler.set_autosave")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.set_message_queue")
+    @patch("hcoopmeetbotlogic.handler.RenderWorkers")
+    @patch("hcoopmeetbotlogic.handler.render_workers")
+    @patch("hcoopmeetbotlogic.handler.set_render_workers")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.set_write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.set_config")
+    @patch("hcoopmeetbotlogic.handler.set_logger")
+    @patch("hcoopmeetbotlogic.handler.load_config")
+    def test_configure_inline_writes(
+        self,
+        load_config,
+        set_logger,
+        set_config,
+        set_write_pipeline,
+        write_pipeline,
+        set_render_workers,
+        render_workers,
+        render_workers_class,
+        set_message_queue,
+        message_queue,
+        set_autosave,
+        autosave,
+        recover_meetings,
+    ):
+        logger = MagicMock()
+        config = MagicMock(write_threads=0, message_queue_size=0, autosave_seconds=0, autosave_messages=0, render_workers=0)
+        load_config.return_value = config
+        calls = MagicMock()
+        previous = calls.pipeline
+        write_pipeline.return_value = previous
+        previous_workers = calls.workers
+        render_workers.return_value = previous_workers
+        previous_queue = MagicMock()
+        message_queue.return_value = previous_queue
+        previous_autosave = MagicMock()
+        autosave.return_value = previous_autosave
+        configure(logger, "dir")
+        set_logger.assert_called_once_with(logger)
+        set_config.assert_called_once_with(config)
+        previous.shutdown.assert_called_once()
+        set_write_pipeline.assert_called_once_with(None)
+        previous_queue.shutdown.assert_called_once()
+        set_message_queue.assert_called_once_with(None)
+        previous_autosave.shutdown.assert_called_once()
+        set_autosave.assert_called_once_with(None)
+        assert calls.method_calls == [call.pipeline.shutdown(), call.workers.shutdown()]  # workers outlive pending writes
+        render_workers_class.assert_not_called()
+        set_render_workers.assert_called_once_with(None)
+        recover_meetings.assert_called_once_with(logger, config)
+
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
+    @patch("hcoopmeetbotlogic.handler.restore_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.recover_meetings")
+    def test_recover_meetings(self, recover_meetings, get_meetings, restore_meeting, submit_meeting, write_pipeline):
+        logger = MagicMock()
+        config = MagicMock()
+        get_meetings.return_value = [MagicMock(id="active")]
+        recovered, conflict, completed = MagicMock(), MagicMock(), MagicMock()
+        recover_meetings.return_value = Recovery(recovered=[recovered, conflict], completed=[completed], elapsed=1.5)
+        restore_meeting.side_effect = lambda meeting: meeting is not conflict
+        _recover_meetings(logger, config)
+        get_meetings.assert_called_once_with(active=True, completed=False)
+        recover_meetings.assert_called_once_with(config, logger, skip={"active"})
+        restore_meeting.assert_has_calls([call(recovered), call(conflict), call(completed)])
+        recovered.detach_journal.assert_not_called()
+        conflict.detach_journal.return_value.close.assert_called_once()  # the journal is left for next time
+        submit_meeting.assert_called_once_with(config=config, meeting=completed, pipeline=write_pipeline.return_value, final=True)
+        logger.warning.assert_called_once()
+        logger.info.assert_called_once()
+
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.recover_meetings")
+    def test_recover_meetings_none(self, recover_meetings, get_meetings):
+        logger = MagicMock()
+        get_meetings.return_value = []
+        recover_meetings.return_value = Recovery()
+        _recover_meetings(logger, MagicMock())
+        logger.info.assert_not_called()
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.set_write_pipeline")
+    def test_shutdown(self, set_write_pipeline, write_pipeline, get_meetings, logger):
+        pipeline = MagicMock()
+        write_pipeline.return_value = pipeline
+        get_meetings.return_value = []
+        shutdown()
+        logger.return_value.debug.assert_called_once()
+        pipeline.shutdown.assert_called_once()
+        set_write_pipeline.assert_called_once_with(None)
+
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.set_write_pipeline")
+    def test_shutdown_no_pipeline(self, set_write_pipeline, write_pipeline, get_meetings):
+        write_pipeline.return_value = None
+        get_meetings.return_value = []
+        shutdown()
+        set_write_pipeline.assert_not_called()
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.set_message_queue")
+    def test_shutdown_queue(self, set_message_queue, message_queue, write_pipeline, get_meetings, logger):
+        calls = MagicMock()
+        message_queue.return_value = calls.queue
+        write_pipeline.return_value = calls.pipeline
+        get_meetings.return_value = []
+        shutdown()
+        assert calls.method_calls == [call.queue.shutdown(), call.pipeline.shutdown()]  # queued messages may write meetings
+        set_message_queue.assert_called_once_with(None)
+        assert logger.return_value.debug.call_count == 2
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    @patch("hcoopmeetbotlogic.handler.set_autosave")
+    def test_shutdown_autosave(self, set_autosave, autosave, message_queue, write_pipeline, get_meetings, logger):
+        calls = MagicMock()
+        message_queue.return_value = calls.queue
+        autosave.return_value = calls.autosave
+        write_pipeline.return_value = calls.pipeline
+        get_meetings.return_value = []
+        shutdown()
+        assert calls.method_calls == [call.queue.shutdown(), call.autosave.shutdown(), call.pipeline.shutdown()]
+        set_autosave.assert_called_once_with(None)
+        assert logger.return_value.debug.call_count == 3
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.render_workers")
+    @patch("hcoopmeetbotlogic.handler.set_render_workers")
+    def test_shutdown_render_workers(self, set_render_workers, render_workers, write_pipeline, get_meetings, logger):
+        calls = MagicMock()
+        write_pipeline.return_value = calls.pipeline
+        render_workers.return_value = calls.workers
+        calls.workers.pids.return_value = [1, 2]
+        get_meetings.return_value = []
+        shutdown()
+        assert calls.method_calls == [call.pipeline.shutdown(), call.workers.pids(), call.workers.shutdown()]
+        set_render_workers.assert_called_once_with(None)
+        logger.return_value.debug.assert_called_with("Stopping %d render worker process(es)", 2)
+
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    def test_shutdown_journals(self, write_pipeline, get_meetings):
+        write_pipeline.return_value = None
+        journaled = MagicMock()
+        unjournaled = MagicMock(journal=None)
+        get_meetings.return_value = [journaled, unjournaled]
+        shutdown()
+        get_meetings.assert_called_once_with(active=True, completed=False)
+        journaled.journal.sync.assert_called_once()
+        journaled.journal.close.assert_not_called()  # the plugin might just be reloading
 
 
 class TestHandlers:
@@ -57,6 +290,23 @@ def logger(self):
         with patch("hcoopmeetbotlogic.handler.logger"):
             yield
 
+    @pytest.mark.parametrize(
+        "meeting,payload,expected",
+        [
+            [None, "hello", False],
+            [None, None, False],
+            [None, "#info not a start", False],
+            [None, " #startmeeting", True],
+            [MagicMock(), "hello", True],
+            [MagicMock(), None, True],
+        ],
+    )
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_is_tracked(self, get_meeting, meeting, payload, expected):
+        get_meeting.return_value = meeting
+        assert is_tracked("channel", "network", payload) is expected
+        get_meeting.assert_called_once_with("channel", "network")
+
     @patch("hcoopmeetbotlogic.handler.dispatch")
     @patch("hcoopmeetbotlogic.handler.is_startmeeting")
     @patch("hcoopmeetbotlogic.handler.add_meeting")
@@ -84,12 +334,15 @@ def test_irc_message_with_meeting(self, get_meeting, add_meeting, is_startmeetin
         add_meeting.assert_not_called()
         meeting.track_message.assert_called_once_with(message)
         dispatch.assert_called_once_with(meeting, context, "xxx")
+        meeting.lock.__enter__.assert_called_once()
 
     @patch("hcoopmeetbotlogic.handler.dispatch")
+    @patch("hcoopmeetbotlogic.handler.config")
     @patch("hcoopmeetbotlogic.handler.is_startmeeting")
     @patch("hcoopmeetbotlogic.handler.add_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meeting")
-    def test_irc_message_start_meeting(self, get_meeting, add_meeting, is_startmeeting, dispatch, context):
+    def test_irc_message_start_meeting(self, get_meeting, add_meeting, is_startmeeting, config, dispatch, context):
+        config.return_value = Config(conf_file=None, journal_dir="")
         message = MagicMock(nick="nick", channel="channel", network="network")
         meeting = MagicMock()
         meeting.track_message = MagicMock(return_value="xxx")
@@ -98,10 +351,59 @@ def test_irc_message_start_meeting(self, get_meeting, add_meeting, is_startmeeti
         add_meeting.return_value = meeting
         irc_message(context, message)
         is_startmeeting.assert_called_once_with(message)
-        add_meeting.assert_called_once_with(nick="nick", channel="channel", network="network")
+        add_meeting.assert_called_once_with(
+            nick="nick", channel="channel", network="network", storage=MessageStorage.LIST, ids=MessageIds.SEQUENCE
+        )
         meeting.track_message.assert_called_once_with(message)
         dispatch.assert_called_once_with(meeting, context, "xxx")
 
+    @patch("hcoopmeetbotlogic.handler.dispatch")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_irc_message_start_meeting_journal(self, get_meeting, config, dispatch, context):
+        with TemporaryDirectory() as temp:
+            config.return_value = Config(conf_file=None, log_dir=temp, journal_dir=str(Path(temp) / "journal"))
+            message = Message(id="id", timestamp=time(0), nick="nick", channel="#c", network="n", payload="#startmeeting")
+            get_meeting.return_value = None
+            with patch("hcoopmeetbotlogic.handler.add_meeting") as add_meeting:
+                add_meeting.return_value = Meeting(founder="nick", channel="#c", network="n")
+                irc_message(context, message)
+            meeting = add_meeting.return_value
+            dispatch.assert_called_once_with(meeting, context, meeting.messages[0])
+            assert meeting.journal.path == Path(temp) / "journal" / f"{meeting.id}.jsonl"
+            meeting.journal.close()
+            assert Meeting.replay(read_journal(meeting.journal.path)) == meeting
+
+    @patch("hcoopmeetbotlogic.handler.dispatch")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.add_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_irc_message_start_meeting_no_journal(self, get_meeting, add_meeting, config, dispatch, context):
+        config.return_value = Config(conf_file=None, journal_dir="")
+        message = Message(id="id", timestamp=time(0), nick="nick", channel="#c", network="n", payload="#startmeeting")
+        get_meeting.return_value = None
+        add_meeting.return_value = Meeting(founder="nick", channel="#c", network="n")
+        irc_message(context, message)
+        assert add_meeting.return_value.journal is None
+        dispatch.assert_called_once()
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler.dispatch")
+    @patch("hcoopmeetbotlogic.handler.Journal")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.add_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_irc_message_start_meeting_journal_error(self, get_meeting, add_meeting, config, journal, dispatch, logger, context):
+        config.return_value = Config(conf_file=None, log_dir="meetings", journal_dir="journal")
+        journal.side_effect = OSError("permission denied")
+        message = Message(id="id", timestamp=time(0), nick="nick", channel="#c", network="n", payload="#startmeeting")
+        get_meeting.return_value = None
+        add_meeting.return_value = Meeting(founder="nick", channel="#c", network="n")
+        irc_message(context, message)  # the meeting still starts, just without a journal
+        assert add_meeting.return_value.journal is None
+        logger.return_value.exception.assert_called_once()
+        dispatch.assert_called_once()
+
     @patch("hcoopmeetbotlogic.handler.get_meeting")
     def test_outbound_message_no_meeting(self, get_meeting, context):
         get_meeting.return_value = None
@@ -116,9 +418,164 @@ def test_outbound_message_with_meeting(self, get_meeting, context):
         get_meeting.return_value = meeting
         message = MagicMock(channel="channel", network="network")
         outbound_message(context, message)  # just make sure it doesn't blow up
+        assert get_meeting.call_args_list == [call("channel", "network")] * 2  # checked again once locked
+        meeting.lock.__enter__.assert_called_once()
+        meeting.track_message.assert_called_once_with(message)
+
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_irc_message_queued(self, get_meeting, message_queue, context):
+        queue = message_queue.return_value
+        get_meeting.return_value = None
+        message = MagicMock(channel="channel", network="network")
+        irc_message(context, message)
+        get_meeting.assert_not_called()  # nothing happens until the queue runs the task
+        queue.put.assert_called_once()
+        key, task = queue.put.call_args.args
+        assert key == "channel/network"
+        task()
         get_meeting.assert_called_once_with("channel", "network")
+
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_outbound_message_queued(self, get_meeting, message_queue, context):
+        queue = message_queue.return_value
+        meeting = get_meeting.return_value
+        message = MagicMock(channel="channel", network="network")
+        outbound_message(context, message)
+        meeting.track_message.assert_not_called()  # nothing happens until the queue runs the task
+        key, task = queue.put.call_args.args
+        assert key == "channel/network"
+        task()
         meeting.track_message.assert_called_once_with(message)
 
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    def test_mark_dirty(self, autosave):
+        scheduler = autosave.return_value
+        meeting = MagicMock(active=True)
+        _mark_dirty(meeting)
+        scheduler.touch.assert_called_once_with(meeting)
+        scheduler.touch.reset_mock()
+        meeting.active = False  # a meeting that just ended was already saved
+        _mark_dirty(meeting)
+        scheduler.touch.assert_not_called()
+        autosave.return_value = None
+        _mark_dirty(MagicMock(active=True))  # nothing to do when autosave is disabled
+
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_irc_message_marks_dirty(self, get_meeting, autosave, context):
+        meeting = get_meeting.return_value
+        meeting.active = True
+        with patch("hcoopmeetbotlogic.handler.dispatch"):
+            irc_message(context, MagicMock(channel="channel", network="network"))
+        autosave.return_value.touch.assert_called_once_with(meeting)
+
+    @patch("hcoopmeetbotlogic.handler.autosave")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_outbound_message_marks_dirty(self, get_meeting, autosave, context):
+        meeting = get_meeting.return_value
+        meeting.active = True
+        outbound_message(context, MagicMock(channel="channel", network="network"))
+        autosave.return_value.touch.assert_called_once_with(meeting)
+
+    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_autosave_inline(self, get_meeting, config, write_pipeline, submit_meeting, write_meeting):
+        meeting = MagicMock(channel="channel", network="network")
+        get_meeting.return_value = meeting
+        write_pipeline.return_value = None
+        _autosave(meeting)
+        write_meeting.assert_called_once_with(config=config.return_value, meeting=meeting)
+        submit_meeting.assert_not_called()
+        meeting.lock.__enter__.assert_called_once()
+
+    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_autosave_pipeline(self, get_meeting, config, write_pipeline, submit_meeting, write_meeting):
+        meeting = MagicMock(channel="channel", network="network")
+        get_meeting.return_value = meeting
+        _autosave(meeting)
+        submit_meeting.assert_called_once_with(config=config.return_value, meeting=meeting, pipeline=write_pipeline.return_value)
+        write_meeting.assert_not_called()
+
+    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meeting")
+    def test_autosave_inactive(self, get_meeting, submit_meeting, write_meeting):
+        meeting = MagicMock(channel="channel", network="network")
+        get_meeting.return_value = None  # the meeting ended or was deleted after it changed
+        _autosave(meeting)
+        get_meeting.return_value = MagicMock()  # a new meeting on the same channel isn't saved on its behalf
+        _autosave(meeting)
+        submit_meeting.assert_not_called()
+        write_meeting.assert_not_called()
+
+    @patch("hcoopmeetbotlogic.command.config")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_queued_ordering(self, message_queue, config, command_config, context):
+        queue = MessageQueue(MagicMock(), 1)  # replies are queued by the worker itself, so they must never block
+        message_queue.return_value = queue
+        config.return_value = command_config.return_value = Config(conf_file=None, journal_dir="")
+        try:
+            context.send_reply.side_effect = lambda reply: outbound_message(
+                context, Message(None, time(0), "bot", "#queued", "network", reply)
+            )  # like Limnoria echoing a reply through outFilter
+            irc_message(context, Message(None, time(0), "nick", "#queued", "network", "#startmeeting"))
+            assert queue.flush(timeout=5)
+            irc_message(context, Message(None, time(1), "nick", "#queued", "network", "hello"))
+            assert queue.flush(timeout=5)
+            meeting = get_meeting("#queued", "network")
+            assert meeting is not None
+            payloads = [message.payload for message in meeting.messages]
+            assert payloads[0] == "#startmeeting"
+            assert payloads[-1] == "hello"
+            assert len(payloads) > 2  # replies to #startmeeting were tracked in between, just like inline
+            assert [message.id for message in meeting.messages] == [str(i) for i in range(len(payloads))]
+            deactivate_meeting(meeting, retain=False)
+        finally:
+            queue.shutdown()
+
+    @patch("hcoopmeetbotlogic.command.config")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_queued_start_is_tracked(self, message_queue, config, command_config, context):
+        queue = MessageQueue(MagicMock(), 10)
+        message_queue.return_value = queue
+        config.return_value = command_config.return_value = Config(conf_file=None, journal_dir="")
+        release = threading.Event()
+        try:
+            queue.put("blocker", release.wait)  # the worker can't get to the start yet
+            assert not is_tracked("#pending", "network", "hello")
+            irc_message(context, Message(None, time(0), "nick", "#pending", "network", "#startmeeting"))
+            assert get_meeting("#pending", "network") is None
+            assert is_tracked("#pending", "network", "hello")  # following traffic is not dropped
+            assert is_tracked("#pending", "network")  # and neither are the bot's replies
+            irc_message(context, Message(None, time(1), "nick", "#pending", "network", "hello"))
+            release.set()
+            assert queue.flush(timeout=5)
+            meeting = get_meeting("#pending", "network")
+            assert meeting is not None
+            assert [message.payload for message in meeting.messages] == ["#startmeeting", "hello"]
+            deactivate_meeting(meeting, retain=False)
+            assert not is_tracked("#pending", "network", "hello")
+        finally:
+            release.set()
+            queue.shutdown()
+
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_queued_start_dropped(self, message_queue, context):
+        message_queue.return_value.put.return_value = False  # like a full queue that drops messages
+        irc_message(context, Message(None, time(0), "nick", "#dropped", "network", "#startmeeting"))
+        assert not is_tracked("#dropped", "network", "hello")
+
 
 class TestCommands:
     @pytest.fixture(autouse=True)
@@ -132,6 +589,23 @@ def test_meetversion(self, send_reply, context):
         meetversion(context)
         send_reply.assert_called_once_with(context, "HCoop Meetbot v1.2.3")
 
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_queuestats_disabled(self, message_queue, send_reply, context):
+        message_queue.return_value = None
+        queuestats(context)
+        send_reply.assert_called_once_with(context, "Message queue is not enabled")
+
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_queuestats(self, message_queue, send_reply, context):
+        message_queue.return_value.stats.return_value = QueueStats(3, 100, 97, 5, 1, 0.0015, 0.25)
+        queuestats(context)
+        send_reply.assert_called_once_with(
+            context,
+            "Message queue: depth 3, enqueued 100, processed 97, blocked 5, dropped 1, latency 1.5 ms average, 250.0 ms max",
+        )
+
     @patch("hcoopmeetbotlogic.handler._send_reply")
     @patch("hcoopmeetbotlogic.handler.get_meetings")
     def test_listmeetings_no_meetings(self, get_meetings, send_reply, context):
@@ -157,35 +631,146 @@ def test_listmeetings_with_meetings(self, get_meetings, send_reply, context):
     def test_savemeetings_no_meetings(self, get_meetings, send_reply, context):
         get_meetings.return_value = []
         savemeetings(context)
-        get_meetings.assert_called_once_with(active=True, completed=False)
+        get_meetings.assert_called_once_with(active=True, completed=False, snapshot=True)
         send_reply.assert_called_once_with(context, "No meetings to save")
 
     @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
     @patch("hcoopmeetbotlogic.handler.config")
-    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meetings")
-    def test_savemeetings_with_meeting(self, get_meetings, write_meeting, config, send_reply, context):
+    def test_savemeetings_with_meeting(self, get_meetings, save_meeting, config, write_pipeline, send_reply, context):
         meeting = MagicMock()
+        meeting.display_name.return_value = "#one"
         config.return_value = "xxx"
+        write_pipeline.return_value = None
         get_meetings.return_value = [meeting]
+        save_meeting.return_value = MagicMock(written=True)
         savemeetings(context)
-        get_meetings.assert_called_once_with(active=True, completed=False)
-        write_meeting.assert_has_calls([call(config="xxx", meeting=meeting)])
-        send_reply.assert_called_once_with(context, "Saved 1 meeting")
+        get_meetings.assert_called_once_with(active=True, completed=False, snapshot=True)
+        save_meeting.assert_has_calls([call(config="xxx", meeting=meeting)])
+        assert send_reply.call_args_list[0] == call(context, "Saved 1 meeting")
+        assert send_reply.call_args_list[1].args[1].startswith("#one saved in ")
 
     @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
     @patch("hcoopmeetbotlogic.handler.config")
-    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meetings")
-    def test_savemeetings_with_meetings(self, get_meetings, write_meeting, config, send_reply, context):
+    def test_savemeetings_with_meetings(self, get_meetings, save_meeting, config, write_pipeline, send_reply, context):
         meeting1 = MagicMock()
         meeting2 = MagicMock()
         config.return_value = "xxx"
+        write_pipeline.return_value = None
         get_meetings.return_value = [meeting1, meeting2]
+        save_meeting.return_value = MagicMock(written=True)
         savemeetings(context)
-        get_meetings.assert_called_once_with(active=True, completed=False)
-        write_meeting.assert_has_calls([call(config="xxx", meeting=meeting1), call(config="xxx", meeting=meeting2)])
-        send_reply.assert_called_once_with(context, "Saved 2 meetings")
+        get_meetings.assert_called_once_with(active=True, completed=False, snapshot=True)
+        save_meeting.assert_has_calls([call(config="xxx", meeting=meeting1), call(config="xxx", meeting=meeting2)])
+        assert send_reply.call_args_list[0] == call(context, "Saved 2 meetings")
+
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    def test_savemeetings_unchanged(self, get_meetings, save_meeting, config, write_pipeline, send_reply, context):
+        meeting1 = MagicMock()
+        meeting2 = MagicMock()
+        meeting2.display_name.return_value = "#two"
+        config.return_value = "xxx"
+        write_pipeline.return_value = None
+        get_meetings.return_value = [meeting1, meeting2]
+        save_meeting.side_effect = [MagicMock(written=True), MagicMock(written=False, skipped=["a.log.json", "a.html"])]
+        with patch("hcoopmeetbotlogic.handler.logger") as logger:
+            savemeetings(context)
+            logger.return_value.info.assert_called_once_with("Skipped unchanged files for %s: %s", "#two", "a.log.json, a.html")
+        assert send_reply.call_args_list[0] == call(context, "Saved 2 meetings (1 unchanged, not rewritten)")
+        assert "#two unchanged in " in send_reply.call_args_list[1].args[1]
+
+    @patch("hcoopmeetbotlogic.handler.logger")
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    def test_savemeetings_failed(self, get_meetings, save_meeting, config, write_pipeline, send_reply, logger, context):
+        meeting1 = MagicMock()
+        meeting1.display_name.return_value = "#one"
+        meeting2 = MagicMock()
+        meeting2.display_name.return_value = "#two"
+        config.return_value = "xxx"
+        write_pipeline.return_value = None
+        get_meetings.return_value = [meeting1, meeting2]
+        save_meeting.side_effect = [OSError("disk full"), MagicMock(written=True)]
+        savemeetings(context)
+        assert save_meeting.call_count == 2  # a failure doesn't stop the other meetings from being saved
+        logger.return_value.exception.assert_called_once_with("Failed to save %s", "#one")
+        assert send_reply.call_args_list[0] == call(context, "Saved 1 meeting (1 failed)")
+        first, second = send_reply.call_args_list[1].args[1].split(", ")
+        assert first.startswith("#one failed in ")
+        assert first.endswith(" ms (OSError: disk full)")
+        assert second.startswith("#two saved in ")
+
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    def test_savemeetings_pipeline(self, get_meetings, save_meeting, config, write_pipeline, send_reply, context):
+        meetings = [MagicMock() for _ in range(4)]
+        for i, meeting in enumerate(meetings):
+            meeting.key.return_value = f"#channel{i}/network"
+            meeting.display_name.return_value = f"#channel{i}"
+        config.return_value = "xxx"
+        get_meetings.return_value = meetings
+        running, barrier = [], threading.Barrier(4, timeout=5)
+
+        def save(config, meeting):  # noqa: ARG001
+            running.append(threading.current_thread().name)
+            barrier.wait()  # only completes if all of the meetings are being saved at the same time
+            return MagicMock(written=True)
+
+        save_meeting.side_effect = save
+        pipeline = WritePipeline(MagicMock(), 4)
+        write_pipeline.return_value = pipeline
+        try:
+            savemeetings(context)
+        finally:
+            pipeline.shutdown()
+        assert all(name.startswith("meetbot-writer") for name in running)
+        save_meeting.assert_has_calls([call(config="xxx", meeting=meeting) for meeting in meetings], any_order=True)
+        assert send_reply.call_args_list[0] == call(context, "Saved 4 meetings")
+        assert [detail.split(" ")[0] for detail in send_reply.call_args_list[1].args[1].split(", ")] == [
+            f"#channel{i}" for i in range(4)
+        ]  # reported in order, no matter which one finished first
+
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.save_meeting")
+    @patch("hcoopmeetbotlogic.handler.get_meetings")
+    def test_savemeetings_does_not_wait(self, get_meetings, save_meeting, config, write_pipeline, send_reply, context):
+        meetings = [MagicMock() for _ in range(2)]
+        for i, meeting in enumerate(meetings):
+            meeting.key.return_value = f"#channel{i}/network"
+            meeting.display_name.return_value = f"#channel{i}"
+        config.return_value = "xxx"
+        get_meetings.return_value = meetings
+        release = threading.Event()
+        save_meeting.side_effect = lambda config, meeting: release.wait() and MagicMock(written=True)  # noqa: ARG005
+        pipeline = WritePipeline(MagicMock(), 2)
+        write_pipeline.return_value = pipeline
+        try:
+            savemeetings(context)  # returns while the saves are still blocked
+            send_reply.assert_not_called()
+            release.set()
+            assert pipeline.flush(timeout=5)
+        finally:
+            release.set()
+            pipeline.shutdown()
+        assert send_reply.call_args_list[0] == call(context, "Saved 2 meetings")  # replied once the last save finished
+        assert send_reply.call_count == 2
 
     @patch("hcoopmeetbotlogic.handler._send_reply")
     @patch("hcoopmeetbotlogic.handler.get_meeting")
@@ -204,52 +789,100 @@ def test_addchair_found(self, get_meeting, send_reply, context):
         meeting.display_name = MagicMock(return_value="xxx")
         get_meeting.return_value = meeting
         addchair(context, "channel", "network", "nick")
-        get_meeting.assert_called_once_with("channel", "network")
+        assert get_meeting.call_args_list == [call("channel", "network")] * 2  # checked again once locked
+        meeting.lock.__enter__.assert_called_once()
         meeting.add_chair.assert_called_once_with("nick", primary=True)
         send_reply.assert_called_once_with(context, "yyy is now the primary chair for xxx")
 
     @patch("hcoopmeetbotlogic.handler._send_reply")
-    @patch("hcoopmeetbotlogic.handler.write_meeting")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
     @patch("hcoopmeetbotlogic.handler.deactivate_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meeting")
-    def test_deletemeeting_not_found(self, get_meeting, deactivate_meeting, write_meeting, send_reply, context):
+    def test_deletemeeting_not_found(self, get_meeting, deactivate_meeting, submit_meeting, send_reply, context):
         get_meeting.return_value = None
         deletemeeting(context, "channel", "network", save=True)
         get_meeting.assert_called_once_with("channel", "network")
         deactivate_meeting.assert_not_called()
-        write_meeting.assert_not_called()
+        submit_meeting.assert_not_called()
         send_reply.assert_called_once_with(context, "Meeting not found for channel/network")
 
+    @patch("hcoopmeetbotlogic.handler.autosave")
     @patch("hcoopmeetbotlogic.handler._send_reply")
     @patch("hcoopmeetbotlogic.handler.write_meeting")
     @patch("hcoopmeetbotlogic.handler.deactivate_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meeting")
-    def test_deletemeeting_found_no_save(self, get_meeting, deactivate_meeting, write_meeting, send_reply, context):
+    def test_deletemeeting_found_no_save(self, get_meeting, deactivate_meeting, write_meeting, send_reply, autosave, context):
         meeting = MagicMock()
         meeting.display_name = MagicMock(return_value="xxx")
         get_meeting.return_value = meeting
         deletemeeting(context, "channel", "network", save=False)
-        get_meeting.assert_called_once_with("channel", "network")
+        assert get_meeting.call_args_list == [call("channel", "network")] * 2  # checked again once locked
+        meeting.lock.__enter__.assert_called_once()
         deactivate_meeting.assert_called_once_with(meeting, retain=False)
         write_meeting.assert_not_called()
+        meeting.detach_journal.return_value.remove.assert_called_once()
+        autosave.return_value.forget.assert_called_once_with(meeting)  # a deleted meeting is never autosaved
         send_reply.assert_called_once_with(context, "Meeting xxx has been deleted")
 
     @patch("hcoopmeetbotlogic.handler._send_reply")
     @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    @patch("hcoopmeetbotlogic.handler.submit_meeting")
     @patch("hcoopmeetbotlogic.handler.write_meeting")
     @patch("hcoopmeetbotlogic.handler.deactivate_meeting")
     @patch("hcoopmeetbotlogic.handler.get_meeting")
-    def test_deletemeeting_found_save(self, get_meeting, deactivate_meeting, write_meeting, config, send_reply, context):
+    def test_deletemeeting_found_save(
+        self, get_meeting, deactivate_meeting, write_meeting, submit_meeting, write_pipeline, config, send_reply, context
+    ):
         meeting = MagicMock()
         meeting.display_name = MagicMock(return_value="xxx")
         config.return_value = "yyy"
         get_meeting.return_value = meeting
         deletemeeting(context, "channel", "network", save=True)
-        get_meeting.assert_called_once_with("channel", "network")
-        write_meeting.assert_called_once_with(config="yyy", meeting=meeting)
+        assert get_meeting.call_args_list == [call("channel", "network")] * 2  # checked again once locked
+        meeting.lock.__enter__.assert_called_once()
+        submit_meeting.assert_called_once_with(config="yyy", meeting=meeting, pipeline=write_pipeline.return_value, final=True)
+        write_meeting.assert_not_called()  # never around the pipeline, which owns the journal now
+        meeting.detach_journal.assert_not_called()
         deactivate_meeting.assert_called_once_with(meeting, retain=False)
         send_reply.assert_called_once_with(context, "Meeting xxx has been deleted (saved first)")
 
+    @patch("hcoopmeetbotlogic.handler._send_reply")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.write_pipeline")
+    def test_deletemeeting_save_after_pending_write(self, write_pipeline, config, send_reply, context):
+        with TemporaryDirectory() as temp:
+            config.return_value = Config(conf_file=None, log_dir=temp, journal_dir="")
+            pipeline = WritePipeline(MagicMock(), 2)
+            write_pipeline.return_value = pipeline
+            started, release = threading.Event(), threading.Event()
+            try:
+                meeting = Meeting(founder="founder", channel="#deleted", network="network")
+                meeting.track_message(Message(None, time(0), "founder", "#deleted", "network", "#startmeeting"))
+                meeting.active = True
+                assert restore_meeting(meeting)
+                key = meeting.key()
+                writes: list[str] = []
+
+                def pending() -> None:
+                    started.set()
+                    release.wait()
+                    writes.append("pending")
+
+                pipeline.submit(key, pending)
+                assert started.wait(timeout=5)
+                deletemeeting(context, "#deleted", "network", save=True)  # doesn't wait for, or overtake, the pending write
+                pipeline.submit(key, lambda: writes.append("after"))
+                assert not Path(derive_locations(config.return_value, meeting).raw_log.path).exists()
+                release.set()
+                assert pipeline.flush(timeout=5)
+                assert writes == ["pending", "after"]
+                assert Path(derive_locations(config.return_value, meeting).raw_log.path).is_file()
+                send_reply.assert_called_once_with(context, f"Meeting {meeting.display_name()} has been deleted (saved first)")
+            finally:
+                release.set()
+                pipeline.shutdown()
+
     @patch("hcoopmeetbotlogic.handler._send_reply")
     @patch("hcoopmeetbotlogic.handler.get_meetings")
     def test_recent_no_meetings(self, get_meetings, send_reply, context):
@@ -279,3 +912,73 @@ def test_commands(self, list_commands, send_reply, context):
             call(context, "Available commands: a, b, c"),
             call(context, "See also: https://hcoop-meetbot.readthedocs.io/en/stable/"),
         ])
+
+
+class TestConcurrency:
+    @pytest.fixture(autouse=True)
+    def logger(self):
+        with patch("hcoopmeetbotlogic.handler.logger"):
+            yield
+
+    @pytest.fixture(autouse=True)
+    def switch_often(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible, so races are likely to show up
+        yield
+        sys.setswitchinterval(interval)
+
+    @patch("hcoopmeetbotlogic.command.config")
+    @patch("hcoopmeetbotlogic.handler.config")
+    @patch("hcoopmeetbotlogic.handler.message_queue")
+    def test_messages_and_saves(self, message_queue, config, command_config, context, tmp_path):
+        threads, messages = 6, 150
+        message_queue.return_value = None  # handled inline on each thread, like Limnoria's threaded commands
+        config.return_value = command_config.return_value = Config(
+            conf_file=None, log_dir=str(tmp_path), journal_dir=str(tmp_path / "journal")
+        )
+        context.get_topic.return_value = "topic"
+        context.send_reply.side_effect = lambda reply: outbound_message(
+            context, Message(None, time(0), "bot", "#stress", "network", reply)
+        )  # like Limnoria echoing a reply through outFilter
+
+        irc_message(context, Message(None, time(0), "chair", "#stress", "network", "#startmeeting"))
+        meeting = get_meeting("#stress", "network")
+        assert meeting is not None
+        barrier, failures = threading.Barrier(threads + 2), []
+
+        def run(target):
+            barrier.wait()
+            try:
+                target()
+            except Exception as e:  # noqa: BLE001
+                failures.append(e)
+
+        def chatter(nick):
+            for i in range(messages):
+                payload = f"#info {nick} {i}" if i % 10 == 0 else f"{nick} {i}"
+                irc_message(context, Message(None, time(i), nick, "#stress", "network", payload))
+
+        def save():
+            for i in range(20):
+                savemeetings(context)
+                addchair(context, "#stress", "network", f"nick{i % threads}")
+
+        targets = [partial(chatter, f"nick{i}") for i in range(threads)] + [save, lambda: listmeetings(context)]
+        workers = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+        assert not failures
+
+        deletemeeting(context, "#stress", "network", save=True)
+        assert get_meeting("#stress", "network") is None
+        for i in range(threads):
+            payloads = [message.payload for message in meeting.messages if message.sender == f"nick{i}"]
+            assert payloads == [f"#info nick{i} {j}" if j % 10 == 0 else f"nick{i} {j}" for j in range(messages)]
+        ids = [message.id for message in meeting.messages]
+        assert len(set(ids)) == len(ids)
+        assert len([event for event in meeting.events if event.event_type == EventType.INFO]) == threads * messages // 10
+        with Path(derive_locations(config.return_value, meeting).raw_log.path).open(encoding="utf-8") as raw_log:
+            saved = Meeting.from_json(raw_log.read())
+        assert saved == meeting  # the final save happened with the meeting locked, so it has everything
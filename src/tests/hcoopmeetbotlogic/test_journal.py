@@ -0,0 +1,269 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+import json
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from hcoopmeetbotlogic.command import dispatch
+from hcoopmeetbotlogic.config import Config
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.journal import Journal, journal_path, read_journal
+from hcoopmeetbotlogic.meeting import EventType, Meeting, MessageStore, TrackedMessage, VotingAction
+from tests.hcoopmeetbotlogic.testdata import sample_meeting, time
+
+# A meeting exercising all of the commands that change meeting state, other than #endmeeting and #save
+SCRIPT = [
+    ("pronovic", "#startmeeting"),
+    ("pronovic", "#chair layline bhkl"),
+    ("layline", "#here Ken"),
+    ("bhkl", "#here"),
+    ("unknown_lamer", "hello, everyone"),
+    ("pronovic", "#topic Old business"),
+    ("pronovic", "#info this is some info"),
+    ("pronovic", "#undo"),
+    ("pronovic", "#action layline to do a thing"),
+    ("pronovic", "#nick someone"),
+    ("pronovic", "#unchair bhkl"),
+    ("pronovic", "#meetingname Annual Meeting"),
+    ("pronovic", "#motion Do we agree?"),
+    ("layline", "#vote +1"),
+    ("bhkl", "#vote -1"),
+    ("unknown_lamer", "#vote +1"),
+    ("pronovic", "#close"),
+    ("pronovic", "#link https://example.com"),
+]
+
+
+@pytest.fixture
+def temp():
+    with TemporaryDirectory() as temp:
+        yield Path(temp)
+
+
+def _replay(journal: Journal) -> Meeting:
+    journal.close()
+    return Meeting.replay(read_journal(journal.path))
+
+
+def _assert_identical(replayed: Meeting, original: Meeting) -> None:
+    assert replayed == original
+    assert replayed.journal is None
+    for event in replayed.events:  # events must refer to the same objects that are in the messages list
+        assert any(event.message is message for message in replayed.messages)
+    for left, right in zip(replayed.events, original.events, strict=True):
+        assert type(left.operand) is type(right.operand)
+
+
+class TestJournal:
+    def test_journal_path(self):
+        config = Config(conf_file=None, journal_dir="journal")
+        assert journal_path(config, "abc") == Path("journal") / "abc.jsonl"
+
+    def test_append(self, temp):
+        path = temp / "nested" / "journal.jsonl"  # the directory is created if necessary
+        journal = Journal(path)
+        journal.append({"op": "one"})
+        journal.append({"op": "two", "value": [1, 2]})
+        assert path.read_text(encoding="utf-8") == '{"op":"one"}\n{"op":"two","value":[1,2]}\n'  # visible without a sync
+        journal.close()
+        assert journal.closed
+        assert list(read_journal(path)) == [{"op": "one"}, {"op": "two", "value": [1, 2]}]
+
+    def test_append_existing(self, temp):
+        path = temp / "journal.jsonl"
+        path.write_text('{"op":"one"}\n', encoding="utf-8")
+        journal = Journal(path)
+        journal.append({"op": "two"})
+        journal.close()
+        assert list(read_journal(path)) == [{"op": "one"}, {"op": "two"}]
+
+    def test_append_closed(self, temp):
+        journal = Journal(temp / "journal.jsonl")
+        journal.close()
+        journal.append({"op": "one"})  # ignored, since the journal is closed
+        assert not list(read_journal(journal.path))
+
+    def test_read_incomplete(self, temp):
+        path = temp / "journal.jsonl"
+        path.write_text('{"op":"one"}\n{"op":"two"}\n{"op":"th', encoding="utf-8")
+        assert list(read_journal(path)) == [{"op": "one"}, {"op": "two"}]
+
+    @patch("hcoopmeetbotlogic.journal.time.monotonic")
+    @patch("hcoopmeetbotlogic.journal.os.fsync")
+    def test_periodic_sync(self, fsync, monotonic, temp):
+        monotonic.return_value = 100.0
+        journal = Journal(temp / "journal.jsonl", sync_interval=2.0)
+        journal.append({"op": "one"})
+        monotonic.return_value = 101.9
+        journal.append({"op": "two"})
+        fsync.assert_not_called()
+        monotonic.return_value = 102.0
+        journal.append({"op": "three"})
+        fsync.assert_called_once()
+        monotonic.return_value = 103.0
+        journal.append({"op": "four"})
+        fsync.assert_called_once()
+        journal.sync()
+        assert fsync.call_count == 2
+        journal.sync()  # nothing new to sync
+        assert fsync.call_count == 2
+        journal.close()
+        assert fsync.call_count == 2
+
+    @patch("hcoopmeetbotlogic.journal.os.fsync")
+    def test_sync_after_burst(self, fsync, temp):
+        synced = threading.Event()
+        fsync.side_effect = lambda _: synced.set()
+        journal = Journal(temp / "journal.jsonl", sync_interval=0.05)
+        try:
+            journal.append({"op": "one"})  # too soon after the journal was opened to sync right away
+            fsync.assert_not_called()
+            assert synced.wait(timeout=5)  # but it's synced once the interval elapses, with nothing else appended
+            fsync.assert_called_once()
+        finally:
+            journal.close()
+        fsync.assert_called_once()  # nothing left to sync
+
+    @patch("hcoopmeetbotlogic.journal.os.fsync")
+    def test_remove_cancels_sync(self, fsync, temp):
+        journal = Journal(temp / "journal.jsonl", sync_interval=0.05)
+        journal.append({"op": "one"})
+        journal.remove()
+        assert journal._timer is None
+        fsync.assert_not_called()
+
+    @patch("hcoopmeetbotlogic.journal.os.fsync")
+    def test_close(self, fsync, temp):
+        journal = Journal(temp / "journal.jsonl")
+        journal.append({"op": "one"})
+        journal.close()
+        fsync.assert_called_once()
+        journal.close()  # closing again is harmless
+        fsync.assert_called_once()
+        assert journal.path.exists()
+
+    def test_remove(self, temp):
+        journal = Journal(temp / "journal.jsonl")
+        journal.append({"op": "one"})
+        journal.remove()
+        assert journal.closed
+        assert not journal.path.exists()
+        journal.remove()  # removing again is harmless
+
+    def test_append_error(self, temp):
+        logger = MagicMock()
+        journal = Journal(temp / "journal.jsonl", logger=logger)
+        journal._file.close()
+        journal._file = MagicMock(closed=False)
+        journal._file.write.side_effect = OSError("disk full")
+        journal.append({"op": "one"})  # the error is logged rather than raised
+        logger.exception.assert_called_once()
+        journal._file.close.assert_called_once()
+
+
+class TestReplay:
+    def test_sample_meeting(self, temp):
+        journal = Journal(temp / "journal.jsonl")
+        meeting = sample_meeting(journal=journal)
+        _assert_identical(_replay(journal), meeting)
+
+    @patch("hcoopmeetbotlogic.command.config")
+    def test_commands(self, config, temp):
+        config.return_value = Config(conf_file=None)
+        journal = Journal(temp / "journal.jsonl")
+        meeting = Meeting(founder="pronovic", channel="#hcoop", network="network")
+        meeting.attach_journal(journal)
+        context = MagicMock()
+        context.get_topic.return_value = "original topic"
+        for seconds, (nick, payload) in enumerate(SCRIPT):
+            message = Message(id=f"id-{seconds}", timestamp=time(seconds), nick=nick, channel="#c", network="n", payload=payload)
+            dispatch(meeting, context, meeting.track_message(message))
+        assert any(event.event_type == EventType.UNDO for event in meeting.events)
+        assert any(event.operand == VotingAction.OPPOSED for event in meeting.events)
+        _assert_identical(_replay(journal), meeting)
+
+    @patch("hcoopmeetbotlogic.command.config")
+    def test_columnar(self, config, temp):
+        config.return_value = Config(conf_file=None)
+        journal = Journal(temp / "journal.jsonl")
+        meeting = Meeting(founder="pronovic", channel="#hcoop", network="network", messages=MessageStore())
+        meeting.attach_journal(journal)
+        context = MagicMock()
+        context.get_topic.return_value = "original topic"
+        for seconds, (nick, payload) in enumerate(SCRIPT):
+            message = Message(id=f"id-{seconds}", timestamp=time(seconds), nick=nick, channel="#c", network="n", payload=payload)
+            dispatch(meeting, context, meeting.track_message(message))
+        _assert_identical(_replay(journal), meeting)
+
+    def test_partial(self, temp):
+        journal = Journal(temp / "journal.jsonl")
+        meeting = sample_meeting(journal=journal)
+        journal.sync()
+        replayed = Meeting.replay(read_journal(journal.path))  # replay while the meeting is still being journaled
+        assert replayed == meeting
+        meeting.track_nick("new", messages=2)
+        assert replayed != meeting
+        _assert_identical(_replay(journal), meeting)
+
+    def test_records(self):
+        journal = MagicMock()
+        meeting = Meeting(founder="nick", channel="channel", network="network")
+        meeting.attach_journal(journal)
+        tracked = meeting.track_message(Message("id", time(0), "nick", "channel", "network", "\x01ACTION waves\x01"))
+        meeting.track_event(EventType.VOTE, tracked, operand=VotingAction.IN_FAVOR)
+        meeting.track_event(EventType.INFO, tracked, operand="info")
+        meeting.pop_event()
+        meeting.pop_event()  # the first event can't be popped, so nothing is recorded
+        meeting.add_chair("other", primary=True)  # the nick and primary chair assignment are not recorded separately
+        meeting.name = "name"
+        records = [call.args[0] for call in journal.append.call_args_list]
+        assert records[0]["op"] == "meeting"
+        assert records[1:] == [
+            {"op": "message", "id": "id", "sender": "nick", "payload": "waves", "action": True, "timestamp": time(0).isoformat()},
+            {"op": "event", "type": "VOTE", "operand": "+1", "message": 0, "voting": True},
+            {"op": "event", "type": "INFO", "operand": "info", "message": 0},
+            {"op": "pop"},
+            {"op": "add_chair", "nick": "other", "primary": True},
+            {"op": "set", "field": "name", "value": "name"},
+        ]
+        assert meeting.journal is journal  # still attached after a journaled operation completes
+        assert Meeting.replay(records) == meeting
+
+    def test_unknown_message(self):
+        journal = MagicMock()
+        meeting = Meeting(founder="nick", channel="channel", network="network")
+        meeting.attach_journal(journal)
+        message = TrackedMessage(id="id", sender="nick", payload="payload", action=False, timestamp=time(0))
+        meeting.track_event(EventType.INFO, message)  # a message that isn't tracked is stored inline
+        records = [json.loads(json.dumps(call.args[0])) for call in journal.append.call_args_list]
+        assert records[-1]["message"] == {
+            "id": "id",
+            "sender": "nick",
+            "payload": "payload",
+            "action": False,
+            "timestamp": time(0).isoformat(),
+        }
+        replayed = Meeting.replay(records)
+        assert replayed == meeting
+        assert replayed.events[0].message == message
+
+    def test_detach(self):
+        journal = MagicMock()
+        meeting = Meeting(founder="nick", channel="channel", network="network")
+        meeting.attach_journal(journal)
+        assert meeting.detach_journal() is journal
+        assert meeting.detach_journal() is None
+        journal.reset_mock()
+        meeting.track_nick("nick")
+        meeting.active = True
+        journal.append.assert_not_called()
+
+    def test_not_serialized(self):
+        meeting = sample_meeting(journal=MagicMock())
+        assert "journal" not in json.loads(meeting.to_json())
+        assert meeting.snapshot().journal is None
+        assert Meeting.from_json(meeting.to_json()) == meeting
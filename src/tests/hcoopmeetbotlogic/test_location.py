@@ -81,6 +81,14 @@ def test_derive_locations_with_prefix_override(self):
         assert locations.formatted_minutes.path == "/data/meetings/hcoop/prefix.html"
         assert locations.formatted_minutes.url == "https://whatever/prefix.html"
 
+    def test_derive_locations_with_prefix_no_meeting(self):
+        config = Config(conf_file=None, log_dir="/data/meetings/hcoop", url_prefix="https://whatever", pattern="constant")
+        locations = derive_locations(config, None, prefix="prefix", output_dir="/tmp")
+        assert locations.raw_log.path == "/tmp/prefix.log.json"
+        assert locations.formatted_minutes.url == "https://whatever/prefix.html"
+        with pytest.raises(ValueError, match="meeting is required"):
+            derive_locations(config, None)
+
     def test_derive_locations_with_output_override(self):
         config = Config(
             conf_file=None,
@@ -1,13 +1,90 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
 
-from datetime import UTC, datetime
+import json
+import sys
+import threading
+import tracemalloc
+from collections.abc import Callable, MutableSequence
+from copy import copy
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
 from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
 
+import pytest
+from attrs import evolve, frozen
 from pytz import utc
 
 from hcoopmeetbotlogic.interface import Message
-from hcoopmeetbotlogic.meeting import EventType, Meeting, TrackedEvent, TrackedMessage
-from tests.hcoopmeetbotlogic.testdata import sample_meeting
+from hcoopmeetbotlogic.journal import Journal, read_journal
+from hcoopmeetbotlogic.meeting import (
+    EventType,
+    Meeting,
+    MessageStore,
+    TrackedEvent,
+    TrackedMessage,
+    VotingAction,
+    sequence_message_id,
+    uuid_message_id,
+)
+from hcoopmeetbotlogic.serializer import unstructure_fn
+from tests.hcoopmeetbotlogic.testdata import contents, sample_meeting, time
+
+ORIGINAL_LAYOUT = str(Path(__file__).parent / "fixtures/test_meeting/v1.json")  # sample_meeting() in the original layout
+
+MEMORY_MESSAGES = 5000  # number of messages to create when measuring memory
+
+
+@frozen
+class OriginalMessage:
+    """The layout of a tracked message before it was made compact, for comparison."""
+
+    id: str
+    sender: str
+    payload: str
+    action: bool
+    timestamp: datetime
+
+
+def _bytes_per_message(factory: Callable[[str, str, str, bool, datetime], object]) -> float:
+    """Measure the memory retained per message, with a new nick string for each message like we get from IRC."""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        messages = [
+            factory(f"{i:032x}", f"nick{i % 25}", f"payload {i}", False, time(0) + timedelta(microseconds=i))
+            for i in range(MEMORY_MESSAGES)
+        ]
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    assert len(messages) == MEMORY_MESSAGES
+    return retained / MEMORY_MESSAGES
+
+
+def _bytes_per_stored_message(store: MutableSequence[TrackedMessage]) -> float:
+    """Measure the memory retained per message when messages are added to a list or a message store."""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for i in range(MEMORY_MESSAGES):
+            store.append(TrackedMessage(f"{i:032x}", f"nick{i % 25}", f"payload {i}", False, time(0) + timedelta(microseconds=i)))
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    assert len(store) == MEMORY_MESSAGES
+    return retained / MEMORY_MESSAGES
+
+
+def _messages() -> list[TrackedMessage]:
+    """Generate a list of messages covering all of the values a message store needs to handle."""
+    return [
+        TrackedMessage("id-0", "pronovic", "hello", False, time(0)),
+        TrackedMessage("id-1", "layline", "waves", True, time(1)),
+        TrackedMessage("id-2", "pronovic", "again", False, datetime(2021, 4, 13, 2, 6, 12)),  # noqa: DTZ001
+        TrackedMessage("id-3", "bhkl", "\u2603", False, datetime.fromisoformat("2021-04-13T02:06:12.5-05:00")),
+        TrackedMessage("id-4", "layline", "", True, time(0) + timedelta(microseconds=1)),
+    ]
 
 
 class TestTrackedMessage:
@@ -28,6 +105,35 @@ def test_display_name(self, formatdate):
         assert message.display_name() == "whatever@11111"
         formatdate.assert_called_once_with(timestamp)
 
+    def test_compact(self):
+        timestamp = datetime(2021, 4, 13, 2, 6, 12, 123456, tzinfo=UTC)
+        nick = "SENDER".lower()  # a new string, like a nick parsed from an IRC message
+        message = TrackedMessage("whatever", nick, "payload", False, timestamp)
+        assert message.sender is sys.intern(nick)  # interned, so shared with every other use of the nick
+        assert message.timestamp == timestamp
+        assert message.timestamp.isoformat() == timestamp.isoformat()
+        assert message == TrackedMessage("whatever", "sender", "payload", False, timestamp.astimezone(utc))
+        assert not hasattr(message, "__dict__")
+        assert evolve(message, payload="other").timestamp == timestamp  # evolve() copies the compact value
+
+    @pytest.mark.parametrize("timestamp", [datetime(2021, 4, 13, 2, 6, 12), datetime.fromisoformat("2021-04-13T02:06:12-05:00")])  # noqa: DTZ001
+    def test_compact_other_zone(self, timestamp):
+        message = TrackedMessage("whatever", "sender", "payload", False, timestamp)
+        assert message.timestamp is timestamp  # anything other than UTC is kept as-is, so it round-trips exactly
+
+    def test_compact_zero_offset(self):
+        timestamp = datetime(2021, 1, 13, 2, 6, 12, tzinfo=ZoneInfo("Europe/London"))  # no offset in the winter
+        message = TrackedMessage("whatever", "sender", "payload", False, timestamp)
+        assert message.timestamp == timestamp
+        assert message.timestamp.isoformat() == timestamp.isoformat()
+        assert message.timestamp.tzinfo is utc  # compacted like UTC, so the original zone isn't restored
+
+    def test_memory(self):
+        original = _bytes_per_message(OriginalMessage)
+        compact = _bytes_per_message(TrackedMessage)
+        print(f"Bytes per tracked message: {original:.1f} before, {compact:.1f} after")  # noqa: T201
+        assert compact < original
+
 
 class TestTrackedEvent:
     def test_constructor(self):
@@ -51,6 +157,98 @@ def test_display_name(self, formatdate):
         formatdate.assert_called_once_with(timestamp)
 
 
+class TestMessageStore:
+    def test_constructor(self):
+        messages = _messages()
+        store = MessageStore(messages)
+        assert len(store) == len(messages)
+        assert list(store) == messages
+        assert store == messages
+        assert messages == store
+        assert store == MessageStore(messages)
+        assert store != messages[1:]
+        assert store != "whatever"
+        assert not MessageStore()
+        assert repr(store) == f"MessageStore({messages!r})"
+
+    def test_getitem(self):
+        messages = _messages()
+        store = MessageStore(messages)
+        for index in range(-len(messages), len(messages)):
+            assert store[index] == messages[index]
+        assert store[1:3] == messages[1:3]
+        assert store[::2] == messages[::2]
+        assert store[-2:] == messages[-2:]
+        assert store[10:] == []
+        with pytest.raises(IndexError):
+            store[len(messages)]
+
+    def test_views(self):
+        messages = _messages()
+        store = MessageStore(messages)
+        assert store[0] is not messages[0]  # a view that's equal to, but not identical to, the original
+        assert store[0].sender is messages[0].sender
+        assert store[2].timestamp is messages[2].timestamp  # a timestamp that's not in UTC is kept as-is
+        assert store[3].timestamp is messages[3].timestamp
+        assert [message.timestamp.isoformat() for message in store] == [message.timestamp.isoformat() for message in messages]
+
+    def test_mutations(self):
+        messages = _messages()
+        store = MessageStore(messages)
+        extra = TrackedMessage("id-5", "keverets", "new", False, time(5))
+        for change in (
+            lambda target: target.insert(1, extra),
+            lambda target: target.remove(extra),
+            lambda target: target.__setitem__(0, extra),
+            lambda target: target.__setitem__(slice(1, 3), [extra]),
+            lambda target: target.__delitem__(-1),
+            lambda target: target.__delitem__(slice(0, 2)),
+            lambda target: target.pop(),
+            lambda target: target.reverse(),
+            lambda target: target.append(extra),
+            lambda target: target.extend([extra, extra]),
+        ):
+            change(messages)
+            change(store)
+            assert store == messages
+        store.clear()
+        assert store == []
+
+    def test_copy(self):
+        store = MessageStore(_messages())
+        copied = copy(store)
+        assert isinstance(copied, MessageStore)
+        assert copied == store
+        copied.append(TrackedMessage("id-5", "keverets", "new", False, time(5)))
+        del copied[0]
+        assert store == _messages()
+
+    def test_ids(self):
+        assert list(MessageStore(_messages()).ids()) == [message.id for message in _messages()]
+
+    def test_unstructure(self):
+        unstructure = unstructure_fn(TrackedMessage)
+        assert MessageStore(_messages()).unstructure() == [unstructure(message) for message in _messages()]
+
+    def test_meeting(self):
+        meeting = sample_meeting()
+        columnar = evolve(meeting, messages=MessageStore(meeting.messages), nicks=dict(meeting.nicks))
+        assert columnar == meeting
+        assert columnar.to_json() == meeting.to_json()
+        assert Meeting.from_json(columnar.to_json()) == meeting
+        snapshot = columnar.snapshot()
+        assert isinstance(snapshot.messages, MessageStore)
+        columnar.track_message(Message(id="new", timestamp=time(600), nick="nick", channel="c", network="n", payload="new"))
+        assert snapshot == meeting
+        assert columnar.messages[-1].id == "new"
+
+    def test_memory(self):
+        listed = _bytes_per_stored_message([])
+        columnar = _bytes_per_stored_message(MessageStore())
+        print(f"Bytes per stored message: {listed:.1f} in a list, {columnar:.1f} in a message store")  # noqa: T201
+        assert columnar < listed
+
+
 class TestMeeting:
     def test_constructor(self):
         before = datetime.now(utc)
@@ -78,6 +276,65 @@ def test_json_roundtrip(self):
         serialized = left.to_json()
         right = Meeting.from_json(serialized)
         assert left == right
+        for event in right.events:  # events refer to the same objects that are in the messages list
+            assert any(event.message is message for message in right.messages)
+
+    def test_json_compact(self):
+        meeting = sample_meeting()
+        serialized = meeting.to_json()
+        parsed = json.loads(serialized)
+        assert "\n" not in serialized
+        assert parsed["version"] == 2
+        assert parsed["events"][0] == {"event_type": "START_MEETING", "message": "id-0", "operand": None}
+        assert len(serialized) < len(contents(ORIGINAL_LAYOUT)) / 2
+
+    def test_json_original_layout(self):
+        expected = sample_meeting()
+        meeting = Meeting.from_json(contents(ORIGINAL_LAYOUT))
+        assert meeting.id == "0123456789abcdef0123456789abcdef"
+        assert evolve(meeting, id=expected.id) == expected
+        assert meeting.events[0].message == meeting.messages[0]
+        assert meeting.events[0].message is not meeting.messages[0]  # the original layout embeds a copy of the message
+
+    def test_json_unsupported_version(self):
+        with pytest.raises(ValueError, match="Unsupported raw log version: 3"):
+            Meeting.from_json('{"version": 3}')
+
+    def test_json_untracked_message(self):
+        meeting = Meeting("nick", "channel", "network")
+        tracked = meeting.track_message(Message("id", time(0), "nick", "channel", "network", "payload"))
+        untracked = TrackedMessage(id="other", sender="nick", payload="untracked", action=False, timestamp=time(1))
+        duplicate = TrackedMessage(id="id", sender="nick", payload="duplicate", action=False, timestamp=time(2))
+        meeting.track_event(EventType.INFO, tracked, operand="tracked")
+        meeting.track_event(EventType.INFO, untracked, operand="untracked")
+        meeting.track_event(EventType.INFO, duplicate, operand="duplicate")
+        meeting.events.append(TrackedEvent(EventType.VOTE, tracked, VotingAction.IN_FAVOR, id="custom", timestamp=time(3)))
+        parsed = json.loads(meeting.to_json())
+        assert [event["message"] for event in parsed["events"]][:1] == ["id"]
+        assert parsed["events"][1]["message"]["payload"] == "untracked"  # not in the messages list, so embedded
+        assert parsed["events"][2]["message"]["payload"] == "duplicate"  # id is ambiguous, so embedded
+        assert parsed["events"][3]["id"] == "custom"
+        copy = Meeting.from_json(meeting.to_json())
+        assert copy == meeting
+        assert copy.events[0].message is copy.messages[0]
+        assert copy.events[3].message is copy.messages[0]
+
+    def test_snapshot(self):
+        meeting = sample_meeting()
+        snapshot = meeting.snapshot()
+        assert snapshot == meeting
+        assert snapshot is not meeting
+        assert snapshot.messages[0] is meeting.messages[0]  # immutable objects are shared
+        meeting.track_nick("new", messages=1)
+        meeting.track_attendee("new", "alias")
+        meeting.add_chair("new", primary=False)
+        meeting.track_message(Message(id="x", timestamp=datetime.now(UTC), nick="new", channel="c", network="n", payload="p"))
+        meeting.track_event(EventType.INFO, meeting.messages[-1], operand="p")
+        assert "new" not in snapshot.nicks
+        assert "new" not in snapshot.aliases
+        assert "new" not in snapshot.chairs
+        assert len(snapshot.messages) == len(meeting.messages) - 1
+        assert len(snapshot.events) == len(meeting.events) - 1
 
     def test_meeting_key(self):
         assert Meeting.meeting_key("channel", "network") == "channel/network"
@@ -204,6 +461,39 @@ def test_track_message_action(self):
         assert tracked.payload == "waves goodbye"
         assert tracked.action is True
 
+    def test_track_message_sequence_id(self):
+        meeting = Meeting("n", "c", "n")
+        assert meeting.message_id is sequence_message_id
+        ids = [meeting.track_message(Message(None, time(i), "nick", "c", "n", f"message {i}")).id for i in range(1100)]
+        assert ids[:3] == ["0", "1", "2"]
+        assert ids[31:33] == ["v", "10"]
+        assert ids[1023:1025] == ["vv", "100"]
+        assert len(set(ids)) == len(ids)
+        provided = meeting.track_message(Message("provided", time(0), "nick", "c", "n", "hello"))
+        assert provided.id == "provided"  # an identifier provided with the message is always kept
+        assert meeting.track_message(Message(None, time(0), "nick", "c", "n", "again")).id == "12d"  # 1101 in base32
+
+    def test_track_message_uuid_id(self):
+        meeting = Meeting("n", "c", "n")
+        meeting.message_id = uuid_message_id
+        first = meeting.track_message(Message(None, time(0), "nick", "c", "n", "hello"))
+        second = meeting.track_message(Message(None, time(0), "nick", "c", "n", "hello"))
+        assert len(first.id) == 32 and len(second.id) == 32
+        assert first.id != second.id
+
+    def test_sequence_id_replay(self):
+        meeting = Meeting("n", "c", "n")
+        journal = MagicMock()
+        meeting.attach_journal(journal)
+        for i in range(40):
+            meeting.track_message(Message(None, time(i), "nick", "c", "n", f"message {i}"))
+        replayed = Meeting.replay(call.args[0] for call in journal.append.call_args_list)
+        assert replayed == meeting
+        assert [message.id for message in replayed.messages] == [message.id for message in meeting.messages]
+        tracked = replayed.track_message(Message(None, time(0), "nick", "c", "n", "after replay"))
+        assert tracked.id == "18"  # numbering continues where it left off
+        assert tracked.id not in [message.id for message in meeting.messages]
+
     def test_track_event_no_attributes(self):
         meeting = Meeting("n", "c", "n")
         timestamp = MagicMock()
@@ -240,6 +530,86 @@ def test_pop_event(self):
         assert start in meeting.events
         assert meeting.pop_event() is None
 
+    def test_events_of(self):
+        meeting = Meeting("n", "c", "n")
+        message = MagicMock(timestamp=time(0))
+        start = meeting.track_event(EventType.START_MEETING, message)
+        motion = meeting.track_event(EventType.MOTION, message, operand="motion")
+        one = meeting.track_event(EventType.VOTE, message, operand=VotingAction.IN_FAVOR)
+        info = meeting.track_event(EventType.INFO, message, operand="+1")
+        two = meeting.track_event(EventType.VOTE, message, operand=VotingAction.OPPOSED)
+        assert meeting.events_of(EventType.START_MEETING) == [start]
+        assert meeting.events_of(EventType.VOTE) == [one, two]
+        assert meeting.events_of(EventType.VOTE, start=3) == [two]
+        assert meeting.events_of(EventType.VOTE, start=5) == []
+        assert meeting.events_of(EventType.INFO) == [info]
+        assert meeting.events_of(EventType.ACTION) == []
+        assert meeting.pop_event() is two
+        assert meeting.events_of(EventType.VOTE) == [one]
+        meeting.pop_event()
+        meeting.pop_event()
+        three = meeting.track_event(EventType.VOTE, message, operand=VotingAction.IN_FAVOR)
+        assert meeting.events_of(EventType.VOTE) == [three]
+        assert meeting.events_of(EventType.MOTION) == [motion]
+        assert meeting.events_of(EventType.INFO) == []
+
+    def test_events_of_direct_changes(self):
+        meeting = Meeting("n", "c", "n")
+        message = MagicMock(timestamp=time(0))
+        meeting.track_event(EventType.START_MEETING, message)
+        action = meeting.track_event(EventType.ACTION, message, operand="one")
+        assert meeting.events_of(EventType.ACTION) == [action]
+        appended = TrackedEvent(EventType.ACTION, message, "two")
+        meeting.events.append(appended)  # like when a meeting is deserialized, appended events are indexed when needed
+        assert meeting.events_of(EventType.ACTION) == [action, appended]
+        replaced = TrackedEvent(EventType.INFO, message, "three")
+        meeting.events[-1] = replaced  # any other change causes the index to be rebuilt
+        assert meeting.events_of(EventType.ACTION) == [action]
+        assert meeting.events_of(EventType.INFO) == [replaced]
+        meeting.events = meeting.events[:1]
+        assert meeting.events_of(EventType.ACTION) == []
+        snapshot = meeting.snapshot()
+        meeting.track_event(EventType.ACTION, message, operand="four")
+        assert snapshot.events_of(EventType.ACTION) == []
+        assert Meeting.from_json(sample_meeting().to_json()).events_of(EventType.TOPIC) == sample_meeting().events_of(
+            EventType.TOPIC
+        )
+
+    def test_vote_tally(self):
+        meeting = Meeting("n", "c", "n")
+        meeting.track_event(EventType.START_MEETING, MagicMock(timestamp=time(0), sender="n"))
+        meeting.track_event(EventType.VOTE, MagicMock(timestamp=time(0), sender="early"), operand=VotingAction.IN_FAVOR)
+        meeting.track_event(EventType.MOTION, MagicMock(timestamp=time(0), sender="n"), operand="motion")
+        meeting.motion_index = 2
+        tally = meeting.vote_tally()
+        assert tally.motion_index == 2
+        assert tally.count(VotingAction.IN_FAVOR) == 0  # votes before the motion don't count
+        for nick, action in [("one", VotingAction.IN_FAVOR), ("two", VotingAction.OPPOSED), ("one", VotingAction.OPPOSED)]:
+            meeting.track_event(EventType.VOTE, MagicMock(timestamp=time(0), sender=nick), operand=action)
+        assert meeting.vote_tally() is tally  # maintained as votes are tracked
+        assert tally.count(VotingAction.IN_FAVOR) == 0  # only the most recent vote by each nick counts
+        assert tally.count(VotingAction.OPPOSED) == 2
+        assert tally.nicks(VotingAction.OPPOSED) == ["one", "two"]
+        meeting.pop_event()  # like #undo, which restores the earlier vote
+        assert tally.count(VotingAction.IN_FAVOR) == 1
+        assert tally.nicks(VotingAction.IN_FAVOR) == ["one"]
+        meeting.pop_event()
+        assert tally.votes == {"one": [VotingAction.IN_FAVOR]}
+        assert meeting.vote_tally() is tally
+        meeting.motion_index = None
+        assert meeting.vote_tally().count(VotingAction.IN_FAVOR) == 0
+
+    def test_vote_tally_rebuilt(self):
+        meeting = sample_meeting()
+        meeting.motion_index = next(i for i, event in enumerate(meeting.events) if event.event_type == EventType.MOTION)
+        recovered = Meeting.from_json(meeting.to_json())  # like a recovered meeting, which has no tally yet
+        tally = recovered.vote_tally()
+        assert tally.nicks(VotingAction.IN_FAVOR) == ["pronovic", "unknown_lamer"]
+        assert tally.nicks(VotingAction.OPPOSED) == ["layline"]
+        recovered.events.append(TrackedEvent(EventType.VOTE, recovered.messages[0], VotingAction.OPPOSED))
+        assert recovered.vote_tally() is not tally  # the votes changed without the tally, so it's rebuilt
+        assert recovered.vote_tally().nicks(VotingAction.OPPOSED) == ["pronovic", "layline"]  # in the order they first voted
+
     def test_track_attendee(self):
         meeting = Meeting("n", "c", "n")
 
@@ -258,3 +628,84 @@ def test_track_attendee(self):
         meeting.track_attendee("five", "five")
         assert meeting.nicks["five"] == 0
         assert meeting.aliases["five"] is None  # an equivalent alias is not tracked
+
+
+def _unidentified(count: int) -> list[Message]:
+    return [Message(None, time(0), "nick", "c", "n", "hello") for _ in range(count)]
+
+
+class TestMeetingConcurrency:
+    THREADS = 8
+    MESSAGES = 250
+
+    @pytest.fixture(autouse=True)
+    def switch_often(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # switch threads as often as possible, so races are likely to show up
+        yield
+        sys.setswitchinterval(interval)
+
+    @staticmethod
+    def _hammer(*targets: Callable[[], None]) -> None:
+        """Run each target on its own thread, all starting at once, and fail if any of them failed."""
+        barrier, failures = threading.Barrier(len(targets)), []
+
+        def run(target: Callable[[], None]) -> None:
+            barrier.wait()
+            try:
+                target()
+            except Exception as e:  # noqa: BLE001
+                failures.append(e)
+
+        threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        assert not failures
+
+    def _chatter(self, meeting: Meeting, nick: str) -> Callable[[], None]:
+        def chatter() -> None:
+            for i in range(self.MESSAGES):
+                tracked = meeting.track_message(Message(None, time(i), nick, "c", "n", f"{nick} {i}"))
+                if i % 10 == 0:
+                    meeting.track_event(EventType.INFO, tracked, f"{nick} {i}")
+
+        return chatter
+
+    def test_track_message(self, tmp_path):
+        meeting = Meeting("n", "c", "n")
+        meeting.attach_journal(Journal(tmp_path / "journal.jsonl"))
+        nicks = [f"nick{i}" for i in range(self.THREADS)]
+        self._hammer(*(self._chatter(meeting, nick) for nick in nicks))
+        total = self.THREADS * self.MESSAGES
+        assert len(meeting.messages) == total
+        expected = Meeting("n", "c", "n")
+        assert [message.id for message in meeting.messages] == [
+            expected.track_message(message).id for message in _unidentified(total)
+        ]
+        for nick in nicks:
+            assert [m.payload for m in meeting.messages if m.sender == nick] == [f"{nick} {i}" for i in range(self.MESSAGES)]
+            assert meeting.nicks[nick] == self.MESSAGES
+        assert len(meeting.events) == total // 10
+        assert all(event.message.payload == event.operand for event in meeting.events)
+        meeting.journal.close()
+        assert Meeting.replay(read_journal(meeting.journal.path)) == meeting  # the journal saw changes in the same order
+
+    def test_snapshot(self):
+        meeting = Meeting("n", "c", "n")
+        meeting.track_event(EventType.START_MEETING, meeting.track_message(Message(None, time(0), "n", "c", "n", "#startmeeting")))
+        snapshots = []
+
+        def snapshot() -> None:
+            for _ in range(50):
+                snapshots.append(meeting.snapshot())
+                meeting.pop_event()
+                meeting.vote_tally()
+
+        self._hammer(snapshot, *(self._chatter(meeting, f"nick{i}") for i in range(self.THREADS)))
+        for copied in snapshots:
+            messages = {id(message) for message in copied.messages}
+            assert all(id(event.message) in messages for event in copied.events)  # never an event without its message
+            assert sum(copied.nicks.values()) == len(copied.messages)
+            assert Meeting.from_json(copied.to_json()) == copied
@@ -0,0 +1,140 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from hcoopmeetbotlogic.messagequeue import MessageQueue, QueueStats
+
+
+@pytest.fixture
+def logger():
+    return MagicMock()
+
+
+class TestMessageQueue:
+    def test_invalid_size(self, logger):
+        with pytest.raises(ValueError):
+            MessageQueue(logger, 0)
+
+    def test_ordering(self, logger):
+        results = []
+        queue = MessageQueue(logger, 100)
+        try:
+            for value in range(50):
+                assert queue.put("one" if value % 2 else "two", lambda value=value: results.append(value))
+            assert queue.flush(timeout=5)
+            assert results == list(range(50))  # in the order submitted, even across keys
+            assert queue.pending == 0
+        finally:
+            queue.shutdown()
+
+    def test_stats(self, logger):
+        queue = MessageQueue(logger, 10)
+        try:
+            assert queue.stats() == QueueStats(0, 0, 0, 0, 0, 0.0, 0.0)
+            for _ in range(5):
+                queue.put("key", lambda: None)
+            assert queue.flush(timeout=5)
+            stats = queue.stats()
+            assert stats.depth == 0
+            assert stats.enqueued == 5
+            assert stats.processed == 5
+            assert stats.blocked == 0
+            assert stats.dropped == 0
+            assert 0.0 < stats.average_latency <= stats.max_latency
+        finally:
+            queue.shutdown()
+
+    def test_blocked(self, logger):
+        started, release = threading.Event(), threading.Event()
+        results = []
+        queue = MessageQueue(logger, 1, timeout=5)
+        try:
+            queue.put("key", lambda: started.set() or release.wait())  # occupies the worker
+            assert started.wait(timeout=5)
+            queue.put("key", lambda: results.append("first"))  # fills the queue for this key
+            assert queue.put("other", lambda: results.append("other"))  # other keys have their own limit
+            threading.Timer(0.1, release.set).start()
+            assert queue.put("key", lambda: results.append("second"))  # waits until the worker makes space
+            assert queue.flush(timeout=5)
+            assert results == ["first", "other", "second"]
+            assert queue.stats().blocked == 1
+            assert queue.stats().dropped == 0
+        finally:
+            release.set()
+            queue.shutdown()
+
+    def test_dropped(self, logger):
+        started, release = threading.Event(), threading.Event()
+        results = []
+        queue = MessageQueue(logger, 1, timeout=0.05)
+        try:
+            queue.put("key", lambda: started.set() or release.wait())
+            assert started.wait(timeout=5)
+            queue.put("key", lambda: results.append("first"))
+            assert not queue.put("key", lambda: results.append("dropped"))
+            logger.warning.assert_called_once()
+            release.set()
+            assert queue.flush(timeout=5)
+            assert results == ["first"]
+            stats = queue.stats()
+            assert stats.blocked == 1
+            assert stats.dropped == 1
+            assert stats.enqueued == 2
+        finally:
+            release.set()
+            queue.shutdown()
+
+    def test_worker_never_blocks(self, logger):
+        results = []
+        queue = MessageQueue(logger, 1, timeout=5)
+
+        def reply():
+            for value in range(3):  # like a command that sends several replies, each echoed back to the queue
+                queue.put("key", lambda value=value: results.append(value))
+
+        try:
+            queue.put("key", reply)
+            assert queue.flush(timeout=5)
+            assert results == [0, 1, 2]
+            assert queue.stats().blocked == 0
+        finally:
+            queue.shutdown()
+
+    def test_failure_is_logged(self, logger):
+        def fail():
+            raise RuntimeError("hello")
+
+        results = []
+        queue = MessageQueue(logger, 10)
+        try:
+            queue.put("key", fail)
+            queue.put("key", lambda: results.append("after"))  # the worker keeps going
+            assert queue.flush(timeout=5)
+            logger.exception.assert_called_once()
+            assert results == ["after"]
+            assert queue.stats().processed == 2
+        finally:
+            queue.shutdown()
+
+    def test_flush_timeout(self, logger):
+        release = threading.Event()
+        queue = MessageQueue(logger, 10)
+        try:
+            queue.put("key", release.wait)
+            assert queue.flush(timeout=0.05) is False
+            assert queue.pending == 1
+        finally:
+            release.set()
+            queue.shutdown()
+
+    def test_shutdown(self, logger):
+        results = []
+        queue = MessageQueue(logger, 10)
+        for value in range(5):
+            queue.put("key", lambda value=value: results.append(value))
+        assert queue.shutdown(timeout=5)
+        assert results == list(range(5))  # everything queued is handled before the worker stops
+        with pytest.raises(RuntimeError):
+            queue.put("key", lambda: None)
@@ -0,0 +1,93 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from hcoopmeetbotlogic.pipeline import WritePipeline
+
+
+@pytest.fixture
+def logger():
+    return MagicMock()
+
+
+class TestWritePipeline:
+    def test_invalid_workers(self, logger):
+        with pytest.raises(ValueError):
+            WritePipeline(logger, 0)
+
+    def test_submit_result(self, logger):
+        pipeline = WritePipeline(logger, 2)
+        try:
+            future = pipeline.submit("key", lambda: "result")
+            assert future.result(timeout=5) == "result"
+        finally:
+            pipeline.shutdown()
+
+    def test_ordering_within_key(self, logger):
+        results = []
+
+        def task(value):
+            time.sleep(0.001 * (10 - value))  # earlier tasks are slower, so they'd finish last if run concurrently
+            results.append(value)
+
+        pipeline = WritePipeline(logger, 4)
+        try:
+            for value in range(10):
+                pipeline.submit("key", lambda value=value: task(value))
+            assert pipeline.flush(timeout=5)
+            assert results == list(range(10))
+            assert pipeline.pending == 0
+        finally:
+            pipeline.shutdown()
+
+    def test_concurrency_across_keys(self, logger):
+        started = threading.Barrier(2, timeout=5)
+        pipeline = WritePipeline(logger, 2)
+        try:
+            # if different keys did not run concurrently, the barrier would time out and the futures would fail
+            one = pipeline.submit("one", started.wait)
+            two = pipeline.submit("two", started.wait)
+            one.result(timeout=5)
+            two.result(timeout=5)
+        finally:
+            pipeline.shutdown()
+
+    def test_failure_is_logged(self, logger):
+        def fail():
+            raise RuntimeError("hello")
+
+        pipeline = WritePipeline(logger, 1)
+        try:
+            failed = pipeline.submit("key", fail)
+            succeeded = pipeline.submit("key", lambda: "ok")  # a failure does not block later tasks
+            with pytest.raises(RuntimeError, match="hello"):
+                failed.result(timeout=5)
+            assert succeeded.result(timeout=5) == "ok"
+            logger.exception.assert_called_once_with("Background task failed for %s", "key")
+        finally:
+            pipeline.shutdown()
+
+    def test_flush_timeout(self, logger):
+        release = threading.Event()
+        pipeline = WritePipeline(logger, 1)
+        try:
+            pipeline.submit("key", release.wait)
+            assert pipeline.flush(timeout=0.01) is False
+            assert pipeline.pending == 1
+        finally:
+            release.set()
+            pipeline.shutdown()
+
+    def test_shutdown_flushes_pending(self, logger):
+        results = []
+        pipeline = WritePipeline(logger, 1)
+        for value in range(5):
+            pipeline.submit("key", lambda value=value: results.append(value))
+        assert pipeline.shutdown() is True
+        assert results == list(range(5))
+        with pytest.raises(RuntimeError):
+            pipeline.submit("key", lambda: None)
+        assert pipeline.pending == 0
@@ -0,0 +1,135 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock
+
+import pytest
+from attrs import evolve
+
+from hcoopmeetbotlogic.config import Config, MessageIds, MessageStorage
+from hcoopmeetbotlogic.journal import Journal, journal_path, read_journal
+from hcoopmeetbotlogic.meeting import Meeting, MessageStore, sequence_message_id, uuid_message_id
+from hcoopmeetbotlogic.recovery import recover_meetings
+from tests.hcoopmeetbotlogic.testdata import message, sample_meeting, time
+
+
+@pytest.fixture
+def config():
+    with TemporaryDirectory() as temp:
+        yield Config(conf_file=None, log_dir=temp, journal_dir=str(Path(temp) / "journal"))
+
+
+def _journaled(config: Config, channel: str = "#hcoop", seconds: int = 0, *, active: bool = True) -> Meeting:
+    """Create a meeting with a journal, closing the journal as if the bot had stopped."""
+    meeting = Meeting(founder="nick", channel=channel, network="network", start_time=time(seconds))
+    journal = Journal(journal_path(config, meeting.id))
+    meeting.attach_journal(journal)
+    meeting.active = active
+    meeting.track_nick("other", messages=3)
+    meeting.detach_journal()
+    journal.close()
+    return meeting
+
+
+def _close(meetings: list[Meeting]) -> None:
+    for meeting in meetings:
+        if meeting.journal:
+            meeting.journal.close()
+
+
+class TestRecovery:
+    def test_disabled(self):
+        recovery = recover_meetings(Config(conf_file=None, journal_dir=""), MagicMock())
+        assert not recovery.recovered and not recovery.completed and not recovery.failed
+
+    def test_missing_dir(self, config):
+        recovery = recover_meetings(config, MagicMock())
+        assert not recovery.recovered and not recovery.completed and not recovery.failed
+        assert recovery.elapsed >= 0
+
+    def test_recover(self, config):
+        journal = Journal(journal_path(config, "sample"))
+        meeting = sample_meeting(journal=journal)
+        meeting.active = True
+        journal.close()
+        recovery = recover_meetings(config, MagicMock())
+        assert recovery.recovered == [meeting]
+        assert not recovery.completed and not recovery.failed
+        recovered = recovery.recovered[0]
+        assert recovered.journal.path == journal.path
+        recovered.track_nick("after-recovery")  # journaling continues in the same file
+        recovered.journal.close()
+        assert Meeting.replay(read_journal(journal.path)) == recovered
+
+    def test_recover_columnar(self, config):
+        journal = Journal(journal_path(config, "sample"))
+        meeting = sample_meeting(journal=journal)
+        meeting.active = True
+        journal.close()
+        recovery = recover_meetings(evolve(config, message_storage=MessageStorage.COLUMNAR), MagicMock())
+        recovered = recovery.recovered[0]
+        assert isinstance(recovered.messages, MessageStore)
+        assert recovered == meeting
+        recovered.track_message(message(99, "nick", "after recovery", 99))  # journaling continues in the same file
+        recovered.journal.close()
+        assert Meeting.replay(read_journal(journal.path)) == recovered
+        assert not any(record["op"] == "set" and record["field"] == "messages" for record in read_journal(journal.path))
+
+    def test_recover_ids(self, config):
+        journal = Journal(journal_path(config, "sample"))
+        meeting = sample_meeting(journal=journal)
+        meeting.active = True
+        journal.close()
+        recovery = recover_meetings(config, MagicMock())
+        assert recovery.recovered[0].message_id is sequence_message_id
+        recovery.recovered[0].journal.close()
+        recovery = recover_meetings(evolve(config, message_ids=MessageIds.UUID), MagicMock())
+        assert recovery.recovered[0].message_id is uuid_message_id
+        recovery.recovered[0].journal.close()
+
+    def test_recover_many(self, config):
+        meetings = [_journaled(config, f"#channel{i}") for i in range(25)]
+        recovery = recover_meetings(config, MagicMock())
+        _close(recovery.recovered)
+        assert sorted(recovery.recovered, key=lambda m: m.channel) == sorted(meetings, key=lambda m: m.channel)
+        assert not recovery.failed
+
+    def test_skip(self, config):
+        skipped = _journaled(config, "#one")
+        recovered = _journaled(config, "#two")
+        recovery = recover_meetings(config, MagicMock(), skip={skipped.id})
+        _close(recovery.recovered)
+        assert recovery.recovered == [recovered]
+
+    def test_completed(self, config):
+        meeting = _journaled(config, active=False)
+        recovery = recover_meetings(config, MagicMock())
+        _close(recovery.completed)
+        assert not recovery.recovered
+        assert recovery.completed == [meeting]
+        assert recovery.completed[0].journal.path == journal_path(config, meeting.id)
+
+    def test_failed(self, config):
+        meeting = _journaled(config)
+        Path(config.journal_dir, "empty.jsonl").touch()
+        Path(config.journal_dir, "corrupt.jsonl").write_text("{bogus}\n", encoding="utf-8")
+        logger = MagicMock()
+        recovery = recover_meetings(config, logger)
+        _close(recovery.recovered)
+        assert recovery.recovered == [meeting]
+        assert sorted(path.name for path in recovery.failed) == ["corrupt.jsonl", "empty.jsonl"]
+        assert logger.exception.call_count == 2
+        assert all(path.exists() for path in recovery.failed)  # failed journals are left on disk
+
+    @pytest.mark.parametrize("order", [(0, 60), (60, 0)])
+    def test_duplicate(self, config, order):
+        meetings = [_journaled(config, seconds=seconds) for seconds in order]
+        newest = max(meetings, key=lambda m: m.start_time)
+        oldest = min(meetings, key=lambda m: m.start_time)
+        logger = MagicMock()
+        recovery = recover_meetings(config, logger)
+        _close(recovery.recovered)
+        assert recovery.recovered == [newest]
+        assert recovery.failed == [journal_path(config, oldest.id)]
+        logger.warning.assert_called_once()
@@ -0,0 +1,209 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+import io
+import os
+import signal
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from hcoopmeetbotlogic.config import Config, RenderEngine
+from hcoopmeetbotlogic.location import Location, Locations
+from hcoopmeetbotlogic.renderer import RenderWorkers, _receive, _send, serve
+from hcoopmeetbotlogic.writer import write_formatted_log, write_formatted_minutes
+from tests.hcoopmeetbotlogic.testdata import contents, sample_meeting
+
+CONFIG = Config(conf_file=None, timezone="America/Chicago", render_engine=RenderEngine.STRING)
+
+# A worker that never answers, like one stuck in a very slow render
+HUNG = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+# A worker that exits as soon as it starts
+EXITED = [sys.executable, "-c", "pass"]
+
+
+@pytest.fixture
+def logger():
+    return MagicMock()
+
+
+@pytest.fixture
+def temp():
+    with TemporaryDirectory() as temp:
+        yield Path(temp)
+
+
+def locations(directory: Path, name: str = "meeting") -> Locations:
+    return Locations(
+        raw_log=Location(path=str(directory / f"{name}.log.json"), url="http://raw"),
+        formatted_log=Location(path=str(directory / f"{name}.log.html"), url="http://log"),
+        formatted_minutes=Location(path=str(directory / f"{name}.html"), url="http://minutes"),
+    )
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def request(*messages: tuple[Any, ...]) -> io.BytesIO:
+    source = io.BytesIO()
+    for message in messages:
+        _send(source, message)
+    source.seek(0)
+    return source
+
+
+def responses(out: io.BytesIO) -> list[tuple[Any, ...]]:
+    out.seek(0)
+    result = []
+    while response := _receive(out):
+        result.append(response)
+    return result
+
+
+class TestServe:
+    def test_ping(self):
+        out = io.BytesIO()
+        serve(request(("ping", None), ("ping", None)), out)  # returns at end of file
+        assert responses(out) == [("ok", None), ("ok", None)]
+
+    def test_unknown(self):
+        out = io.BytesIO()
+        serve(request(("bogus", None), ("ping", None)), out)
+        assert responses(out) == [("error", "ValueError: Unknown request: bogus"), ("ok", None)]  # the worker keeps going
+
+    def test_render(self, temp):
+        meeting = sample_meeting()
+        expected, actual = locations(temp, "expected"), locations(temp, "actual")
+        write_formatted_log(CONFIG, expected, meeting)
+        write_formatted_minutes(CONFIG, expected, meeting)
+        out = io.BytesIO()
+        serve(request(("render", (CONFIG, actual, meeting.to_json(), False))), out)
+        assert responses(out) == [("ok", None)]
+        assert contents(actual.formatted_log.path) == contents(expected.formatted_log.path)
+        assert contents(actual.formatted_minutes.path) == contents(expected.formatted_minutes.path).replace(
+            "expected.log.html", "actual.log.html"
+        )
+
+    def test_render_failure(self, temp):
+        out = io.BytesIO()
+        serve(request(("render", (CONFIG, locations(temp), "{bogus", False))), out)
+        [(status, error)] = responses(out)
+        assert status == "error"
+        assert error.startswith("JSONDecodeError")
+
+    def test_truncated(self):
+        data = request(("ping", None)).getvalue()
+        out = io.BytesIO()
+        serve(io.BytesIO(data[:-1]), out)  # like the bot dying partway through a request
+        assert responses(out) == []
+
+
+class TestRenderWorkers:
+    def test_invalid_workers(self, logger):
+        with pytest.raises(ValueError):
+            RenderWorkers(logger, 0, 5)
+
+    def test_render(self, logger, temp):
+        meeting = sample_meeting()
+        meeting.active = True
+        expected, actual = locations(temp / "expected"), locations(temp / "actual")
+        write_formatted_log(CONFIG, expected, meeting)
+        write_formatted_minutes(CONFIG, expected, meeting)
+        workers = RenderWorkers(logger, 2, 30)
+        try:
+            workers.render(CONFIG, actual, meeting.to_json(), incremental=True)
+            meeting.track_nick("someone")
+            write_formatted_log(CONFIG, expected, meeting)
+            write_formatted_minutes(CONFIG, expected, meeting)
+            workers.render(CONFIG, actual, meeting.to_json(), incremental=True)  # appended by the same worker
+            assert contents(actual.formatted_log.path) == contents(expected.formatted_log.path)
+            assert contents(actual.formatted_minutes.path) == contents(expected.formatted_minutes.path)
+            assert workers.restarts == 0
+        finally:
+            workers.shutdown()
+
+    def test_render_failure(self, logger, temp):
+        workers = RenderWorkers(logger, 1, 30)
+        try:
+            with pytest.raises(RuntimeError, match="Render failed: JSONDecodeError"):
+                workers.render(CONFIG, locations(temp), "{bogus", incremental=False)
+            workers.render(CONFIG, locations(temp), sample_meeting().to_json(), incremental=False)  # the worker keeps going
+            assert workers.restarts == 0
+        finally:
+            workers.shutdown()
+
+    def test_crash(self, logger, temp):
+        workers = RenderWorkers(logger, 1, 30, interval=3600)
+        try:
+            [pid] = workers.pids()
+            os.kill(pid, signal.SIGKILL)
+            assert wait_for(lambda: not workers._slots[0].worker.alive())
+            workers.render(CONFIG, locations(temp), sample_meeting().to_json(), incremental=False)  # restarted first
+            assert workers.restarts == 1
+            assert workers.pids() != [pid]
+            assert Path(locations(temp).formatted_minutes.path).is_file()
+            logger.warning.assert_called_once()
+        finally:
+            workers.shutdown()
+
+    def test_timeout(self, logger, temp):
+        workers = RenderWorkers(logger, 1, 0.2, interval=3600, command=HUNG)
+        try:
+            [pid] = workers.pids()
+            with pytest.raises(RuntimeError, match="Render worker failed: Timed out"):
+                workers.render(CONFIG, locations(temp), sample_meeting().to_json(), incremental=False)
+            assert workers.restarts == 1  # the hung worker was killed and replaced
+            assert workers.pids() != [pid]
+        finally:
+            workers.shutdown(timeout=0)
+
+    def test_send_timeout(self, logger, temp):
+        workers = RenderWorkers(logger, 1, 0.2, interval=3600, command=HUNG)
+        try:
+            [pid] = workers.pids()
+            raw_log = "x" * (4 * 1024 * 1024)  # far more than fits in a pipe that nobody is reading
+            with pytest.raises(RuntimeError, match="Render worker failed: Timed out sending"):
+                workers.render(CONFIG, locations(temp), raw_log, incremental=False)
+            assert workers.restarts == 1  # the stuck worker was killed and replaced
+            assert workers.pids() != [pid]
+        finally:
+            workers.shutdown(timeout=0)
+
+    def test_check(self, logger):
+        workers = RenderWorkers(logger, 2, 30, interval=3600)
+        try:
+            assert workers.check() == 0
+            [first, second] = workers.pids()
+            os.kill(first, signal.SIGKILL)
+            assert workers.check() == 1
+            assert workers.pids()[0] != first
+            assert workers.pids()[1] == second
+            assert workers.check() == 0
+        finally:
+            workers.shutdown()
+
+    def test_monitor(self, logger):
+        workers = RenderWorkers(logger, 1, 30, interval=0.05, command=EXITED)
+        try:
+            assert wait_for(lambda: workers.restarts >= 2)  # replaced in the background, over and over
+        finally:
+            workers.shutdown()
+
+    def test_shutdown(self, logger, temp):
+        workers = RenderWorkers(logger, 2, 30)
+        slots = list(workers._slots)
+        workers.shutdown()
+        assert all(not slot.worker.alive() for slot in slots)
+        with pytest.raises(RuntimeError, match="shut down"):
+            workers.render(CONFIG, locations(temp), sample_meeting().to_json(), incremental=False)
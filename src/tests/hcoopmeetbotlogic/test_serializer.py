@@ -0,0 +1,203 @@
+# vim: set ft=python ts=4 sw=4 expandtab:
+
+import json
+import random
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any
+
+import pytest
+from attrs import define, evolve, field, frozen
+
+from hcoopmeetbotlogic.meeting import EventType, Meeting, TrackedEvent, TrackedMessage, VotingAction
+from hcoopmeetbotlogic.serializer import (
+    structure_fn,
+    unstructure_fn,
+    unstructure_value,
+    value_structure_fn,
+    value_unstructure_fn,
+)
+from tests.hcoopmeetbotlogic.testdata import reference_converter, sample_meeting, time
+
+SEEDS = range(50)
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+@frozen
+class Inner:
+    name: str
+    color: Color
+
+
+@define
+class Outer:
+    required: int
+    when: datetime
+    inners: list[Inner]
+    lookup: dict[str, Inner]
+    tags: list[str] = field(factory=list)
+    maybe: datetime | None = None
+    nested: Inner | None = None
+    anything: Any | None = None
+    hidden: int = field(default=5, init=False)
+
+
+REFERENCE = reference_converter()
+
+
+def _reference_to_json(meeting: Meeting) -> str:
+    """Generate the compact raw log using the reference converter."""
+    data = REFERENCE.unstructure(evolve(meeting, events=[]))
+    messages: dict[str, TrackedMessage] = {}
+    for message in meeting.messages:
+        messages.setdefault(message.id, message)
+    events = []
+    for event in meeting.events:
+        compact = {
+            "event_type": event.event_type.value,
+            "message": event.message.id
+            if messages.get(event.message.id) == event.message
+            else REFERENCE.unstructure(event.message),
+            "operand": REFERENCE.unstructure(event.operand),
+        }
+        if event.id != event.message.id or event.timestamp != event.message.timestamp:
+            compact["id"], compact["timestamp"] = event.id, REFERENCE.unstructure(event.timestamp)
+        events.append(compact)
+    data["events"] = events
+    return json.dumps({"version": 2, **data}, separators=(",", ":"))
+
+
+def _random_meeting(seed: int) -> Meeting:
+    """Generate a meeting with random contents, covering all of the values that can show up in a meeting."""
+    rng = random.Random(seed)  # noqa: S311
+
+    def text() -> str:
+        return "".join(rng.choice("abc xyz\u00e9\u2603\"\\'\n") for _ in range(rng.randint(0, 12)))
+
+    nicks = [f"nick{i}" for i in range(rng.randint(1, 5))]
+    meeting = Meeting(founder=nicks[0], channel="#" + text(), network=text(), start_time=time(rng.randint(0, 1000)))
+    meeting.name = text()
+    meeting.chairs = rng.sample(nicks, rng.randint(1, len(nicks)))
+    meeting.nicks = {nick: rng.randint(0, 100) for nick in nicks}
+    meeting.end_time = rng.choice([None, time(rng.randint(1000, 2000))])
+    meeting.active = rng.choice([True, False])
+    meeting.original_topic = rng.choice([None, text()])
+    meeting.current_topic = rng.choice([None, text()])
+    meeting.aliases = {nick: rng.choice([None, text()]) for nick in nicks}
+    meeting.vote_in_progress = rng.choice([True, False])
+    meeting.motion_index = rng.choice([None, rng.randint(0, 10)])
+    for i in range(rng.randint(0, 20)):
+        message_id = rng.choice([f"id{i}", "duplicate"])  # duplicate ids must not confuse the compact layout
+        meeting.messages.append(TrackedMessage(message_id, rng.choice(nicks), text(), rng.choice([True, False]), time(i)))
+    for _ in range(rng.randint(0, 20)):
+        message = rng.choice([*meeting.messages, TrackedMessage("untracked", "nick", text(), False, time(5000))])
+        operand = rng.choice([None, text(), [text(), text()], VotingAction.IN_FAVOR, [VotingAction.OPPOSED]])
+        event = TrackedEvent(rng.choice(list(EventType)), message, operand)
+        if rng.random() < 0.2:
+            event = evolve(event, id=text(), timestamp=message.timestamp + timedelta(seconds=rng.randint(1, 100)))
+        meeting.events.append(event)
+    return meeting
+
+
+class TestSerializer:
+    def test_unstructure(self):
+        inner = Inner("x", Color.RED)
+        outer = Outer(1, time(0), [inner], {"key": inner}, ["a"], time(1), inner, Color.BLUE)
+        assert unstructure_fn(Outer)(outer) == {
+            "required": 1,
+            "when": "2021-04-13T02:06:12+00:00",
+            "inners": [{"name": "x", "color": "red"}],
+            "lookup": {"key": {"name": "x", "color": "red"}},
+            "tags": ["a"],
+            "maybe": "2021-04-13T02:06:13+00:00",
+            "nested": {"name": "x", "color": "red"},
+            "anything": "blue",
+        }
+
+    def test_unstructure_none(self):
+        outer = Outer(1, time(0), [], {})
+        data = unstructure_fn(Outer)(outer)
+        assert data["maybe"] is None and data["nested"] is None and data["anything"] is None
+
+    def test_unstructure_copies(self):
+        outer = Outer(1, time(0), [], {}, ["a"])
+        data = unstructure_fn(Outer)(outer)
+        assert data["tags"] == outer.tags and data["tags"] is not outer.tags
+
+    def test_unstructure_init_only(self):
+        assert "hidden" not in unstructure_fn(Outer)(Outer(1, time(0), [], {}))
+
+    def test_structure(self):
+        inner = Inner("x", Color.RED)
+        outer = Outer(1, time(0), [inner], {"key": inner}, ["a"], time(1), inner, "blue")
+        assert structure_fn(Outer)(unstructure_fn(Outer)(outer)) == outer
+
+    def test_structure_defaults(self):
+        data = {"required": 1, "when": "2021-04-13T02:06:12+00:00", "inners": [], "lookup": {}, "extra": "ignored"}
+        assert structure_fn(Outer)(data) == Outer(1, time(0), [], {})
+
+    def test_structure_missing(self):
+        with pytest.raises(KeyError):
+            structure_fn(Outer)({"required": 1})
+
+    def test_unsupported(self):
+        with pytest.raises(TypeError, match="Unable to unstructure type"):
+            value_unstructure_fn(set[str])
+        with pytest.raises(TypeError, match="Unable to structure type"):
+            value_structure_fn(tuple[int, int])
+
+    def test_cached(self):
+        assert unstructure_fn(Outer) is unstructure_fn(Outer)
+        assert structure_fn(Outer) is structure_fn(Outer)
+
+    def test_values(self):
+        assert value_unstructure_fn(datetime | None)(None) is None
+        assert value_structure_fn(datetime | None)("2021-04-13T02:06:12+00:00") == time(0)
+        assert value_structure_fn(list[Color])(["red", "blue"]) == [Color.RED, Color.BLUE]
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            [None, None],
+            ["x", "x"],
+            [Color.RED, "red"],
+            [time(0), "2021-04-13T02:06:12+00:00"],
+            [(Color.RED, [Color.BLUE]), ["red", ["blue"]]],
+            [{"key": Color.RED}, {"key": "red"}],
+            [Inner("x", Color.RED), {"name": "x", "color": "red"}],
+        ],
+    )
+    def test_unstructure_value(self, value, expected):
+        assert unstructure_value(value) == expected
+
+
+class TestMeetingSerializer:
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_unstructure_matches_reference(self, seed):
+        meeting = _random_meeting(seed)
+        assert json.dumps(unstructure_fn(Meeting)(meeting)) == json.dumps(REFERENCE.unstructure(meeting))
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_structure_matches_reference(self, seed):
+        data = REFERENCE.unstructure(_random_meeting(seed))
+        assert structure_fn(Meeting)(data) == REFERENCE.structure(data, Meeting)
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_to_json_matches_reference(self, seed):
+        meeting = _random_meeting(seed)
+        assert meeting.to_json() == _reference_to_json(meeting)
+
+    @pytest.mark.parametrize("seed", SEEDS)
+    def test_roundtrip(self, seed):
+        meeting = _random_meeting(seed)
+        assert Meeting.from_json(meeting.to_json()) == meeting
+        assert structure_fn(Meeting)(json.loads(json.dumps(unstructure_fn(Meeting)(meeting)))) == meeting
+
+    def test_sample_meeting(self):
+        meeting = sample_meeting()
+        assert meeting.to_json() == _reference_to_json(meeting)
+        assert json.dumps(unstructure_fn(Meeting)(meeting)) == json.dumps(REFERENCE.unstructure(meeting))
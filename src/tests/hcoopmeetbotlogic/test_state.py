@@ -1,8 +1,12 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
+import threading
 from unittest.mock import MagicMock
 
 import pytest
 
+from hcoopmeetbotlogic.config import MessageIds, MessageStorage
+from hcoopmeetbotlogic.interface import Message
+from hcoopmeetbotlogic.meeting import Meeting, MessageStore, sequence_message_id, uuid_message_id
 from hcoopmeetbotlogic.state import (
     _ACTIVE,
     _COMPLETED,
@@ -10,14 +14,24 @@
     _CONFIG,
     _LOGGER,
     add_meeting,
+    autosave,
     config,
     deactivate_meeting,
     get_meeting,
     get_meetings,
     logger,
+    message_queue,
+    render_workers,
+    restore_meeting,
+    set_autosave,
     set_config,
     set_logger,
+    set_message_queue,
+    set_render_workers,
+    set_write_pipeline,
+    write_pipeline,
 )
+from tests.hcoopmeetbotlogic.testdata import time
 
 
 class TestFunctions:
@@ -37,6 +51,34 @@ def test_config_behavior(self):
         set_config(stub)
         assert config() is stub
 
+    def test_write_pipeline_behavior(self):
+        stub = MagicMock()
+        set_write_pipeline(stub)
+        assert write_pipeline() is stub
+        set_write_pipeline(None)
+        assert write_pipeline() is None
+
+    def test_message_queue_behavior(self):
+        stub = MagicMock()
+        set_message_queue(stub)
+        assert message_queue() is stub
+        set_message_queue(None)
+        assert message_queue() is None
+
+    def test_autosave_behavior(self):
+        stub = MagicMock()
+        set_autosave(stub)
+        assert autosave() is stub
+        set_autosave(None)
+        assert autosave() is None
+
+    def test_render_workers_behavior(self):
+        stub = MagicMock()
+        set_render_workers(stub)
+        assert render_workers() is stub
+        set_render_workers(None)
+        assert render_workers() is None
+
     def test_add_meeting(self):
         _ACTIVE.clear()
         _COMPLETED.clear()
@@ -45,6 +87,36 @@ def test_add_meeting(self):
         assert meeting.channel == "channel"
         assert meeting.network == "network"
         assert _ACTIVE[meeting.key()] is meeting
+        assert meeting.messages == []
+        assert meeting.message_id is sequence_message_id
+
+    def test_add_meeting_uuid(self):
+        _ACTIVE.clear()
+        _COMPLETED.clear()
+        meeting = add_meeting("nick", "channel", "network", ids=MessageIds.UUID)
+        assert meeting.message_id is uuid_message_id
+        assert _ACTIVE[meeting.key()] is meeting
+
+    def test_add_meeting_columnar(self):
+        _ACTIVE.clear()
+        _COMPLETED.clear()
+        meeting = add_meeting("nick", "channel", "network", storage=MessageStorage.COLUMNAR)
+        assert isinstance(meeting.messages, MessageStore)
+        assert _ACTIVE[meeting.key()] is meeting
+
+    def test_restore_meeting(self):
+        _ACTIVE.clear()
+        _COMPLETED.clear()
+        active = Meeting(founder="nick", channel="channel", network="network", active=True)
+        assert restore_meeting(active) is True
+        assert _ACTIVE[active.key()] is active
+        duplicate = Meeting(founder="nick", channel="channel", network="network", active=True)
+        assert restore_meeting(duplicate) is False  # can't have two active meetings on the same channel
+        assert _ACTIVE[active.key()] is active
+        completed = Meeting(founder="nick", channel="channel", network="network", active=False)
+        assert restore_meeting(completed) is True
+        assert completed in _COMPLETED
+        assert _ACTIVE[active.key()] is active
 
     def test_deactivate_meeting_not_retained(self):
         _ACTIVE.clear()
@@ -115,3 +187,50 @@ def test_get_meetings(self):
         assert get_meetings(active=True, completed=False) == [active1, active2]
         assert get_meetings(active=False, completed=True) == [completed1, completed2]
         assert get_meetings(active=True, completed=True) == [active1, active2, completed1, completed2]
+
+    def test_get_meetings_snapshot(self):
+        _ACTIVE.clear()
+        _COMPLETED.clear()
+        active = add_meeting("nick", "channel", "network")
+        active.track_message(Message(None, time(0), "nick", "channel", "network", "hello"))
+        snapshots = get_meetings(active=True, completed=False, snapshot=True)
+        assert snapshots == [active]
+        assert snapshots[0] is not active
+        active.track_message(Message(None, time(1), "nick", "channel", "network", "again"))
+        assert len(snapshots[0].messages) == 1  # unaffected by further activity
+        assert get_meetings(active=True, completed=False)[0] is active
+
+    def test_concurrent_changes(self):
+        _ACTIVE.clear()
+        _COMPLETED.clear()
+        threads, meetings = 8, 100
+        barrier, failures, seen = threading.Barrier(threads + 1), [], []
+
+        def churn(thread: int) -> None:
+            barrier.wait()
+            try:
+                for i in range(meetings):
+                    meeting = add_meeting("nick", f"channel-{thread}-{i}", "network")
+                    meeting.track_message(Message(None, time(i), "nick", meeting.channel, "network", "hello"))
+                    deactivate_meeting(meeting, retain=i % 2 == 0)
+            except Exception as e:  # noqa: BLE001
+                failures.append(e)
+
+        def watch() -> None:
+            barrier.wait()
+            try:
+                while any(thread.is_alive() for thread in workers):
+                    seen.extend(get_meetings(active=True, completed=True, snapshot=True))
+            except Exception as e:  # noqa: BLE001
+                failures.append(e)
+
+        workers = [threading.Thread(target=churn, args=(i,)) for i in range(threads)]
+        watcher = threading.Thread(target=watch)
+        for thread in [*workers, watcher]:
+            thread.start()
+        for thread in [*workers, watcher]:
+            thread.join(timeout=30)
+        assert not failures
+        assert not _ACTIVE
+        assert len(_COMPLETED) == _COMPLETED_SIZE
+        assert all(len(meeting.messages) <= 1 for meeting in seen)
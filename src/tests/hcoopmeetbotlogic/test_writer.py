@@ -1,6 +1,7 @@
 # vim: set ft=python ts=4 sw=4 expandtab:
 # ruff: noqa: FURB113
 
+import random
 from datetime import UTC, datetime
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -8,16 +9,45 @@
 
 import pytest
 
-from hcoopmeetbotlogic.config import OutputFormat
+from hcoopmeetbotlogic.config import OutputFormat, RenderEngine
 from hcoopmeetbotlogic.location import Location, Locations
-from hcoopmeetbotlogic.meeting import Meeting
-from hcoopmeetbotlogic.writer import _AliasMatcher, _LogMessage, write_meeting
-from tests.hcoopmeetbotlogic.testdata import contents, sample_meeting
+from hcoopmeetbotlogic.meeting import EventType, Meeting, MessageStore
+from hcoopmeetbotlogic.pipeline import WritePipeline
+from hcoopmeetbotlogic.writer import (
+    _AliasMatcher,
+    _AttendeeMatcher,
+    _LogMessage,
+    _MeetingMinutes,
+    _render_html,
+    _render_rows,
+    _render_string_row,
+    save_meeting,
+    submit_meeting,
+    write_formatted_log,
+    write_formatted_minutes,
+    write_meeting,
+)
+from tests.hcoopmeetbotlogic.testdata import contents, sample_meeting, time
+from tests.hcoopmeetbotlogic.testdata import message as mock_message
 
 EXPECTED_LOG = str(Path(__file__).parent / "fixtures/test_writer/log.html")
 EXPECTED_MINUTES = str(Path(__file__).parent / "fixtures/test_writer/minutes.html")
 TIMESTAMP = datetime(2021, 3, 7, 13, 14, 0, tzinfo=UTC)
 
+# Content that is difficult to render safely and consistently
+TRICKY_CONTENT = [
+    "<script>alert('hello')</script>",
+    '<img src="x" onerror=alert(1);>',
+    "&amp; &lt; &#34;",
+    '"quoted"',
+    "nick: hello",
+    "trailing space \t ",
+    "line\n\n  break",
+    "\x01ACTION waves\x01",
+    "https://example.com/?a=1&b=<2>",
+    "\u00e9\u00e8 \U0001f4ac",
+]
+
 
 class TestLogMessage:
     @pytest.fixture
@@ -136,9 +166,10 @@ def test_cross_site_scripting(self, config, message, payload, expected):
 
 
 class TestRendering:
+    @pytest.mark.parametrize("engine", [RenderEngine.GENSHI, RenderEngine.STRING])
     @patch("hcoopmeetbotlogic.writer.VERSION", "1.2.3")
     @patch("hcoopmeetbotlogic.writer.derive_locations")
-    def test_html_rendering(self, derive_locations):
+    def test_html_rendering(self, derive_locations, engine):
         # The goal here is to prove that rendering is wired up properly, the templates are
         # valid, and that files are written as expected.  We don't necessarily verify every
         # different scenario - there are tests elsewhere that delve into some of the details.
@@ -148,7 +179,7 @@ def test_html_rendering(self, derive_locations):
             formatted_minutes = Location(path=str(Path(temp) / "minutes.html"), url="http://minutes")
             locations = Locations(raw_log=raw_log, formatted_log=formatted_log, formatted_minutes=formatted_minutes)
             derive_locations.return_value = locations
-            config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML)
+            config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=engine)
             meeting = sample_meeting()
             assert write_meeting(config, meeting) is locations
             derive_locations.assert_called_once_with(config, meeting)
@@ -156,6 +187,456 @@ def test_html_rendering(self, derive_locations):
             assert contents(formatted_log.path) == contents(EXPECTED_LOG)
             assert contents(formatted_minutes.path) == contents(EXPECTED_MINUTES)
 
+    @patch("hcoopmeetbotlogic.writer.VERSION", "1.2.3")
+    @patch("hcoopmeetbotlogic.writer.derive_locations")
+    def test_html_rendering_columnar(self, derive_locations):
+        with TemporaryDirectory() as temp:
+            raw_log = Location(path=str(Path(temp) / "log.json"), url="http://raw")
+            formatted_log = Location(path=str(Path(temp) / "log.html"), url="http://log")
+            formatted_minutes = Location(path=str(Path(temp) / "minutes.html"), url="http://minutes")
+            locations = Locations(raw_log=raw_log, formatted_log=formatted_log, formatted_minutes=formatted_minutes)
+            derive_locations.return_value = locations
+            config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+            meeting = sample_meeting()
+            meeting.messages = MessageStore(meeting.messages)
+            assert write_meeting(config, meeting) is locations
+            assert meeting == Meeting.from_json(contents(raw_log.path))
+            assert contents(formatted_log.path) == contents(EXPECTED_LOG)
+            assert contents(formatted_minutes.path) == contents(EXPECTED_MINUTES)
+
+    @patch("hcoopmeetbotlogic.writer.VERSION", "1.2.3")
+    @patch("hcoopmeetbotlogic.writer.derive_locations")
+    def test_submit_meeting(self, derive_locations):
+        with TemporaryDirectory() as temp:
+            raw_log = Location(path=str(Path(temp) / "log.json"), url="http://raw")
+            formatted_log = Location(path=str(Path(temp) / "log.html"), url="http://log")
+            formatted_minutes = Location(path=str(Path(temp) / "minutes.html"), url="http://minutes")
+            locations = Locations(raw_log=raw_log, formatted_log=formatted_log, formatted_minutes=formatted_minutes)
+            derive_locations.return_value = locations
+            config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML)
+            meeting = sample_meeting()
+            expected = meeting.snapshot()
+            pipeline = WritePipeline(MagicMock(), 1)
+            try:
+                assert submit_meeting(config, meeting, pipeline) is locations
+                meeting.track_nick("changed-after-submit")  # should not affect what gets written
+                assert pipeline.flush(timeout=5)
+            finally:
+                pipeline.shutdown()
+            derive_locations.assert_called_once_with(config, meeting)
+            assert expected == Meeting.from_json(contents(raw_log.path))
+            assert contents(formatted_log.path) == contents(EXPECTED_LOG)
+            assert contents(formatted_minutes.path) == contents(EXPECTED_MINUTES)
+
+    @pytest.mark.parametrize("active", [True, False])
+    @patch("hcoopmeetbotlogic.writer.write_formatted_minutes")
+    @patch("hcoopmeetbotlogic.writer.write_formatted_log")
+    @patch("hcoopmeetbotlogic.writer._write_raw_log")
+    @patch("hcoopmeetbotlogic.writer._CHANGES")
+    @patch("hcoopmeetbotlogic.writer.derive_locations")
+    def test_incremental_while_active(
+        self, derive_locations, changes, write_raw_log, write_formatted_log, write_formatted_minutes, active
+    ):
+        config = MagicMock()
+        meeting = MagicMock(active=active)
+        changes.unchanged.return_value = False
+        locations = derive_locations.return_value
+        write_meeting(config, meeting)
+        write_raw_log.assert_called_once_with(locations.raw_log, meeting.to_json.return_value)
+        write_formatted_log.assert_called_once_with(config, locations, meeting, incremental=active)
+        write_formatted_minutes.assert_called_once_with(config, locations, meeting)
+
+    @patch("hcoopmeetbotlogic.writer.write_meeting")
+    def test_submit_meeting_inline(self, write_meeting):
+        config = MagicMock()
+        meeting = MagicMock()
+        assert submit_meeting(config, meeting, None) is write_meeting.return_value
+        write_meeting.assert_called_once_with(config, meeting)
+
+    @pytest.mark.parametrize("threaded", [True, False])
+    @patch("hcoopmeetbotlogic.writer._write_locations")
+    @patch("hcoopmeetbotlogic.writer.derive_locations")
+    def test_submit_meeting_final(self, derive_locations, write_locations, threaded):
+        config = MagicMock()
+        journal = MagicMock()
+        meeting = sample_meeting(journal=journal)
+        pipeline = WritePipeline(MagicMock(), 1) if threaded else None
+        try:
+            submit_meeting(config, meeting, pipeline, final=True)
+            assert meeting.journal is None
+            assert not pipeline or pipeline.flush(timeout=5)
+        finally:
+            if pipeline:
+                pipeline.shutdown()
+        assert write_locations.call_args.args[:2] == (config, derive_locations.return_value)
+        journal.remove.assert_called_once()  # the journal is only removed once the meeting has been written
+        journal.close.assert_not_called()
+
+    @pytest.mark.parametrize("threaded", [True, False])
+    @patch("hcoopmeetbotlogic.writer._write_locations")
+    @patch("hcoopmeetbotlogic.writer.derive_locations")
+    def test_submit_meeting_final_failed(self, derive_locations, write_locations, threaded):
+        journal = MagicMock()
+        meeting = sample_meeting(journal=journal)
+        write_locations.side_effect = OSError("disk full")
+        pipeline = WritePipeline(MagicMock(), 1) if threaded else None
+        try:
+            if pipeline:
+                submit_meeting(MagicMock(), meeting, pipeline, final=True)
+                assert pipeline.flush(timeout=5)
+            else:
+                with pytest.raises(OSError, match="disk full"):
+                    submit_meeting(MagicMock(), meeting, pipeline, final=True)
+        finally:
+            if pipeline:
+                pipeline.shutdown()
+        write_locations.assert_called_once()
+        derive_locations.assert_called_once()
+        journal.remove.assert_not_called()  # the journal is retained, since the meeting was never written
+        journal.close.assert_called_once()
+
+
+class TestChangeDetection:
+    @pytest.fixture
+    def locations(self):
+        with TemporaryDirectory() as temp:
+            with patch("hcoopmeetbotlogic.writer.derive_locations") as derive_locations:
+                derive_locations.return_value = Locations(
+                    raw_log=Location(path=str(Path(temp) / "log.json"), url="http://raw"),
+                    formatted_log=Location(path=str(Path(temp) / "log.html"), url="http://log"),
+                    formatted_minutes=Location(path=str(Path(temp) / "minutes.html"), url="http://minutes"),
+                )
+                yield derive_locations.return_value
+
+    @staticmethod
+    def _mtimes(locations):
+        return [Path(location.path).stat().st_mtime_ns for location in (locations.raw_log, locations.formatted_log, locations.formatted_minutes)]  # fmt: skip
+
+    def test_unchanged(self, locations):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        meeting = sample_meeting()
+        meeting.active = True
+        result = save_meeting(config, meeting)
+        assert result.written
+        assert result.locations is locations
+        assert result.skipped == []
+        mtimes = self._mtimes(locations)
+        result = save_meeting(config, meeting)
+        assert not result.written
+        assert result.skipped == [locations.raw_log.path, locations.formatted_log.path, locations.formatted_minutes.path]
+        assert self._mtimes(locations) == mtimes  # nothing was touched
+        assert write_meeting(config, meeting.snapshot()) is locations  # an identical snapshot is also unchanged
+        assert self._mtimes(locations) == mtimes
+
+    def test_render_workers(self, locations):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        meeting = sample_meeting()
+        meeting.active = True
+        with patch("hcoopmeetbotlogic.writer.render_workers") as render_workers:
+            assert save_meeting(config, meeting).written
+            render_workers.return_value.render.assert_called_once_with(config, locations, meeting.to_json(), incremental=True)
+        assert contents(locations.raw_log.path) == meeting.to_json()  # the raw log is always written by the bot itself
+        assert not Path(locations.formatted_log.path).exists()  # the formatted output is left to the worker
+
+    def test_changed(self, locations):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        meeting = sample_meeting()
+        meeting.active = True
+        assert save_meeting(config, meeting).written
+        meeting.track_nick("someone")
+        assert save_meeting(config, meeting).written  # the meeting changed
+        assert "someone" in contents(locations.formatted_minutes.path)
+        assert not save_meeting(config, meeting).written
+        other = MagicMock(timezone="UTC", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        assert save_meeting(other, meeting).written  # the configuration changed
+        assert not save_meeting(other, meeting).written
+        with patch("hcoopmeetbotlogic.writer.VERSION", "9.9.9"):
+            assert save_meeting(other, meeting).written  # the software version changed
+
+    @pytest.mark.parametrize("index", [0, 1, 2])
+    def test_changed_on_disk(self, locations, index):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        meeting = sample_meeting()
+        meeting.active = True
+        assert save_meeting(config, meeting).written
+        path = Path([locations.raw_log, locations.formatted_log, locations.formatted_minutes][index].path)
+        path.unlink()
+        assert save_meeting(config, meeting).written  # a file was removed behind our back
+        assert path.is_file()
+        path.write_text("edited", encoding="utf-8")
+        assert save_meeting(config, meeting).written  # a file was changed behind our back
+        assert contents(str(path)) != "edited"
+
+    def test_failed_write(self, locations):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=RenderEngine.STRING)
+        meeting = sample_meeting()
+        meeting.active = True
+        assert save_meeting(config, meeting).written
+        meeting.track_nick("someone")
+        with patch("hcoopmeetbotlogic.writer.write_formatted_minutes", side_effect=OSError("disk full")):
+            with pytest.raises(OSError, match="disk full"):
+                save_meeting(config, meeting)
+        assert save_meeting(config, meeting).written  # nothing is skipped until a write succeeds
+        assert "someone" in contents(locations.formatted_minutes.path)
+
+
+class TestMeetingMinutes:
+    @pytest.fixture
+    def config(self):
+        return MagicMock(timezone="America/Chicago")
+
+    def test_for_meeting(self, config):
+        meeting = sample_meeting()
+        minutes = _MeetingMinutes.for_meeting(config, meeting)
+        assert minutes.start_time == "2021-04-12 21:06:12-0500"
+        assert minutes.end_time == "2021-04-12 21:15:42-0500"
+        assert minutes.founder == "pronovic"
+        assert [action.id for action in minutes.actions] == [
+            "action-id-18",
+            "action-id-22",
+            "action-id-24",
+            "action-id-31",
+            "action-id-33",
+            "action-id-35",
+            "action-id-37",
+        ]
+        attendees = {attendee.nick: [action.id for action in attendee.actions] for attendee in minutes.attendees}
+        assert attendees == {
+            "[ken": ["action-id-35"],
+            "[m]": ["action-id-37"],
+            "bhkl": [],
+            "keverets": [],
+            "ken[": [],
+            "layline": ["action-id-18"],
+            "pronovic": ["action-id-22"],
+            "unknown_lamer": ["action-id-18"],
+        }
+        assert [topic.name for topic in minutes.topics] == [
+            "Prologue",
+            "Attendance",
+            "The first topic",
+            "The second topic",
+            "The third topic",
+        ]
+
+    @patch("hcoopmeetbotlogic.writer.formatdate_cached")
+    def test_timestamps_formatted_once(self, formatdate_cached, config):
+        formatdate_cached.side_effect = lambda timestamp, zone, fmt: f"{timestamp}/{zone}/{fmt}"
+        meeting = sample_meeting()
+        _MeetingMinutes.for_meeting(config, meeting)
+        calls = [(c.kwargs["timestamp"], c.kwargs["fmt"]) for c in formatdate_cached.call_args_list]
+        assert len(calls) == len(set(calls))  # every distinct timestamp and format is formatted exactly once
+
+
+class TestIncrementalLog:
+    @pytest.fixture
+    def config(self):
+        return MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML)
+
+    @pytest.fixture
+    def temp(self):
+        with TemporaryDirectory() as temp:
+            yield temp
+
+    @pytest.fixture
+    def locations(self, temp):
+        raw_log = Location(path=str(Path(temp) / "log.json"), url="http://raw")
+        formatted_log = Location(path=str(Path(temp) / "log.html"), url="http://log")
+        formatted_minutes = Location(path=str(Path(temp) / "minutes.html"), url="http://minutes")
+        return Locations(raw_log=raw_log, formatted_log=formatted_log, formatted_minutes=formatted_minutes)
+
+    @staticmethod
+    def partial(meeting, count):
+        snapshot = meeting.snapshot()
+        snapshot.messages = snapshot.messages[:count]
+        return snapshot
+
+    def test_render_matches_template(self, config):
+        meeting = sample_meeting()
+        rows = "".join(_LogMessage.for_message(config, message).render() for message in meeting.messages)
+        assert rows in contents(EXPECTED_LOG)
+
+    def test_appends_new_messages(self, config, locations):
+        meeting = sample_meeting()
+        with patch("hcoopmeetbotlogic.writer._LogMessage.for_message", wraps=_LogMessage.for_message) as for_message:
+            write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+            assert for_message.call_count == 10
+            write_formatted_log(config, locations, self.partial(meeting, 25), incremental=True)
+            assert for_message.call_count == 25  # only the 15 new messages were rendered
+            write_formatted_log(config, locations, self.partial(meeting, 25), incremental=True)
+            assert for_message.call_count == 25  # nothing new to render
+            write_formatted_log(config, locations, meeting, incremental=True)
+            assert for_message.call_count == len(meeting.messages)
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    def test_partial_output_is_complete_document(self, config, locations, temp):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 5), incremental=True)
+        write_formatted_log(config, locations, self.partial(meeting, 12), incremental=True)
+        expected = Location(path=str(Path(temp) / "expected.html"), url="http://expected")
+        write_formatted_log(config, Locations(locations.raw_log, expected, locations.formatted_minutes), self.partial(meeting, 12))
+        assert contents(locations.formatted_log.path) == contents(expected.path)
+
+    def test_missing_file_renders_everything(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        Path(locations.formatted_log.path).unlink()
+        with patch("hcoopmeetbotlogic.writer._LogMessage.for_message", wraps=_LogMessage.for_message) as for_message:
+            write_formatted_log(config, locations, meeting, incremental=True)
+            assert for_message.call_count == len(meeting.messages)
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    def test_modified_file_renders_everything(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        Path(locations.formatted_log.path).write_text("something else", encoding="utf-8")
+        write_formatted_log(config, locations, meeting, incremental=True)
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    def test_renamed_meeting_renders_everything(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        renamed = meeting.snapshot()
+        renamed.name = "renamed"
+        write_formatted_log(config, locations, renamed, incremental=True)
+        assert "<title>renamed Log</title>" in contents(locations.formatted_log.path)
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG).replace("#hcoop Log", "renamed Log")
+
+    def test_different_meeting_renders_everything(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        other = self.partial(meeting, 12)
+        other.id = "other"
+        other.messages = meeting.messages[20:32]
+        write_formatted_log(config, locations, other, incremental=True)
+        assert "id-0" not in contents(locations.formatted_log.path)
+
+    def test_full_render_resets_progress(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        write_formatted_log(config, locations, meeting)
+        with patch("hcoopmeetbotlogic.writer._LogMessage.for_message", wraps=_LogMessage.for_message) as for_message:
+            write_formatted_log(config, locations, meeting, incremental=True)
+            assert for_message.call_count == len(meeting.messages)
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    @patch("hcoopmeetbotlogic.writer._LOG_CHUNK_SIZE", 7)
+    def test_chunked_output(self, config, locations):
+        meeting = sample_meeting()
+        with patch("hcoopmeetbotlogic.writer._render_rows", wraps=_render_rows) as render_rows:
+            write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+            write_formatted_log(config, locations, meeting, incremental=True)
+            write_formatted_log(config, locations, meeting)
+        assert render_rows.call_count == 3
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    @patch("hcoopmeetbotlogic.writer._LOG_CHUNK_SIZE", 7)
+    def test_lazy_rendering(self, config):
+        meeting = sample_meeting()
+        with patch("hcoopmeetbotlogic.writer._LogMessage.for_message", wraps=_LogMessage.for_message) as for_message:
+            chunks = _render_rows(config, meeting.messages, 3)
+            assert for_message.call_count == 0  # nothing is rendered until it's needed
+            first = next(chunks)
+            assert for_message.call_count == 7
+            assert first.count("\n") == 7
+            assert first.startswith('<a name="id-3">')
+            rest = list(chunks)
+            assert for_message.call_count == len(meeting.messages) - 3
+            assert len(rest) == 5
+            assert rest[-1].endswith('#endmeeting </span><span class="cmdline"><span></span></span></span>\n')
+
+    def test_string_engine(self, config, locations):
+        config.render_engine = RenderEngine.STRING
+        meeting = sample_meeting()
+        with patch("hcoopmeetbotlogic.writer._render_string_row", wraps=_render_string_row) as render_string_row:
+            write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+            write_formatted_log(config, locations, meeting, incremental=True)
+            assert render_string_row.call_count == len(meeting.messages)  # each message was only rendered once
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+    def test_mixed_engines(self, config, locations):
+        meeting = sample_meeting()
+        write_formatted_log(config, locations, self.partial(meeting, 10), incremental=True)
+        config.render_engine = RenderEngine.STRING
+        write_formatted_log(config, locations, meeting, incremental=True)  # the engines are interchangeable
+        assert contents(locations.formatted_log.path) == contents(EXPECTED_LOG)
+
+
+class TestRenderEngines:
+    # The string engine must generate output that is byte-for-byte identical to the Genshi
+    # templates, including all of the escaping that protects us from cross-site scripting.
+
+    @pytest.fixture
+    def temp(self):
+        with TemporaryDirectory() as temp:
+            yield temp
+
+    @staticmethod
+    def render(engine, meeting, temp):
+        config = MagicMock(timezone="America/Chicago", output_format=OutputFormat.HTML, render_engine=engine)
+        raw_log = Location(path=str(Path(temp) / engine / "log.json"), url="http://raw")
+        formatted_log = Location(path=str(Path(temp) / engine / "log.html"), url="http://log")
+        formatted_minutes = Location(path=str(Path(temp) / engine / "minutes.html"), url="http://minutes")
+        locations = Locations(raw_log=raw_log, formatted_log=formatted_log, formatted_minutes=formatted_minutes)
+        write_formatted_log(config, locations, meeting)
+        write_formatted_minutes(config, locations, meeting)
+        return contents(formatted_log.path), contents(formatted_minutes.path)
+
+    def assert_identical(self, meeting, temp):
+        assert self.render(RenderEngine.STRING, meeting, temp) == self.render(RenderEngine.GENSHI, meeting, temp)
+
+    def test_sample_meeting(self, temp):
+        self.assert_identical(sample_meeting(), temp)
+
+    def test_minimal_meeting(self, temp):
+        meeting = Meeting(founder="founder", channel="#channel", network="network")
+        meeting.track_message(message=mock_message(0, "founder", "#startmeeting", 0))
+        self.assert_identical(meeting, temp)
+
+    @pytest.mark.parametrize("payload", TRICKY_CONTENT)
+    def test_tricky_content(self, payload, temp):
+        meeting = Meeting(founder=payload, channel=payload, network="network")
+        meeting.start_time = time(0)
+        meeting.track_attendee(nick=payload, alias=payload + " alias")
+        for index, event_type in enumerate([EventType.TOPIC, EventType.LINK, EventType.ACTION, EventType.INFO]):
+            tracked = meeting.track_message(message=mock_message(index, payload, payload, index))
+            meeting.track_event(event_type=event_type, message=tracked, operand=payload)
+            tracked = meeting.track_message(message=mock_message(index, payload, f"#{event_type.lower()} {payload}", index))
+            meeting.track_event(event_type=event_type, message=tracked, operand=f"{payload} https://example.com/{payload}")
+        self.assert_identical(meeting, temp)
+
+    @pytest.mark.parametrize("engine", [RenderEngine.GENSHI, RenderEngine.STRING])
+    @pytest.mark.parametrize("payload", TRICKY_CONTENT)
+    def test_log_matches_template(self, engine, payload, temp):
+        # the formatted log is written in chunks, so prove that it's the same as rendering the whole template
+        meeting = sample_meeting()
+        meeting.track_message(message=mock_message(99, payload, payload, 999))
+        config = MagicMock(timezone="America/Chicago")
+        context = {
+            "title": f"{meeting.name} Log",
+            "messages": [_LogMessage.for_message(config, message) for message in meeting.messages],
+        }
+        with Path(temp, "expected.html").open("w", encoding="utf-8") as out:
+            _render_html(template="log.html", context=context, out=out)
+        assert self.render(engine, meeting, temp)[0] == contents(str(Path(temp, "expected.html")))
+
+    def test_randomized_content(self, temp):
+        rng = random.Random(42)  # noqa: S311
+        tokens = ["nick:", "#topic", "#link", "#action", "<b>", "&", '"', "'", " ", "  ", "\t", "\n", "(x)", "word", "http://x/"]
+        event_types = [EventType.TOPIC, EventType.LINK, EventType.ACTION, EventType.IDEA, EventType.VOTE, EventType.UNDO]
+        for _ in range(20):
+            meeting = Meeting(founder="founder", channel="".join(rng.choices(tokens, k=3)), network="network")
+            meeting.end_time = time(600) if rng.random() < 0.5 else None
+            for index in range(30):
+                nick = rng.choice(["founder", "<nick>", 'q"uote', "a&b"])
+                payload = "".join(rng.choices(tokens, k=rng.randint(0, 8)))
+                tracked = meeting.track_message(message=mock_message(index, nick, payload, index * 7))
+                if rng.random() < 0.5:
+                    meeting.track_event(event_type=rng.choice(event_types), message=tracked, operand=payload)
+                if rng.random() < 0.1:
+                    meeting.track_attendee(nick=nick, alias="".join(rng.choices(tokens, k=2)))
+            self.assert_identical(meeting, temp)
+
 
 class TestAliasMatcher:
     @pytest.mark.parametrize(
@@ -234,3 +715,54 @@ def test_matches(self, identifier):
                     pytest.fail(f"nick '{identifier}' incorrectly found in message '{testcase}'")
                 if alias_matcher.matches(testcase):
                     pytest.fail(f"alias '{identifier}' incorrectly found in message '{testcase}'")
+
+
+class TestAttendeeMatcher:
+    @pytest.mark.parametrize(
+        "message",
+        [
+            pytest.param("", id="empty"),
+            pytest.param("   ", id="whitespace"),
+            pytest.param("ken", id="nick"),
+            pytest.param("KEN: do the thing", id="nick colon"),
+            pytest.param("do the thing (Ken)", id="nick parens"),
+            pytest.param("ken pronovici will do it", id="alias"),
+            pytest.param("ken  pronovici will do it", id="alias extra whitespace"),
+            pytest.param("(Ken Pronovici) will do it", id="alias parens"),
+            pytest.param("Ken Pronovici: will do it", id="alias colon"),
+            pytest.param("prefixken and kensuffix", id="embedded"),
+            pytest.param("k[n and [m] and ken]", id="special characters"),
+            pytest.param("\tken\n", id="tab and newline"),
+            pytest.param("ken:: (ken) ((ken)) ken:)", id="odd punctuation"),
+        ],
+    )
+    def test_matches_same_as_alias_matcher(self, message):
+        attendees = {"ken": "Ken Pronovici", "k[n": None, "[m]": "[m]", "ken]": "KEN", "other": " padded ", "empty": ""}
+        matcher = _AttendeeMatcher(attendees)
+        expected = {nick for nick, alias in attendees.items() if _AliasMatcher(nick, alias).matches(message)}
+        assert matcher.matches(message) == expected
+
+    def test_matches_randomized(self):
+        # Property-style test: for random attendees and messages, results are identical to checking every _AliasMatcher
+        generator = random.Random(20210413)  # noqa: S311
+        words = ["ken", "Ken", "KEN", "k[n", "[m]", "clinton", "alias", "x", "y:", "(z)", "a.b", "*", "\\"]
+        separators = [" ", "  ", "\t", " \n "]
+
+        def phrase(count):
+            result = generator.choice(words)
+            for _ in range(count - 1):
+                result += generator.choice(separators) + generator.choice(words)
+            return result
+
+        def decorate(value):
+            return generator.choice([value, f"{value}:", f"({value})", f"pre{value}", f"{value}post"])
+
+        for _ in range(200):
+            attendees = {
+                phrase(1): generator.choice([None, phrase(generator.randint(1, 3))]) for _ in range(generator.randint(1, 8))
+            }
+            matcher = _AttendeeMatcher(attendees)
+            for _ in range(10):
+                message = " ".join(decorate(phrase(generator.randint(1, 3))) for _ in range(generator.randint(0, 6)))
+                expected = {nick for nick, alias in attendees.items() if _AliasMatcher(nick, alias).matches(message)}
+                assert matcher.matches(message) == expected, f"attendees={attendees!r} message={message!r}"
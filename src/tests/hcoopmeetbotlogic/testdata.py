@@ -4,8 +4,11 @@
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import cattrs
+
 from hcoopmeetbotlogic.interface import Message
-from hcoopmeetbotlogic.meeting import EventType, Meeting, VotingAction
+from hcoopmeetbotlogic.journal import Journal
+from hcoopmeetbotlogic.meeting import EventType, Meeting, TrackedEvent, TrackedMessage, VotingAction
 
 START_TIME = datetime(2021, 4, 13, 2, 6, 12, tzinfo=UTC)
 
@@ -20,16 +23,60 @@ def time(seconds: int) -> datetime:
     return START_TIME + timedelta(seconds=seconds)
 
 
+def reference_converter() -> cattrs.GenConverter:
+    """
+    Build a cattrs converter that unstructures meetings exactly like the precompiled serializer.
+
+    This is how meetings were serialized before the serializer was precompiled, and it's kept
+    as a reference.  Tracked messages and events store their timestamps compactly, so they need
+    explicit hooks to produce their public representation.
+    """
+    converter = cattrs.GenConverter()
+    converter.register_unstructure_hook(datetime, lambda d: d.isoformat() if d else None)
+    converter.register_structure_hook(datetime, lambda s, _: datetime.fromisoformat(s) if s else None)
+    converter.register_unstructure_hook(
+        TrackedMessage,
+        lambda m: {"id": m.id, "sender": m.sender, "payload": m.payload, "action": m.action, "timestamp": m.timestamp.isoformat()},
+    )
+    converter.register_structure_hook(
+        TrackedMessage,
+        lambda d, _: TrackedMessage(d["id"], d["sender"], d["payload"], d["action"], datetime.fromisoformat(d["timestamp"])),
+    )
+    converter.register_unstructure_hook(
+        TrackedEvent,
+        lambda e: {
+            "event_type": e.event_type.value,
+            "message": converter.unstructure(e.message),
+            "operand": converter.unstructure(e.operand),
+            "id": e.id,
+            "timestamp": e.timestamp.isoformat(),
+        },
+    )
+    converter.register_structure_hook(
+        TrackedEvent,
+        lambda d, _: TrackedEvent(
+            EventType(d["event_type"]),
+            converter.structure(d["message"], TrackedMessage),
+            d["operand"],
+            id=d["id"],
+            timestamp=datetime.fromisoformat(d["timestamp"]),
+        ),
+    )
+    return converter
+
+
 def message(identifier: int, nick: str, payload: str, seconds: int) -> Message:
     """Generate a mocked message with some values"""
     return MagicMock(id=f"id-{identifier}", nick=nick, payload=payload, timestamp=time(seconds))
 
 
-def sample_meeting() -> Meeting:
-    """Generate a semi-realistic meeting that can be used for unit tests"""
+def sample_meeting(journal: Journal | None = None) -> Meeting:
+    """Generate a semi-realistic meeting that can be used for unit tests, optionally journaling it"""
 
     # Initialize the meeting
     meeting = Meeting(founder="pronovic", channel="#hcoop", network="network")
+    if journal:
+        meeting.attach_journal(journal)
 
     # this gets us some data in the attendees section without having to add tons of messages
     meeting.track_nick("unknown_lamer", 13)